@@ -0,0 +1,85 @@
+# benchmarks/bench_classify.py
+#
+# Compares per-line classification (one DataFrame + predict per text line, the
+# original behaviour) against batched predict with the sklearn pipeline and with
+# the compiled NumPy forest PDFProcessor uses by default.
+#
+# Usage (from Challenge_1a/):
+#     python -m benchmarks.bench_classify [pdf ...]
+
+import sys
+import time
+import numpy as np
+import pandas as pd
+from src.config import Config
+from src.model import SklearnModel
+from src.processor import PDFProcessor
+
+
+class SklearnProcessor(PDFProcessor):
+    """
+    PDFProcessor that classifies with the joblib pipeline.
+    """
+    def __init__(self, model_path, label_map):
+        super().__init__(model_path, label_map)
+        self.clf = SklearnModel(model_path)
+
+
+class PerLineProcessor(SklearnProcessor):
+    """
+    PDFProcessor that classifies every line with its own sklearn predict call.
+    """
+    def _predict(self, features):
+        return np.array([super(PerLineProcessor, self)._predict(row[None, :])[0] for row in features])
+
+
+class CountingProcessor(PDFProcessor):
+    """
+    PDFProcessor that counts how many lines go through the classifier.
+    """
+    line_count = 0
+
+    def _predict(self, features):
+        self.line_count += len(features)
+        return super()._predict(features)
+
+
+def run(processor, pdf_paths):
+    start = time.perf_counter()
+    results = [processor.extract_headings(path) for path in pdf_paths]
+    return results, time.perf_counter() - start
+
+
+def main(pdf_paths):
+    if not pdf_paths:
+        pdf_paths = [inp for inp, _ in Config.get_input_output_files()]
+
+    counter = CountingProcessor(Config.MODEL_PATH, Config.LABEL_MAP)
+    run(counter, pdf_paths)
+    n_lines = counter.line_count
+
+    compiled, compiled_time = run(PDFProcessor(Config.MODEL_PATH, Config.LABEL_MAP), pdf_paths)
+    batched, batched_time = run(SklearnProcessor(Config.MODEL_PATH, Config.LABEL_MAP), pdf_paths)
+    per_line, per_line_time = run(PerLineProcessor(Config.MODEL_PATH, Config.LABEL_MAP), pdf_paths)
+
+    rows = [
+        {"mode": "per-line", "seconds": per_line_time, "lines_per_sec": n_lines / per_line_time},
+        {"mode": "batched", "seconds": batched_time, "lines_per_sec": n_lines / batched_time},
+        {"mode": "compiled", "seconds": compiled_time, "lines_per_sec": n_lines / compiled_time},
+    ]
+    print(f"{len(pdf_paths)} PDFs, {n_lines} classified lines")
+    print(pd.DataFrame(rows).to_string(index=False, float_format="%.2f"))
+    print(f"Speedup: {per_line_time / batched_time:.1f}x batched, {per_line_time / compiled_time:.1f}x compiled")
+
+    if batched != per_line:
+        print("❌ Batched output differs from per-line output")
+        return 1
+    if compiled != per_line:
+        print("❌ Compiled output differs from per-line output")
+        return 1
+    print("✅ Outputs identical")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,81 @@
+# benchmarks/bench_extraction.py
+#
+# Compares the text extraction backends in src/extraction.py: time spent in
+# page text extraction per backend, and whether they return the same text
+# lines in the same order, compared on the span fields the processor reads
+# (text, size, font, bbox); block boundaries may differ once image blocks no
+# longer split the text, and the processor does not use them. The docstore
+# backend's time is that of a warm store (its first pass parses and stores).
+# Also checks that opening from bytes, a memoryview and an mmap gives the same
+# lines as the path (run it with the pinned PyMuPDF as well as the latest).
+#
+# Usage (from Challenge_1a/):
+#     python -m benchmarks.bench_extraction [pdf ...]
+#     python -m benchmarks.bench_extraction ../Challenge_1b/Collection_2/PDFs/*.pdf   # image-heavy
+
+import mmap
+import os
+import sys
+import time
+from src.config import Config
+from src.extraction import BACKENDS, get_backend
+
+
+def text_lines(backend, source):
+    doc = backend.open(source)
+    pages = [[[(s["text"], s["size"], s["font"], tuple(s["bbox"])) for s in l["spans"]]
+              for b in backend.blocks(page) for l in b.get("lines", []) if l["spans"]] for page in doc]
+    doc.close()
+    return pages
+
+
+def extraction_time(backend, pdf_paths, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for path in pdf_paths:
+            doc = backend.open(path)
+            for page in doc:
+                backend.blocks(page)
+            doc.close()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(pdf_paths):
+    if not pdf_paths:
+        pdf_paths = [inp for inp, _ in Config.get_input_output_files()]
+
+    reference = get_backend("default")
+    timings = {name: extraction_time(get_backend(name), pdf_paths) for name in BACKENDS}
+    for name, seconds in timings.items():
+        print(f"{name:>8}: {seconds:.3f}s  {timings['default'] / seconds:5.1f}x")
+
+    failures = []
+    for path in pdf_paths:
+        expected = text_lines(reference, path)
+        for name in BACKENDS:
+            if text_lines(get_backend(name), path) != expected:
+                failures.append(f"{os.path.basename(path)}: backend '{name}' returns different text")
+
+        with open(path, "rb") as f:
+            data = f.read()
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        for name in ("lean", "docstore"):
+            if text_lines(get_backend(name), data) != expected:
+                failures.append(f"{os.path.basename(path)}: '{name}' from bytes returns different text")
+            if text_lines(get_backend(name), memoryview(data)) != expected:
+                failures.append(f"{os.path.basename(path)}: '{name}' from a memoryview returns different text")
+            if text_lines(get_backend(name), mapped) != expected:
+                failures.append(f"{os.path.basename(path)}: '{name}' from mmap returns different text")
+        mapped.close()
+
+    if failures:
+        print("❌ " + "\n❌ ".join(failures))
+        return 1
+    print(f"✅ Same text lines from every backend and source on {len(pdf_paths)} PDFs")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
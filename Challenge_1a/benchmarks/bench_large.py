@@ -0,0 +1,71 @@
+# benchmarks/bench_large.py
+#
+# Runtime and peak Python memory of extract_headings (or, with --stream, of
+# consuming iter_outline) on one large PDF, built by repeating the input PDFs
+# until it reaches the requested page count.
+#
+# Usage (from Challenge_1a/):
+#     python -m benchmarks.bench_large [--pages 1000] [--pdf existing.pdf] [--stream]
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import fitz
+from src.config import Config
+from src.processor import PDFProcessor
+
+
+def build_large_pdf(sources, pages, path):
+    out = fitz.open()
+    while out.page_count < pages:
+        for src_path in sources:
+            with fitz.open(src_path) as src:
+                out.insert_pdf(src, to_page=min(src.page_count, pages - out.page_count) - 1)
+            if out.page_count >= pages:
+                break
+    out.save(path)
+    out.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--pdf", default=None, help="Benchmark this PDF instead of a generated one")
+    parser.add_argument("--stream", action="store_true",
+                        help="Consume iter_outline without keeping the entries, instead of extract_headings")
+    args = parser.parse_args()
+
+    processor = PDFProcessor(Config.MODEL_PATH, Config.LABEL_MAP)
+
+    def count_entries(pdf_path):
+        if args.stream:
+            return sum(1 for _ in processor.iter_outline(pdf_path))
+        return len(processor.extract_headings(pdf_path)["outline"])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = args.pdf
+        if pdf_path is None:
+            pdf_path = os.path.join(tmp, "large.pdf")
+            build_large_pdf([inp for inp, _ in Config.get_input_output_files()], args.pages, pdf_path)
+
+        with fitz.open(pdf_path) as doc:
+            n_pages = doc.page_count
+
+        start = time.perf_counter()
+        n_entries = count_entries(pdf_path)
+        elapsed = time.perf_counter() - start
+
+        # Separate run: tracing allocations slows extraction down considerably
+        tracemalloc.start()
+        count_entries(pdf_path)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    print(f"{n_pages} pages, {n_entries} outline entries")
+    print(f"time: {elapsed:.2f}s ({n_pages / elapsed:.1f} pages/s), peak Python memory: {peak / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# benchmarks/bench_noise.py
+#
+# Microbenchmark and parity check for the precompiled noise filter in
+# src/utils.py against the original per-call implementation (kept below).
+# The corpus is every text line of the given PDFs plus a few edge cases.
+#
+# Usage (from Challenge_1a/):
+#     python -m benchmarks.bench_noise [pdf ...]
+
+import re
+import sys
+import time
+import fitz
+from src.config import Config
+from src.utils import all_stopwords, is_likely_noise, noise_mask
+
+EDGE_CASES = [
+    "", "  ", "ab", "---", "=====", "___ ", "(c) 2024", "[1] Smith et al.", "x = y + 1", "a+b", "f(x) = 2x",
+    "Page 3 of 10", "www.example.org", "Copyright ©", "arXiv:2101.00001", "john@gmail.com", "Université",
+    "1.2.3 Results", "$$$ ### !!!", "12345678", "’’’’", "and the of to in", "Introduction", "Ω ≤ Δ ≥ λ",
+]
+
+
+def reference_is_likely_noise(text):
+    text = text.strip()
+    text_lower = text.lower()
+
+    if not text or len(text) < 3:
+        return True
+
+    if re.match(r"^[\-=_*~]{3,}$", text):
+        return True
+
+    if text.startswith("(") or text.startswith("["):
+        return True
+
+    if any(w in text_lower for w in ['arxiv', 'doi', '@', '.com', '.edu', 'university',
+                                     'institute', 'gmail', 'google', 'brain', 'proceedings',
+                                     ]):
+        return True
+
+    if re.search(r'^((\(?\w+\)?\s*[\+\-\*/=<>≤≥]\s*\w+\(?\w+\)?)|(\w+\s*=\s*\w+[\+\-\*/].*?))$',
+                 text.replace(" ", "")):
+        return True
+
+    ignore_chars = set(" -&’'.,")
+    symbol_heavy_chars = [c for c in text if not c.isalpha() and c not in ignore_chars]
+    if len(symbol_heavy_chars) / len(text) > 0.5:
+        return True
+
+    words = re.findall(r'\w+', text_lower)
+    if words:
+        stop_count = sum(1 for w in words if w in all_stopwords)
+        if stop_count / len(words) > 0.8:
+            return True
+
+    if any(token in text_lower for token in ["page", "copyright", "www.", "http"]):
+        return True
+
+    return False
+
+
+def load_corpus(pdf_paths):
+    corpus = list(EDGE_CASES)
+    for path in pdf_paths:
+        with fitz.open(path) as doc:
+            for page in doc:
+                for b in page.get_text("dict")["blocks"]:
+                    for l in b.get("lines", []):
+                        corpus.append(" ".join(span["text"] for span in l["spans"]))
+    return corpus
+
+
+def best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(pdf_paths):
+    if not pdf_paths:
+        pdf_paths = [inp for inp, _ in Config.get_input_output_files()]
+    corpus = load_corpus(pdf_paths)
+
+    expected = [reference_is_likely_noise(t) for t in corpus]
+    mismatches = [t for t, e in zip(corpus, expected) if is_likely_noise(t) != e]
+    batch_ok = noise_mask(corpus) == expected
+
+    timings = {
+        "reference": best_of(lambda: [reference_is_likely_noise(t) for t in corpus]),
+        "is_likely_noise": best_of(lambda: [is_likely_noise(t) for t in corpus]),
+        "noise_mask": best_of(lambda: noise_mask(corpus)),
+    }
+
+    print(f"{len(corpus)} lines ({len(set(corpus))} distinct), {sum(expected)} flagged as noise")
+    for name, seconds in timings.items():
+        print(f"{name:>16}: {seconds * 1e3:8.2f} ms  {len(corpus) / seconds:12,.0f} lines/s  "
+              f"{timings['reference'] / seconds:5.1f}x")
+
+    if mismatches or not batch_ok:
+        print(f"❌ {len(mismatches)} verdicts differ from the reference, e.g. {mismatches[:5]}")
+        return 1
+    print("✅ Verdicts identical to the reference implementation")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
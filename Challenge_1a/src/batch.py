@@ -0,0 +1,264 @@
+# pdf_parser/batch.py
+
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from src.metrics import BATCH_STAGES, NULL_METRICS, Metrics, MetricsSummary, format_stages
+from src.processor import PDFProcessor
+from src.utils import convert_types
+
+# Per-process processor, created once by init_worker
+_processor = None
+
+
+def init_worker(model_path, label_map):
+    """
+    Pool initializer: loads the model once per worker process.
+    """
+    global _processor
+    _processor = PDFProcessor(model_path, label_map)
+
+
+def write_result(result, output_path):
+    """Writes result as JSON to output_path and returns the number of bytes written."""
+    payload = json.dumps(convert_types(result), indent=2, ensure_ascii=False).encode("utf-8")
+    with open(output_path, "wb") as f:
+        f.write(payload)
+    return len(payload)
+
+
+def process_file(input_path, output_path=None, data=None, collect_metrics=False):
+    """
+    Extracts the outline of one PDF and writes it to output_path (if given).
+    With data (the PDF's bytes), input_path only names the document.
+    Never raises: returns (record, result), where record describes the success
+    or failure and result is the JSON-ready outline (None on failure). With
+    collect_metrics, record["metrics"] holds the document's stage timings and
+    counters (see src/metrics.py).
+    """
+    start = time.perf_counter()
+    record = {"input": input_path, "output": output_path, "status": "ok", "error": None}
+    metrics = Metrics() if collect_metrics else NULL_METRICS
+    result = None
+    try:
+        result = convert_types(_processor.extract_headings(input_path if data is None else data, metrics))
+        _save(result, output_path, record, metrics)
+    except Exception as e:
+        record["status"] = "failed"
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["seconds"] = time.perf_counter() - start
+    if metrics.enabled:
+        record["metrics"] = metrics.as_dict()
+    return record, result
+
+
+def _save(result, output_path, record, metrics=NULL_METRICS):
+    if not result["title"] and not result["outline"]:
+        record["status"] = "empty"
+        record["error"] = "No valid headings or title found. Output not saved."
+    elif output_path:
+        mark = metrics.now()
+        metrics.count("bytes_written", write_result(result, output_path))
+        metrics.lap("write", mark)
+
+
+def serve_cached(input_path, output_path, result):
+    """Writes a cached result to output_path and returns its record."""
+    start = time.perf_counter()
+    record = {"input": input_path, "output": output_path, "status": "ok", "error": None, "cached": True}
+    try:
+        _save(result, output_path, record)
+    except Exception as e:
+        record["status"] = "failed"
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["seconds"] = time.perf_counter() - start
+    return record
+
+
+def _size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def print_record(record):
+    name = os.path.basename(record["input"])
+    if record["status"] == "ok":
+        cached = " [cached]" if record.get("cached") else ""
+        print(f"✅ {name} -> {record['output']} ({record['seconds']:.2f}s){cached}")
+    elif record["status"] == "empty":
+        print(f"⚠️ {name}: {record['error']}")
+    else:
+        print(f"❌ {name}: {record['error']}")
+
+
+def _failed(input_path, output_path, error):
+    return {"input": input_path, "output": output_path, "status": "failed",
+            "error": f"{type(error).__name__}: {error}", "seconds": 0.0}
+
+
+def _run_pool(pending, model_path, label_map, workers, collect_metrics, collect):
+    """
+    Runs the (input, output) pairs on a process pool with at most workers
+    documents in flight, passing each (record, result) to collect. When a
+    worker dies (e.g. crashed inside the PDF library) the pool is replaced and
+    the documents that were in flight are retried one at a time, so only the
+    document that crashes gets a failure record.
+    """
+    def start_pool():
+        return ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(model_path, label_map))
+
+    def finish(future, pair):
+        """Collects a finished document; returns the error if the pool broke under it."""
+        try:
+            record, result = future.result()
+        except BrokenProcessPool as e:
+            return e
+        except Exception as e:
+            record, result = _failed(*pair, e), None
+        collect(record, result)
+        return None
+
+    queue, retry = deque(pending), deque()
+    in_flight = {}
+    pool = start_pool()
+    try:
+        while queue or retry or in_flight:
+            if retry:
+                if not in_flight:
+                    pair = retry.popleft()
+                    in_flight[pool.submit(process_file, *pair, None, collect_metrics)] = pair
+            else:
+                while queue and len(in_flight) < workers:
+                    pair = queue.popleft()
+                    in_flight[pool.submit(process_file, *pair, None, collect_metrics)] = pair
+            alone = len(in_flight) == 1
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            broken = []
+            for future in done:
+                pair = in_flight.pop(future)
+                error = finish(future, pair)
+                if error is not None:
+                    broken.append((pair, error))
+            if not broken:
+                continue
+            # Every other document in flight fails with the pool
+            for future, pair in in_flight.items():
+                error = finish(future, pair)
+                if error is not None:
+                    broken.append((pair, error))
+            in_flight.clear()
+            if alone:
+                collect(_failed(*broken[0][0], broken[0][1]), None)
+            else:
+                retry.extend(pair for pair, _ in broken)
+            pool.shutdown(wait=False, cancel_futures=True)
+            pool = start_pool()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def run_batch(input_output_pairs, model_path, label_map, workers=1, cache=None, collect_metrics=False):
+    """
+    Processes all (input, output) pairs, largest PDF first, and returns
+    (records, summary). With workers > 1 documents are spread over a process
+    pool; a failing document only produces a failure record for itself.
+    Documents found in the optional ResultCache are served without loading
+    the model; fresh results are stored back into it. With collect_metrics,
+    every extracted record carries its metrics and summary["metrics"] holds
+    their aggregate plus the batch's own stage timings.
+    """
+    pairs = sorted(input_output_pairs, key=lambda pair: _size(pair[0]), reverse=True)
+    total_bytes = sum(_size(inp) for inp, _ in pairs)
+    records = []
+    start = time.perf_counter()
+    metrics = Metrics(BATCH_STAGES, ()) if collect_metrics else NULL_METRICS
+    mark = metrics.now()
+
+    pending = []
+    keys = {}
+    for input_path, output_path in pairs:
+        if cache is None or not cache.enabled:
+            pending.append((input_path, output_path))
+            continue
+        try:
+            keys[input_path] = cache.key(input_path)
+        except OSError:
+            # Let the extractor report the unreadable file
+            pending.append((input_path, output_path))
+            continue
+        result = cache.get(keys[input_path])
+        if result is None:
+            pending.append((input_path, output_path))
+        else:
+            record = serve_cached(input_path, output_path, result)
+            print_record(record)
+            records.append(record)
+    mark = metrics.lap("cache_lookup", mark)
+
+    def collect(record, result):
+        if result is not None and record["input"] in keys:
+            try:
+                cache.put(keys[record["input"]], result)
+            except OSError as e:
+                print(f"Warning: could not cache result for {record['input']}: {e}")
+        print_record(record)
+        records.append(record)
+
+    if pending and workers <= 1:
+        init_worker(model_path, label_map)
+        for input_path, output_path in pending:
+            collect(*process_file(input_path, output_path, collect_metrics=collect_metrics))
+    elif pending:
+        _run_pool(pending, model_path, label_map, min(workers, len(pending)), collect_metrics, collect)
+
+    mark = metrics.lap("extract", mark)
+
+    if cache is not None:
+        cache.evict()
+    metrics.lap("cache_evict", mark)
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        "files": len(records),
+        "ok": sum(r["status"] == "ok" for r in records),
+        "empty": sum(r["status"] == "empty" for r in records),
+        "failed": sum(r["status"] == "failed" for r in records),
+        "workers": workers,
+        "seconds": elapsed,
+        "files_per_sec": len(records) / elapsed if elapsed else 0.0,
+        "mb_per_sec": total_bytes / 1e6 / elapsed if elapsed else 0.0,
+    }
+    if cache is not None:
+        summary["cache"] = cache.stats()
+    if metrics.enabled:
+        summary["metrics"] = {**MetricsSummary.from_records(records).as_dict(), "batch_stages": metrics.stages}
+    return records, summary
+
+
+def print_summary(records, summary):
+    print(
+        f"\nProcessed {summary['files']} files with {summary['workers']} worker(s) in {summary['seconds']:.2f}s "
+        f"({summary['files_per_sec']:.2f} files/s, {summary['mb_per_sec']:.2f} MB/s): "
+        f"{summary['ok']} ok, {summary['empty']} empty, {summary['failed']} failed"
+    )
+    if summary.get("cache", {}).get("enabled"):
+        cache = summary["cache"]
+        print(f"Cache: {cache['hits']} hits, {cache['misses']} misses "
+              f"({cache['hit_rate']:.0%} hit rate), {cache['evictions']} evicted")
+    if "metrics" in summary:
+        metrics = summary["metrics"]
+        counters = metrics["counters"]
+        print(f"Stages: {format_stages(metrics['stages'])}")
+        print(f"Counters: {counters['pages']} pages, {counters['lines']} lines, {counters['spans']} spans, "
+              f"{counters['candidates']} heading candidates, {counters['filtered_lines']} filtered as noise, "
+              f"{counters['headings']} headings, {counters['bytes_written']} bytes written")
+        for doc in metrics["slowest"]:
+            print(f"   🐢 {os.path.basename(doc['input'])}: {doc['seconds']:.2f}s, {doc['pages']} pages")
+    for record in records:
+        if record["status"] == "failed":
+            print(f"   ❌ {record['input']}: {record['error']}")
@@ -0,0 +1,134 @@
+# pdf_parser/cache.py
+
+import hashlib
+import json
+import os
+from src.config import Config
+
+# Bump when a code change alters extract_headings output, to drop old entries
+CACHE_FORMAT_VERSION = 1
+
+_CHUNK_SIZE = 1 << 20
+
+
+def file_digest(path):
+    """SHA-256 hex digest of a file's contents, read in chunks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def settings_digest(model_path):
+    """
+    Digest of everything besides the PDF that determines the extracted outline:
+    the model file contents, the label map and feature order the model is
+    read with, the extraction backend and the classification window. (The
+    filtering thresholds in Config are not read by the extraction path, which
+    has its own constants, so they are left out.)
+    """
+    settings = {
+        "version": CACHE_FORMAT_VERSION,
+        "model": file_digest(model_path),
+        "label_map": {int(k): v for k, v in Config.LABEL_MAP.items()},
+        "feature_columns": Config.FEATURE_COLUMNS,
+        "extraction_backend": Config.EXTRACTION_BACKEND,
+        "classify_window_pages": Config.CLASSIFY_WINDOW_PAGES,
+    }
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    On-disk cache of extract_headings results, one JSON file per entry.
+
+    Keys combine the PDF content hash with settings_digest(), so a changed
+    PDF, model or extraction setting never hits a stale entry. Entries are evicted
+    least-recently-used first (by file mtime, refreshed on every hit) once the
+    cache exceeds max_bytes.
+
+    enabled=False bypasses the cache entirely; rebuild=True ignores existing
+    entries but still stores fresh results.
+    """
+    def __init__(self, cache_dir, model_path, max_bytes, enabled=True, rebuild=False):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.rebuild = rebuild
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._settings = None
+        self._model_path = model_path
+        if enabled:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, pdf_path):
+        if self._settings is None:
+            self._settings = settings_digest(self._model_path)
+        return hashlib.sha256((file_digest(pdf_path) + self._settings).encode("ascii")).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key + ".json")
+
+    def get(self, key):
+        """Returns the cached result for key, or None on a miss."""
+        if not self.enabled or self.rebuild:
+            self.misses += 1
+            return None
+        path = self._entry_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                result = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        if not self.enabled:
+            return
+        path = self._entry_path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def evict(self):
+        """Removes least-recently-used entries until the cache fits in max_bytes."""
+        if not self.enabled:
+            return
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
@@ -1,7 +1,6 @@
 # pdf_parser/config.py
 
 import numpy as np
-import pandas as pd
 from nltk.corpus import stopwords
 import os
 from from_root import from_root # This imports the function 'from_root'
@@ -23,6 +22,8 @@ class Config:
     # Model and Labeling
     # Use the PROJECT_ROOT variable here
     MODEL_PATH = os.path.join(PROJECT_ROOT ,"model","hackathon_model_old.joblib")
+    # NumPy export of MODEL_PATH (python -m src.model export), used when present and up to date
+    COMPILED_MODEL_PATH = os.path.join(PROJECT_ROOT ,"model","hackathon_model_old.npz")
     LABEL_MAP = {
         np.int64(0): 'Unlabeled', # Body texts
         np.int64(1): 'H1',
@@ -32,7 +33,34 @@ class Config:
     }
     INPUT_DIR = INPUT_DIR
     OUTPUT_DIR = OUTPUT_DIR
-    
+
+    # Classifier input columns, in the order the feature matrix is built
+    FEATURE_COLUMNS = ["font_size", "numbering_level", "x_position", "line_spacing", "num_words", "is_centered"]
+    # Lines are classified in one batch per window of pages (None = whole document)
+    CLASSIFY_WINDOW_PAGES = 64
+
+    # Text extraction backend (see src/extraction.py): "lean" skips image decoding,
+    # "docstore" reads spans from the parsed-document store shared with Challenge_1b
+    # (docstore.py at the repository root; falls back to "lean" where it is absent)
+    EXTRACTION_BACKEND = "docstore"
+
+    # Batch processing: number of worker processes (1 = run in-process)
+    NUM_WORKERS = os.cpu_count() or 1
+
+    # On-disk cache of extraction results (see src/cache.py)
+    CACHE_DIR = os.path.join(PROJECT_ROOT, ".cache", "headings")
+    CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+    # Resident service (see src/service.py)
+    SERVICE_HOST = "127.0.0.1"
+    SERVICE_PORT = 8765
+    SERVICE_WORKERS = 1 # Warm worker processes, each holding one loaded model
+    SERVICE_QUEUE_SIZE = 8 # Jobs allowed to wait for a worker before requests get 503
+    WATCH_INTERVAL = 1.0 # Seconds between scans of INPUT_DIR in watch mode
+
+    # Per-stage timings and counters (see src/metrics.py); main also enables them for --metrics/--prometheus
+    METRICS_ENABLED = False
+
     # Text Processing and Feature Extraction
     GAP_THRESHOLD = 30
     CENTERED_X_THRESHOLD_RATIO = (0.3, 0.7) # (min_ratio, max_ratio) for x_center
@@ -0,0 +1,130 @@
+# pdf_parser/extraction.py
+
+import os
+import sys
+import fitz
+
+# Directory holding the docstore module shared with Challenge_1b (the repository root)
+SHARED_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def open_stream(buffer):
+    """fitz.open of an in-memory PDF; see PyMuPDFBackend.open."""
+    if isinstance(buffer, (bytes, bytearray)):
+        return fitz.open(stream=buffer, filetype="pdf")
+    try:
+        return fitz.open(stream=memoryview(buffer), filetype="pdf")
+    except TypeError:
+        # Older PyMuPDF: "bad type: 'stream'" for anything but bytes, bytearray or BytesIO
+        return fitz.open(stream=bytes(buffer), filetype="pdf")
+
+
+class PyMuPDFBackend:
+    """
+    Text extraction through page.get_text("dict") with PyMuPDF's default flags.
+    These also decode every image on the page into an image block, which the
+    heading extractor then skips.
+    """
+    name = "default"
+    flags = None
+
+    def open(self, source):
+        """
+        Opens a PDF from a path, or from an in-memory buffer (bytes, bytearray,
+        memoryview or mmap). bytes and bytearray are passed as is; other buffers
+        are handed to MuPDF through a memoryview, so they are not copied, except
+        on PyMuPDF versions that only take bytes (such as the pinned 1.21.1).
+        The caller must keep buffers alive while the document is in use.
+        """
+        if isinstance(source, (str, os.PathLike)):
+            return fitz.open(source)
+        return open_stream(source)
+
+    def blocks(self, page, clip=None):
+        """Returns the text dict blocks of a page, optionally clipped to a rect."""
+        return page.get_text("dict", flags=self.flags, clip=clip)["blocks"]
+
+
+class LeanPyMuPDFBackend(PyMuPDFBackend):
+    """
+    Same text as the default backend, but images are not decoded: only text
+    blocks (with ligatures and whitespace preserved, as before) are requested.
+    """
+    name = "lean"
+    flags = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+
+def import_docstore():
+    """The shared docstore module, or None when this tree was copied without it (e.g. a Docker image)."""
+    if SHARED_DIR not in sys.path:
+        sys.path.append(SHARED_DIR)
+    try:
+        import docstore
+    except ImportError:
+        return None
+    return docstore
+
+
+class _Rect:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+
+class StoredPage:
+    def __init__(self, doc, number):
+        self.doc = doc
+        self.number = number
+        width, height = doc.page_size[number].tolist()
+        self.rect = _Rect(width, height)
+
+
+class StoredPDF:
+    """A StoredDocument presented as the parts of a fitz.Document the processor uses."""
+    def __init__(self, stored):
+        self.stored = stored
+        self.page_count = stored.page_count
+
+    def __iter__(self):
+        return (StoredPage(self.stored, number) for number in range(self.page_count))
+
+    def close(self):
+        self.stored.close()
+
+
+class DocStoreBackend:
+    """
+    Spans from the parsed-document store shared with Challenge_1b (docstore.py
+    at the repository root): a PDF is parsed once, with the lean backend's
+    flags, and later runs of either pipeline read its spans from disk. Yields
+    the same blocks as the lean backend, with all lines of a page in one block.
+    """
+    name = "docstore"
+
+    def __init__(self, store_dir=None, docstore=None):
+        docstore = docstore or import_docstore()
+        self.store = docstore.DocumentStore(store_dir)
+
+    def open(self, source):
+        return StoredPDF(self.store.get(source))
+
+    def blocks(self, page, clip=None):
+        if clip is not None:
+            raise ValueError("The docstore backend does not support clipping")
+        return [{"lines": [{"spans": spans} for spans in page.doc.lines(page.number)]}]
+
+
+BACKENDS = {backend.name: backend for backend in (PyMuPDFBackend, LeanPyMuPDFBackend, DocStoreBackend)}
+
+
+def get_backend(name):
+    if name == DocStoreBackend.name:
+        docstore = import_docstore()
+        if docstore is None:
+            print("Warning: docstore module not found, using the lean extraction backend")
+            return LeanPyMuPDFBackend()
+        return DocStoreBackend(docstore=docstore)
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown extraction backend '{name}', expected one of {sorted(BACKENDS)}")
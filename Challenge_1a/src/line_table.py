@@ -0,0 +1,73 @@
+# pdf_parser/line_table.py
+
+from array import array
+import numpy as np
+
+# Bits of LineTable.flags
+BOLD = 1
+CENTERED = 2
+
+
+class LineTable:
+    """
+    Columnar store for the text lines of a document (or a window of pages).
+
+    Numeric columns live in typed arrays and every line's text is a slice of one
+    shared string buffer, addressed by start/end offsets, so a line costs a few
+    machine words instead of a dict of Python objects.
+    """
+    def __init__(self):
+        self.font_size = array("d")
+        self.x0 = array("d")
+        self.y0 = array("d")
+        self.x1 = array("d")
+        self.y1 = array("d")
+        self.line_spacing = array("d")
+        self.numbering_level = array("i")
+        self.num_words = array("i")
+        self.page = array("i")
+        self.flags = array("B")
+        self.text_start = array("q")
+        self.text_end = array("q")
+        self._chunks = []
+        self._length = 0
+        self._buffer = ""
+
+    def __len__(self):
+        return len(self.page)
+
+    def append(self, text, page, font_size, bbox, line_spacing, numbering_level, num_words, flags):
+        self.font_size.append(font_size)
+        self.x0.append(bbox[0])
+        self.y0.append(bbox[1])
+        self.x1.append(bbox[2])
+        self.y1.append(bbox[3])
+        self.line_spacing.append(line_spacing)
+        self.numbering_level.append(numbering_level)
+        self.num_words.append(num_words)
+        self.page.append(page)
+        self.flags.append(flags)
+        self.text_start.append(self._length)
+        self._length += len(text)
+        self.text_end.append(self._length)
+        self._chunks.append(text)
+
+    def text(self, i):
+        if self._chunks:
+            self._buffer += "".join(self._chunks)
+            self._chunks = []
+        return self._buffer[self.text_start[i]:self.text_end[i]]
+
+    def features(self):
+        """
+        Returns the classifier input as an (n_lines, 6) float64 matrix with
+        columns in Config.FEATURE_COLUMNS order.
+        """
+        return np.column_stack([
+            np.frombuffer(self.font_size, dtype=np.float64),
+            np.frombuffer(self.numbering_level, dtype=np.int32),
+            np.frombuffer(self.x0, dtype=np.float64),
+            np.frombuffer(self.line_spacing, dtype=np.float64),
+            np.frombuffer(self.num_words, dtype=np.int32),
+            (np.frombuffer(self.flags, dtype=np.uint8) & CENTERED) > 0,
+        ]).astype(np.float64)
@@ -1,62 +1,77 @@
 # main.py
 
+import argparse
 import json
 import os
 from src.config import Config
-from src.utils import  convert_types
-from src.processor import PDFProcessor
+from src.batch import run_batch, print_summary
+from src.cache import ResultCache
+from src.metrics import MetricsSummary
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Extract title and heading outline from PDFs.")
+    parser.add_argument("--workers", type=int, default=Config.NUM_WORKERS,
+                        help="Number of worker processes (default: all CPUs, 1 = no pool)")
+    parser.add_argument("--report", default=None,
+                        help="Optional path for a JSON report with one record per file and the summary")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Bypass the result cache (neither read nor write it)")
+    parser.add_argument("--rebuild-cache", action="store_true",
+                        help="Ignore cached results and store fresh ones")
+    parser.add_argument("--cache-dir", default=Config.CACHE_DIR,
+                        help="Directory of the result cache")
+    parser.add_argument("--metrics", default=None,
+                        help="Record per-stage timings and counters; write one JSON record per document "
+                             "to this path (JSON Lines)")
+    parser.add_argument("--prometheus", default=None,
+                        help="Record metrics and write their aggregate in Prometheus text format to this path")
+    return parser.parse_args()
 
 def main():
     """
     Main function to run the PDF heading extraction process.
     """
+    args = parse_args()
+
     input_output_pairs = Config.get_input_output_files()
     if not input_output_pairs:
         print("No PDF files found in the input directory.")
         return
 
-   
-    try:
-       
-        pdf_processor = PDFProcessor(Config.MODEL_PATH, Config.LABEL_MAP)
-    except FileNotFoundError as e:
-        print(f"Error: {e}")
+    if not os.path.exists(Config.MODEL_PATH):
+        print(f"Error: Model file not found at: {Config.MODEL_PATH}")
         print(f"Please ensure '{Config.MODEL_PATH}' exists in the current directory.")
         return
-    except Exception as e:
-        print(f"An unexpected error occurred during initialization: {e}")
-        return
 
-    # Extract headings
-    
-    for input_path, output_path in input_output_pairs:
-        try:
-            result = pdf_processor.extract_headings(input_path)
-        except FileNotFoundError as e:
-            print(f"Error: {e}")
-            print(f"Please ensure the PDF file '{output_path}' exists.")
-            return
-        except Exception as e:
-            print(f"An unexpected error occurred during heading extraction: {e}")
-            return
-
-        if not result["title"] and not result["outline"]:
-              print("⚠️ No valid headings or title found. Output not saved.")
-              return
-
-    # Save output
+    workers = max(1, min(args.workers, len(input_output_pairs)))
+    cache = ResultCache(args.cache_dir, Config.MODEL_PATH, Config.CACHE_MAX_BYTES,
+                        enabled=not args.no_cache, rebuild=args.rebuild_cache)
+    collect_metrics = Config.METRICS_ENABLED or bool(args.metrics or args.prometheus)
+    records, summary = run_batch(input_output_pairs, Config.MODEL_PATH, Config.LABEL_MAP, workers, cache,
+                                 collect_metrics)
+    print_summary(records, summary)
+
+    if args.report:
         try:
-            with open(output_path, "w", encoding="utf-8") as f:
-                json.dump(convert_types(result), f, indent=2, ensure_ascii=False)
-            print(f"✅ Extracted outline saved to {output_path}")
+            with open(args.report, "w", encoding="utf-8") as f:
+                json.dump({"summary": summary, "files": records}, f, indent=2, ensure_ascii=False)
         except IOError as e:
-            print(f"Error saving output to {output_path}: {e}")
-        except Exception as e:
-            print(f"An unexpected error occurred while saving: {e}")
+            print(f"Error saving report to {args.report}: {e}")
 
-     #   print(f"Processed {input_path} -> {output_path}")
+    if args.metrics:
+        try:
+            with open(args.metrics, "w", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except IOError as e:
+            print(f"Error saving metrics to {args.metrics}: {e}")
 
-print("All PDF files processed successfully.")
+    if args.prometheus:
+        try:
+            with open(args.prometheus, "w", encoding="utf-8") as f:
+                f.write(MetricsSummary.from_records(records).to_prometheus())
+        except IOError as e:
+            print(f"Error saving metrics to {args.prometheus}: {e}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
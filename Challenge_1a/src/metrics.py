@@ -0,0 +1,147 @@
+# pdf_parser/metrics.py
+#
+# Per-stage timings and counters for outline extraction. A Metrics object is
+# threaded through one document (or one batch); stages are timed with laps on a
+# running mark, so instrumented code reads
+#
+#     mark = metrics.now()
+#     doc = open(...)
+#     mark = metrics.lap("open", mark)
+#
+# With metrics disabled, NULL_METRICS turns every call into a no-op returning 0.
+
+import time
+
+# Stages and counters recorded for every extracted document
+STAGES = ("open", "get_text", "build_lines", "features", "predict", "noise", "write")
+COUNTERS = ("pages", "lines", "spans", "predictions", "candidates", "filtered_lines", "headings", "bytes_written")
+# Stages of a whole batch run (batch.run_batch)
+BATCH_STAGES = ("cache_lookup", "extract", "cache_evict")
+
+
+class Metrics:
+    """
+    Accumulated seconds per stage and counts per counter.
+    """
+    enabled = True
+
+    def __init__(self, stages=STAGES, counters=COUNTERS):
+        self.stages = dict.fromkeys(stages, 0.0)
+        self.counters = dict.fromkeys(counters, 0)
+
+    def now(self):
+        return time.perf_counter()
+
+    def lap(self, stage, mark):
+        """Adds the time since mark to stage and returns the new mark."""
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + now - mark
+        return now
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def as_dict(self):
+        return {"stages": dict(self.stages), "counters": dict(self.counters)}
+
+
+class NullMetrics:
+    """
+    Metrics that record nothing: the default when metrics are disabled.
+    """
+    enabled = False
+
+    def now(self):
+        return 0.0
+
+    def lap(self, stage, mark):
+        return 0.0
+
+    def count(self, name, n=1):
+        pass
+
+    def as_dict(self):
+        return None
+
+
+NULL_METRICS = NullMetrics()
+
+
+class MetricsSummary:
+    """
+    Aggregate of per-document records (as produced by batch.process_file):
+    documents per status, summed stage seconds and counters, and the slowest
+    documents. Renders as a dict or as Prometheus text exposition.
+    """
+    def __init__(self, slowest=5):
+        self.documents = {"ok": 0, "empty": 0, "failed": 0}
+        self.cached = 0
+        self.seconds = 0.0
+        self.stages = dict.fromkeys(STAGES, 0.0)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.slowest = []
+        self.n_slowest = slowest
+
+    @classmethod
+    def from_records(cls, records):
+        summary = cls()
+        for record in records:
+            summary.add(record)
+        return summary
+
+    def add(self, record):
+        self.documents[record["status"]] = self.documents.get(record["status"], 0) + 1
+        if record.get("cached"):
+            self.cached += 1
+        self.seconds += record.get("seconds", 0.0)
+
+        metrics = record.get("metrics")
+        if not metrics:
+            return
+        for stage, seconds in metrics["stages"].items():
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        for name, n in metrics["counters"].items():
+            self.counters[name] = self.counters.get(name, 0) + n
+        self.slowest.append({"input": record["input"], "seconds": record["seconds"],
+                             "pages": metrics["counters"]["pages"]})
+        self.slowest.sort(key=lambda doc: doc["seconds"], reverse=True)
+        del self.slowest[self.n_slowest:]
+
+    def as_dict(self):
+        return {
+            "documents": dict(self.documents),
+            "cached": self.cached,
+            "seconds": self.seconds,
+            "stages": dict(self.stages),
+            "counters": dict(self.counters),
+            "slowest": list(self.slowest),
+        }
+
+    def to_prometheus(self, prefix="pdf_outline"):
+        lines = [
+            f"# HELP {prefix}_documents_total Documents processed, by status.",
+            f"# TYPE {prefix}_documents_total counter",
+        ]
+        lines += [f'{prefix}_documents_total{{status="{status}"}} {n}' for status, n in self.documents.items()]
+        lines += [
+            f"# HELP {prefix}_cached_documents_total Documents served from the result cache.",
+            f"# TYPE {prefix}_cached_documents_total counter",
+            f"{prefix}_cached_documents_total {self.cached}",
+            f"# HELP {prefix}_document_seconds_total Wall time spent per document, summed.",
+            f"# TYPE {prefix}_document_seconds_total counter",
+            f"{prefix}_document_seconds_total {self.seconds:.6f}",
+            f"# HELP {prefix}_stage_seconds_total Time spent in each extraction stage, summed over documents.",
+            f"# TYPE {prefix}_stage_seconds_total counter",
+        ]
+        lines += [f'{prefix}_stage_seconds_total{{stage="{stage}"}} {seconds:.6f}'
+                  for stage, seconds in self.stages.items()]
+        for name, n in self.counters.items():
+            lines += [f"# TYPE {prefix}_{name}_total counter", f"{prefix}_{name}_total {n}"]
+        return "\n".join(lines) + "\n"
+
+
+def format_stages(stages):
+    """One-line breakdown of stage seconds, largest share first."""
+    total = sum(stages.values()) or 1.0
+    parts = sorted(stages.items(), key=lambda item: item[1], reverse=True)
+    return ", ".join(f"{stage} {seconds:.2f}s ({seconds / total:.0%})" for stage, seconds in parts if seconds)
@@ -0,0 +1,234 @@
+# pdf_parser/model.py
+#
+# Heading classifier loading, plus a compiled form of the scikit-learn model:
+# the preprocessing and every tree of the forest flattened into NumPy arrays
+# and evaluated for a whole feature matrix at once, without sklearn or pandas.
+#
+#     python -m src.model export    # Config.MODEL_PATH -> Config.COMPILED_MODEL_PATH
+#     python -m src.model verify    # parity with clf.predict on the bundled PDFs
+
+import argparse
+import os
+import sys
+import numpy as np
+from src.cache import file_digest
+from src.config import Config
+
+
+class SklearnModel:
+    """
+    Adapter giving the joblib pipeline the same predict(features) interface as
+    CompiledForest: a float matrix with columns in Config.FEATURE_COLUMNS order.
+    """
+    def __init__(self, model_path):
+        import joblib
+        self.clf = joblib.load(model_path)
+
+    def predict(self, features):
+        import pandas as pd
+        return self.clf.predict(pd.DataFrame(features, columns=Config.FEATURE_COLUMNS))
+
+
+class CompiledForest:
+    """
+    Vectorized evaluator for an exported forest.
+
+    Inputs are mapped to the model's columns with a per-column affine transform
+    (the scaler) and cast to float32, as sklearn's trees do. All (tree, sample)
+    pairs then descend together, one level per step; pairs that reach a leaf are
+    dropped from the working set, so shallow branches cost nothing afterwards.
+    """
+    def __init__(self, arrays):
+        self.columns = arrays["columns"]
+        self.offset = arrays["offset"]
+        self.scale = arrays["scale"]
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.classes = arrays["classes"]
+        self.source_digest = str(arrays["source_digest"])
+        # children[2 * node + go_right]; leaves point to themselves
+        self.children = np.stack([arrays["left"], arrays["right"]], axis=1).ravel()
+        self.is_leaf = arrays["left"] == np.arange(len(arrays["left"]))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls({name: data[name] for name in data.files})
+
+    def apply(self, features):
+        """Returns the (n_trees, n_samples) matrix of leaf node ids."""
+        X = ((np.asarray(features, dtype=np.float64)[:, self.columns] - self.offset) / self.scale).astype(np.float32)
+        n_samples, n_columns = X.shape
+        n_pairs = len(self.roots) * n_samples
+        values = X.ravel()
+
+        # Working set of (tree, sample) pairs, tree-major
+        nodes = np.repeat(self.roots, n_samples)
+        row_offset = np.tile(np.arange(n_samples) * n_columns, len(self.roots))
+        pair = np.arange(n_pairs)
+        leaves = np.empty(n_pairs, dtype=np.intp)
+        while len(pair):
+            done = self.is_leaf[nodes]
+            leaves[pair[done]] = nodes[done]
+            active = ~done
+            nodes, row_offset, pair = nodes[active], row_offset[active], pair[active]
+            go_right = values[self.feature[nodes] + row_offset] > self.threshold[nodes]
+            nodes = self.children[2 * nodes + go_right]
+        return leaves.reshape(len(self.roots), n_samples)
+
+    def predict_proba(self, features):
+        # Summing over axis 0 adds tree by tree, in order, as RandomForestClassifier does
+        proba = self.value[self.apply(features)].sum(axis=0)
+        proba /= len(self.roots)
+        return proba
+
+    def predict(self, features):
+        if len(features) == 0:
+            return self.classes[:0]
+        return self.classes[np.argmax(self.predict_proba(features), axis=1)]
+
+
+def _column_transform(preprocessor):
+    """
+    Returns (columns, offset, scale): for every column the forest sees, the
+    index of its source in Config.FEATURE_COLUMNS and the affine transform
+    (x - offset) / scale applied to it.
+    """
+    columns, offset, scale = [], [], []
+    for name, transformer, cols in preprocessor.transformers_:
+        if transformer == "drop":
+            continue
+        cols = [preprocessor.feature_names_in_[c] if isinstance(c, (int, np.integer)) else c for c in cols]
+        if transformer == "passthrough" or (type(transformer).__name__ == "FunctionTransformer"
+                                            and transformer.func is None):
+            center = np.zeros(len(cols))
+            factor = np.ones(len(cols))
+        elif type(transformer).__name__ == "RobustScaler":
+            center = transformer.center_ if transformer.with_centering else np.zeros(len(cols))
+            factor = transformer.scale_ if transformer.with_scaling else np.ones(len(cols))
+        elif type(transformer).__name__ == "StandardScaler":
+            center = transformer.mean_ if transformer.with_mean else np.zeros(len(cols))
+            factor = transformer.scale_ if transformer.with_std else np.ones(len(cols))
+        else:
+            raise ValueError(f"Cannot compile preprocessing step '{name}' ({type(transformer).__name__})")
+        columns.extend(Config.FEATURE_COLUMNS.index(c) for c in cols)
+        offset.extend(center)
+        scale.extend(factor)
+    return np.array(columns, dtype=np.intp), np.array(offset, dtype=np.float64), np.array(scale, dtype=np.float64)
+
+
+def export_forest(model_path, out_path):
+    """
+    Flattens the joblib pipeline (column scaler + random forest) at model_path
+    into NumPy arrays and saves them to out_path (.npz).
+    """
+    import joblib
+    pipeline = joblib.load(model_path)
+    steps = getattr(pipeline, "named_steps", {})
+    preprocessor, forest = steps.get("preprocessor"), steps.get("classifier")
+    if preprocessor is None or not hasattr(forest, "estimators_") or not hasattr(forest.estimators_[0], "tree_"):
+        raise ValueError(f"Only preprocessor + tree-ensemble pipelines can be compiled, got {pipeline!r}")
+
+    columns, offset, scale = _column_transform(preprocessor)
+    feature, threshold, left, right, value, roots = [], [], [], [], [], []
+    base = 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        is_leaf = tree.children_left == -1
+        node_ids = np.arange(tree.node_count)
+        roots.append(base)
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+        left.append(np.where(is_leaf, node_ids, tree.children_left) + base)
+        right.append(np.where(is_leaf, node_ids, tree.children_right) + base)
+        # Per-tree class probabilities, normalized as DecisionTreeClassifier.predict_proba does
+        proba = tree.value[:, 0, :].astype(np.float64)
+        normalizer = proba.sum(axis=1)
+        normalizer[normalizer == 0.0] = 1.0
+        value.append(proba / normalizer[:, None])
+        base += tree.node_count
+
+    np.savez(
+        out_path,
+        columns=columns,
+        offset=offset,
+        scale=scale,
+        feature=np.concatenate(feature).astype(np.intp),
+        threshold=np.concatenate(threshold),
+        left=np.concatenate(left).astype(np.intp),
+        right=np.concatenate(right).astype(np.intp),
+        value=np.concatenate(value),
+        roots=np.array(roots, dtype=np.intp),
+        classes=forest.classes_,
+        source_digest=file_digest(model_path),
+    )
+
+
+def load_model(model_path, compiled_path=None):
+    """
+    Loads the heading classifier. Uses the compiled forest at compiled_path when
+    it exists and was exported from the current model_path; otherwise falls
+    back to the joblib pipeline.
+    """
+    if compiled_path and os.path.exists(compiled_path):
+        compiled = CompiledForest.load(compiled_path)
+        if compiled.source_digest == file_digest(model_path):
+            return compiled
+        print(f"Warning: {compiled_path} was exported from a different model, using {model_path}")
+    return SklearnModel(model_path)
+
+
+def verify(model_path, compiled_path, pdf_paths):
+    """Checks CompiledForest.predict against clf.predict; returns the mismatch count."""
+    from src.processor import PDFProcessor
+
+    features = []
+
+    class Recorder(PDFProcessor):
+        def _predict(self, matrix):
+            features.append(matrix)
+            return super()._predict(matrix)
+
+    recorder = Recorder(model_path, Config.LABEL_MAP)
+    recorder.clf = SklearnModel(model_path)
+    for path in pdf_paths:
+        recorder.extract_headings(path)
+
+    rng = np.random.default_rng(0)
+    real = np.concatenate(features)
+    # Perturbed copies of real rows exercise more of every tree
+    noisy = real * rng.uniform(0.5, 1.5, real.shape)
+    matrix = np.concatenate([real, noisy])
+
+    expected = SklearnModel(model_path).predict(matrix)
+    actual = CompiledForest.load(compiled_path).predict(matrix)
+    mismatches = int(np.sum(expected != actual))
+    print(f"{len(matrix)} rows, {mismatches} mismatches")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or verify the compiled heading classifier.")
+    parser.add_argument("command", choices=["export", "verify"])
+    parser.add_argument("--model", default=Config.MODEL_PATH)
+    parser.add_argument("--out", default=Config.COMPILED_MODEL_PATH)
+    parser.add_argument("pdfs", nargs="*", help="PDFs whose lines are used by verify (default: input/)")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_forest(args.model, args.out)
+        print(f"✅ Exported {args.model} -> {args.out}")
+        return 0
+
+    pdf_paths = args.pdfs or [inp for inp, _ in Config.get_input_output_files()]
+    if verify(args.model, args.out, pdf_paths):
+        print("❌ Compiled model disagrees with clf.predict")
+        return 1
+    print("✅ Compiled model matches clf.predict")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
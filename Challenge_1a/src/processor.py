@@ -1,187 +1,304 @@
-import fitz
-import joblib
 import os
-import pandas as pd
 from src.config import Config
-from src.utils import compute_numbering_level, is_likely_noise
+from src.extraction import get_backend
+from src.line_table import LineTable, BOLD, CENTERED
+from src.metrics import NULL_METRICS
+from src.model import load_model
+from src.utils import compute_numbering_level, noise_mask
+
+class OutlineStream:
+    """
+    Iterator over the outline entries produced by PDFProcessor.iter_outline.
+    The document title is known once the page-1 state is final, but only
+    reported after the last entry: it is available as `.title` after iteration.
+    """
+    def __init__(self, entries):
+        self._entries = entries
+        self.title = None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._entries)
+        except StopIteration as stop:
+            self.title = stop.value
+            raise
 
 class PDFProcessor:
     """
     Core class for extracting headings and names from a PDF document.
     """
-    def __init__(self, model_path, label_map):
+    def __init__(self, model_path, label_map, backend=None):
         """
-        Initializes the PDFProcessor with the classification model, label mapping, and text filters.
+        Initializes the PDFProcessor with the classification model, label mapping, and
+        text extraction backend (Config.EXTRACTION_BACKEND unless given by name).
         """
         if not os.path.exists(model_path):
             raise FileNotFoundError(f"Model file not found at: {model_path}")
-        self.clf = joblib.load(model_path)
+        self.clf = load_model(model_path, Config.COMPILED_MODEL_PATH)
         self.label_map = label_map
+        self.backend = get_backend(backend or Config.EXTRACTION_BACKEND)
+
+    def _predict(self, features):
+        """
+        Classifies a (n_lines, 6) feature matrix with a single vectorized predict.
+        """
+        return self.clf.predict(features)
+
+    def _label_lines(self, table, metrics=NULL_METRICS):
+        """
+        Classifies every line in the table and returns the non-noise headings as
+        (level, text, page) tuples in document order, without duplicates. Tables
+        cover whole pages and the page is part of the tuple, so duplicates can
+        only occur within one table.
+        """
+        headings = []
+        seen = set()
+        if not len(table):
+            return headings
+
+        mark = metrics.now()
+        features = table.features()
+        mark = metrics.lap("features", mark)
+        preds = self._predict(features)
+        mark = metrics.lap("predict", mark)
+
+        # Only labeled lines can become headings, so only they are noise-checked
+        labels = [self.label_map.get(pred, "Unlabeled") for pred in preds]
+        candidates = [i for i, label in enumerate(labels) if label != "Unlabeled"]
+        noise = noise_mask([table.text(i) for i in candidates])
+        metrics.lap("noise", mark)
+        metrics.count("lines", len(table))
+        metrics.count("predictions", len(preds))
+        metrics.count("candidates", len(candidates))
+        metrics.count("filtered_lines", sum(noise))
+
+        for i, is_noise in zip(candidates, noise):
+            if is_noise:
+                continue
+
+            heading = (labels[i], table.text(i), table.page[i])
+            if heading not in seen:
+                seen.add(heading)
+                headings.append(heading)
+
+        return headings
+
+    def extract_headings(self, pdf_path, metrics=NULL_METRICS):
+        """
+        Returns {"title": ..., "outline": [...]} for a PDF. Stage timings and
+        counters are recorded into metrics (see src/metrics.py) if given.
+        """
+        stream = OutlineStream(self.iter_outline(pdf_path, metrics))
+        outline = list(stream)
+
+        result = {
+            "title": stream.title,
+            "outline": outline
+        }
+
+        return result
+
+    def iter_outline(self, pdf_path, metrics=NULL_METRICS):
+        """
+        Generator over the outline entries of a PDF, in document order. pdf_path
+        may also be an in-memory PDF (bytes or mmap, see src/extraction.py).
+
+        Pages are read in windows of Config.CLASSIFY_WINDOW_PAGES; each page's
+        text dict is dropped as soon as its lines are in the LineTable, and the
+        window's entries are yielded once it is classified. Only the page-1
+        title state and a few counters outlive a window, so memory does not grow
+        with the page count. The title is the generator's return
+        value (wrap it in OutlineStream to read it).
+        """
+        table = LineTable()
+        window = Config.CLASSIFY_WINDOW_PAGES
+        # Fallback title: text and font size of the largest line on page 1
+        largest_text = ""
+        largest_size = 0.0
+        # Whether the heading that repeats the title has been looked for yet
+        title_resolved = False
+        first_h1 = None
+        first_entry = None
 
-    def extract_headings(self, pdf_path):
-        doc = fitz.open(pdf_path)
-        lines = []
-        largest_font_line = {"text": "", "size": 0.0, "page": 1, "is_bold": False, "is_centered": False}
-        
         title = "" 
         curr_font_size = 0.0
         prev_y =  0.0 
+        n_spans = 0
 
-        for page_num, page in enumerate(doc):
-            blocks = page.get_text("dict")["blocks"]
-            y_max = page.rect.height
-            for b in blocks:
-                
-                if "lines" not in b:
+        def flush(table):
+            nonlocal title_resolved, first_h1, first_entry
+            for level, text, page in self._label_lines(table, metrics):
+                # The first line matching the detected title is not repeated in the outline
+                if not title_resolved:
+                    if level == "TITLE" and text.strip() != title.strip():
+                        title_resolved = True
+                    elif text.strip() == title.strip():
+                        title_resolved = True
+                        continue
+
+                if level == "TITLE":
                     continue
 
-                for l in b["lines"]:
+                if first_entry is None:
+                    first_entry = text
+                if first_h1 is None and level.upper() == "H1":
+                    first_h1 = text
+                metrics.count("headings")
+                yield {"level": level, "text": text, "page": page}
+
+        mark = metrics.now()
+        doc = self.backend.open(pdf_path)
+        mark = metrics.lap("open", mark)
+        try:
+            for page_num, page in enumerate(doc):
+                if window and page_num and page_num % window == 0:
+                    yield from flush(table)
+                    table = LineTable()
+                    # Time the consumer spends between entries is not ours
+                    mark = metrics.now()
 
-                    spans = l["spans"]
-                    if not spans:
+                y_max = page.rect.height
+                page_width = page.rect.width
+                blocks = self.backend.blocks(page)
+                mark = metrics.lap("get_text", mark)
+                # The page's text dict is freed (del blocks) as soon as its lines are in the table
+                for b in blocks:
+                
+                    if "lines" not in b:
                         continue
 
-                    spans.sort(key=lambda s: s["bbox"][0])
+                    for l in b["lines"]:
+
+                        spans = l["spans"]
+                        if not spans:
+                            continue
+                        n_spans += len(spans)
+
+                        spans.sort(key=lambda s: s["bbox"][0])
                     
-                    line_text = ""
-                    prev_end = 0
-                    fonts = []
-                    word_count = 0
-                    gap_threshold = 10
-
-                    if len(spans) <= 4:
-                        for span in spans:
-                            x_start = span["bbox"][0]
-                            if prev_end and x_start - prev_end > gap_threshold:
-                                line_text += " "
-                            text = span["text"].strip()
+                        line_text = ""
+                        prev_end = 0
+                        size_sum = 0
+                        n_fonts = 0
+                        is_bold = False
+                        word_count = 0
+                        gap_threshold = 10
+
+                        if len(spans) <= 4:
+                            for span in spans:
+                                x_start = span["bbox"][0]
+                                if prev_end and x_start - prev_end > gap_threshold:
+                                    line_text += " "
+                                text = span["text"].strip()
                             
                             
 
-                            if span["size"] > curr_font_size and page_num == 0  and span["bbox"][1] < y_max * 0.2:
-                                curr_font_size = span["size"]
-                                curr_font_size = span["size"]
-                                prev_y = span["bbox"][1]
-                                title = text
+                                if span["size"] > curr_font_size and page_num == 0  and span["bbox"][1] < y_max * 0.2:
+                                    curr_font_size = span["size"]
+                                    curr_font_size = span["size"]
+                                    prev_y = span["bbox"][1]
+                                    title = text
                               
                               
-                            elif span["size"] == curr_font_size and abs(span["bbox"][1] - prev_y) < 5  and text != title and page_num == 0 and  span["bbox"][1] < y_max * 0.2:                             
-                                prev_y = span["bbox"][1]
-                                title += " " + text
+                                elif span["size"] == curr_font_size and abs(span["bbox"][1] - prev_y) < 5  and text != title and page_num == 0 and  span["bbox"][1] < y_max * 0.2:                             
+                                    prev_y = span["bbox"][1]
+                                    title += " " + text
 
-                            if not text:
-                                continue
+                                if not text:
+                                    continue
                             
-                            line_text += text
-                            prev_end = span["bbox"][2]
-                            fonts.append((span["size"], "Bold" in span["font"], span["font"]))
-                            word_count += len(text.split())
-                    else:
-                        for span in spans:
-                            text = span["text"].strip()
+                                line_text += text
+                                prev_end = span["bbox"][2]
+                                size_sum += span["size"]
+                                n_fonts += 1
+                                is_bold = is_bold or "Bold" in span["font"]
+                                word_count += len(text.split())
+                        else:
+                            for span in spans:
+                                text = span["text"].strip()
                          
                          
-                            if span["size"] > curr_font_size and page_num == 0  and  span["bbox"][1] < y_max * 0.3:
-                                curr_font_size = span["size"]
-                                curr_font_size = span["size"]
-                                prev_y = span["bbox"][1]
-                                title = text
+                                if span["size"] > curr_font_size and page_num == 0  and  span["bbox"][1] < y_max * 0.3:
+                                    curr_font_size = span["size"]
+                                    curr_font_size = span["size"]
+                                    prev_y = span["bbox"][1]
+                                    title = text
                             
                             
-                            elif span["size"] == curr_font_size and abs(span["bbox"][1] - prev_y) < 5 and text != title and page_num == 0  and  span["bbox"][1] < y_max * 0.:                             
-                                prev_y = span["bbox"][1]
-                                title += " " + text
+                                elif span["size"] == curr_font_size and abs(span["bbox"][1] - prev_y) < 5 and text != title and page_num == 0  and  span["bbox"][1] < y_max * 0.:                             
+                                    prev_y = span["bbox"][1]
+                                    title += " " + text
 
-                            if not text:
-                                continue
-                            line_text += text + " "
-                            fonts.append((span["size"], "Bold" in span["font"], span["font"]))
-                            word_count += len(text.split())
+                                if not text:
+                                    continue
+                                line_text += text + " "
+                                size_sum += span["size"]
+                                n_fonts += 1
+                                is_bold = is_bold or "Bold" in span["font"]
+                                word_count += len(text.split())
 
 
 
                  
                  
-                    clean_text = line_text.strip()
-                    if not clean_text:
-                        continue
+                        clean_text = line_text.strip()
+                        if not clean_text:
+                            continue
 
-                    avg_font_size = sum(f[0] for f in fonts) / len(fonts)
-                    is_bold = any(f[1] for f in fonts)
-                    y_positions = [span["bbox"][1] for span in spans]
-                    line_spacing = abs(max(y_positions) - min(y_positions)) if len(y_positions) > 1 else 0
-
-                    x0 = spans[0]["bbox"][0]
-                    x_center = (spans[0]["bbox"][0] + spans[-1]["bbox"][2]) / 2
-                    page_width = page.rect.width
-                    is_centered = int(page_width * 0.3 < x_center < page_width * 0.7)
-
-                    numbering_level = compute_numbering_level(clean_text)
-
-                    features = pd.DataFrame([{
-                        "font_size": avg_font_size,
-                        "numbering_level": numbering_level,
-                        "x_position": x0,
-                        "line_spacing": line_spacing,
-                        "num_words": word_count,
-                        "is_centered": is_centered
-                    }])
-
-                    pred = self.clf.predict(features)[0]
-                    label = self.label_map.get(pred, "Unlabeled")
-                    
-                    curr_res = {
-                        "level": label,
-                        "text": clean_text,
-                        "page": page_num + 1
-                    }
-
-                    if (label != "Unlabeled" or avg_font_size > 12) and not is_likely_noise(clean_text) and curr_res not in lines:
-                        if label != "Unlabeled":
-                            lines.append(curr_res)
-
-                    # Enhanced fallback detection for title line
-                    if page_num == 0 and (
-                        avg_font_size > largest_font_line["size"] or
-                        (avg_font_size == largest_font_line["size"] and is_centered and is_bold)
-                    ) and len(clean_text.split()) >= 3:
-                        largest_font_line = {
-                            "text": clean_text,
-                            "size": avg_font_size,
-                            "page": 1,
-                            "is_bold": is_bold,
-                            "is_centered": is_centered
-                        }
-
-        
-        for item in lines:
-            if item["level"] == "TITLE" and item["text"].strip() != title.strip():
-                item["label"] = "H1"
-                break
-            if  item["text"].strip() == title.strip():
-                item["level"] = "Unlabeled"
-                break
-
-        outline = [entry for entry in lines if entry["level"] != "TITLE" and entry["level"] != "Unlabeled"]
+                        avg_font_size = size_sum / n_fonts
+                        y_positions = [span["bbox"][1] for span in spans]
+                        line_spacing = abs(max(y_positions) - min(y_positions)) if len(y_positions) > 1 else 0
+
+                        x0 = spans[0]["bbox"][0]
+                        x1 = spans[-1]["bbox"][2]
+                        x_center = (x0 + x1) / 2
+                        is_centered = int(page_width * 0.3 < x_center < page_width * 0.7)
+
+                        numbering_level = compute_numbering_level(clean_text)
+
+                        table.append(
+                            clean_text,
+                            page_num + 1,
+                            avg_font_size,
+                            (x0, min(y_positions), x1, max(span["bbox"][3] for span in spans)),
+                            line_spacing,
+                            numbering_level,
+                            word_count,
+                            (BOLD if is_bold else 0) | (CENTERED if is_centered else 0)
+                        )
+
+                        # Enhanced fallback detection for title line
+                        if page_num == 0 and (
+                            avg_font_size > largest_size or
+                            (avg_font_size == largest_size and is_centered and is_bold)
+                        ) and len(clean_text.split()) >= 3:
+                            largest_text = clean_text
+                            largest_size = avg_font_size
+
+                del blocks
+                mark = metrics.lap("build_lines", mark)
+
+            metrics.count("pages", doc.page_count)
+            metrics.count("spans", n_spans)
+        finally:
+            doc.close()
+        # Closing the document counts towards "open"
+        metrics.lap("open", mark)
+        yield from flush(table)
 
         # Fallback: use largest font line from page 1 if no title found
-        if not title and largest_font_line["text"]:
-            title = largest_font_line["text"]
+        if not title and largest_text:
+            title = largest_text
 
         # Secondary fallback: use first H1
-        if not title:
-            for entry in outline:
-                if entry["level"].upper() == "H1":
-                    title = entry["text"]
-                    break
+        if not title and first_h1 is not None:
+            title = first_h1
 
         # Final fallback: use first outline entry
-        if not title and outline:
-            title = outline[0]["text"]
-
-        result = {
-            "title": title,
-            "outline": outline
-        }
+        if not title and first_entry is not None:
+            title = first_entry
 
-        return result
\ No newline at end of file
+        return title
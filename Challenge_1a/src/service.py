@@ -0,0 +1,320 @@
+# pdf_parser/service.py
+#
+# Resident extraction service: pays for imports, stopwords and model loading
+# once, then serves jobs over local HTTP (TCP or Unix socket) or by watching
+# Config.INPUT_DIR.
+#
+#     python -m src.service                      # HTTP on Config.SERVICE_HOST:SERVICE_PORT
+#     python -m src.service --socket /tmp/pdf.sock
+#     python -m src.service --watch              # INPUT_DIR -> OUTPUT_DIR
+#
+#     curl -s localhost:8765/extract -H 'Content-Type: application/json' -d '{"input": "file01.pdf"}'
+#     curl -s localhost:8765/extract -H 'Content-Type: application/pdf' --data-binary @file01.pdf
+
+import argparse
+import json
+import os
+import socketserver
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src import batch
+from src.config import Config
+from src.metrics import MetricsSummary
+
+
+def _warm_up():
+    return os.getpid()
+
+
+class ExtractionService:
+    """
+    Keeps `workers` processes, each with a loaded PDFProcessor, and runs
+    extraction jobs on them. At most workers + queue_size jobs are in flight;
+    beyond that submit() refuses the job (or blocks, if asked to) so callers
+    get backpressure instead of an unbounded queue. Finished jobs are
+    aggregated into a MetricsSummary, with stage timings if collect_metrics.
+    """
+    def __init__(self, model_path, label_map, workers=1, queue_size=8, collect_metrics=False):
+        self.model_path = model_path
+        self.label_map = label_map
+        self.workers = workers
+        self.collect_metrics = collect_metrics
+        self.metrics = MetricsSummary()
+        self.slots = threading.BoundedSemaphore(workers + queue_size)
+        self.lock = threading.Lock()
+        self.restart_lock = threading.Lock()
+        self.counts = {"ok": 0, "empty": 0, "failed": 0, "rejected": 0, "in_flight": 0}
+        self.started = time.time()
+        self.pool = None
+        self._start_pool()
+
+    def _start_pool(self):
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=batch.init_worker,
+                                        initargs=(self.model_path, self.label_map))
+        # Spawn every worker and load the model now rather than on the first job
+        for future in [self.pool.submit(_warm_up) for _ in range(self.workers)]:
+            future.result()
+
+    def _restart(self, broken):
+        with self.restart_lock:
+            if self.pool is broken:
+                broken.shutdown(wait=False, cancel_futures=True)
+                self._start_pool()
+
+    def _count(self, key, delta=1):
+        with self.lock:
+            self.counts[key] += delta
+
+    def _done(self, future):
+        self.slots.release()
+        self._count("in_flight", -1)
+        try:
+            record, _ = future.result()
+        except Exception:
+            self._count("failed")
+            return
+        self._count(record["status"])
+        with self.lock:
+            self.metrics.add(record)
+
+    def submit(self, input_path, output_path=None, block=False, data=None):
+        """
+        Queues one document (a path, or its bytes in data); returns a Future of
+        (record, result), or None if the service is saturated and block is False.
+        """
+        if not self.slots.acquire(blocking=block):
+            self._count("rejected")
+            return None
+        self._count("in_flight")
+        try:
+            pool = self.pool
+            try:
+                future = pool.submit(batch.process_file, input_path, output_path, data, self.collect_metrics)
+            except BrokenProcessPool:
+                # A worker died on an earlier document; replace the pool once
+                self._restart(pool)
+                future = self.pool.submit(batch.process_file, input_path, output_path, data, self.collect_metrics)
+        except Exception:
+            self.slots.release()
+            self._count("in_flight", -1)
+            raise
+        future.add_done_callback(self._done)
+        return future
+
+    def run(self, input_path, output_path=None, data=None):
+        """Runs one document synchronously; returns (record, result) or None if saturated."""
+        future = self.submit(input_path, output_path, data=data)
+        if future is None:
+            return None
+        try:
+            return future.result()
+        except Exception as e:
+            record = {"input": input_path, "output": output_path, "status": "failed",
+                      "error": f"{type(e).__name__}: {e}", "seconds": 0.0}
+            return record, None
+
+    def health(self):
+        with self.lock:
+            counts = dict(self.counts)
+        return {"status": "ok", "workers": self.workers, "uptime": time.time() - self.started, **counts}
+
+    def prometheus(self):
+        with self.lock:
+            text = self.metrics.to_prometheus()
+        return text + f"# TYPE pdf_outline_in_flight gauge\npdf_outline_in_flight {self.counts['in_flight']}\n"
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """
+    GET /health   -> service counters
+    GET /metrics  -> aggregate metrics in Prometheus text format
+    POST /extract -> {"input": "<pdf path>", "output": "<optional json path>"}
+                     with Content-Type: application/json, or the PDF itself
+                     with Content-Type: application/pdf
+                     answers {"record": {...}, "result": {"title": ..., "outline": [...]}}
+
+    Paths are taken relative to input_dir / output_dir and must resolve
+    (symlinks included) to a file inside them; other bodies get 415.
+    """
+    service = None
+    input_dir = Config.INPUT_DIR
+    output_dir = Config.OUTPUT_DIR
+
+    def address_string(self):
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def _send(self, code, body, headers=None):
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, self.service.health())
+        elif self.path == "/metrics":
+            payload = self.service.prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        else:
+            self._send(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/extract":
+            self._send(404, {"error": f"Unknown path {self.path}"})
+            return
+
+        data = None
+        content_type = self.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(length)
+            if content_type == "application/pdf":
+                data = body
+                # Only names the document in the record
+                input_path = os.path.basename(self.headers.get("X-Filename", "upload.pdf"))
+                output_path = None
+            elif content_type == "application/json":
+                job = json.loads(body or b"{}")
+                input_path = _resolve(job["input"], self.input_dir)
+                output_path = _resolve(job["output"], self.output_dir) if job.get("output") is not None else None
+            else:
+                self._send(415, {"error": "Expected Content-Type application/json or application/pdf"})
+                return
+        except PermissionError as e:
+            self._send(403, {"error": str(e)})
+            return
+        except (ValueError, KeyError, TypeError):
+            self._send(400, {"error": 'Expected a JSON body like {"input": "<pdf path>", "output": "<optional json path>"}'})
+            return
+
+        outcome = self.service.run(input_path, output_path, data)
+        if outcome is None:
+            self._send(503, {"error": "Service busy, retry later"}, {"Retry-After": "1"})
+            return
+
+        record, result = outcome
+        self._send(422 if record["status"] == "failed" else 200, {"record": record, "result": result})
+
+
+def _resolve(path, directory):
+    """path (relative to directory) with symlinks resolved; PermissionError if it is not inside directory."""
+    root = os.path.realpath(directory)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([resolved, root]) != root or resolved == root:
+        raise PermissionError(f"{path} is outside {directory}")
+    return resolved
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(service, host=None, port=None, socket_path=None):
+    handler = type("BoundServiceHandler", (ServiceHandler,), {"service": service})
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        return ThreadingUnixHTTPServer(socket_path, handler)
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def watch(service, input_dir, output_dir, interval):
+    """
+    Polls input_dir and extracts every new or modified PDF into output_dir.
+    A file is picked up once its size and mtime are unchanged across two scans,
+    so half-copied PDFs are not processed. Blocks while all job slots are busy.
+    """
+    submitted = {}
+    settling = {}
+    print(f"👀 Watching {input_dir} (every {interval}s), writing to {output_dir}")
+    while True:
+        for name in sorted(os.listdir(input_dir)):
+            if not name.lower().endswith(".pdf"):
+                continue
+            path = os.path.join(input_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            signature = (st.st_mtime_ns, st.st_size)
+            if submitted.get(path) == signature:
+                continue
+            if settling.get(path) != signature:
+                settling[path] = signature
+                continue
+
+            del settling[path]
+            submitted[path] = signature
+            output_path = os.path.join(output_dir, os.path.splitext(name)[0] + ".json")
+            future = service.submit(path, output_path, block=True)
+            future.add_done_callback(_print_outcome)
+        time.sleep(interval)
+
+
+def _print_outcome(future):
+    try:
+        record, _ = future.result()
+    except Exception as e:
+        print(f"❌ Worker failed: {type(e).__name__}: {e}")
+        return
+    batch.print_record(record)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Resident PDF outline extraction service.")
+    parser.add_argument("--host", default=Config.SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=Config.SERVICE_PORT)
+    parser.add_argument("--socket", default=None, help="Serve HTTP on this Unix socket instead of TCP")
+    parser.add_argument("--watch", action="store_true", help="Watch INPUT_DIR instead of serving HTTP")
+    parser.add_argument("--workers", type=int, default=Config.SERVICE_WORKERS)
+    parser.add_argument("--queue-size", type=int, default=Config.SERVICE_QUEUE_SIZE)
+    parser.add_argument("--interval", type=float, default=Config.WATCH_INTERVAL)
+    parser.add_argument("--metrics", action="store_true", default=Config.METRICS_ENABLED,
+                        help="Record per-stage timings and counters (served on GET /metrics)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if not os.path.exists(Config.MODEL_PATH):
+        print(f"Error: Model file not found at: {Config.MODEL_PATH}")
+        return
+
+    start = time.perf_counter()
+    service = ExtractionService(Config.MODEL_PATH, Config.LABEL_MAP, max(1, args.workers), max(0, args.queue_size),
+                                args.metrics)
+    print(f"Model loaded in {args.workers} worker(s) in {time.perf_counter() - start:.2f}s")
+
+    try:
+        if args.watch:
+            os.makedirs(Config.OUTPUT_DIR, exist_ok=True)
+            watch(service, Config.INPUT_DIR, Config.OUTPUT_DIR, args.interval)
+        else:
+            server = make_server(service, args.host, args.port, args.socket)
+            print(f"🚀 Serving on {args.socket or f'http://{args.host}:{args.port}'}")
+            try:
+                server.serve_forever()
+            finally:
+                server.server_close()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@
 
 import re
 import json
+import string
 import numpy as np
 import pandas as pd
 from nltk.corpus import stopwords
@@ -39,50 +40,76 @@ def convert_types(obj):
     else:
         return obj
 
+# Precompiled noise filter: patterns are compiled once at import, and the
+# substring blacklists are merged into a single alternation scanned in one pass.
+_DIVIDER_RE = re.compile(r"^[\-=_*~]{3,}$")
+_MATH_OP_RE = re.compile(r'[\+\-\*/=<>≤≥]')
+_MATH_RE = re.compile(r'^((\(?\w+\)?\s*[\+\-\*/=<>≤≥]\s*\w+\(?\w+\)?)|(\w+\s*=\s*\w+[\+\-\*/].*?))$')
+_WORD_RE = re.compile(r'\w+')
+_NOISE_KEYWORDS = [
+    # Affiliations, references and contact details
+    'arxiv', 'doi', '@', '.com', '.edu', 'university', 'institute', 'gmail', 'google', 'brain', 'proceedings',
+    # Common page/footer junk
+    'page', 'copyright', 'www.', 'http',
+]
+_NOISE_KEYWORDS_RE = re.compile("|".join(re.escape(w) for w in sorted(_NOISE_KEYWORDS, key=len, reverse=True)))
+# Non-alphabetic characters that do not count towards the symbol ratio
+_IGNORE_CHARS = " -&’'.,"
+# For ASCII lines, deleting letters and ignored chars leaves exactly the symbols
+_ASCII_NON_SYMBOLS = (string.ascii_letters + " -&'.,").encode("ascii")
+
 def is_likely_noise(text):
     text = text.strip()
-    text_lower = text.lower()
 
     # Empty or very short text
     if not text or len(text) < 3:
         return True
 
-    #  Divider lines (dashes, equals, stars, underscores)
-    if re.match(r"^[\-=_*~]{3,}$", text):
-        return True
-
-
     # Starts with bracket (often inline references like “[1]”, “(c)”)
-    if text.startswith("(") or text.startswith("["):
+    if text[0] == "(" or text[0] == "[":
         return True
 
-  
-    if any(w in text_lower for w in ['arxiv', 'doi', '@', '.com', '.edu', 'university',
-                                     'institute', 'gmail', 'google', 'brain', 'proceedings',
-                                     ]):
+    #  Divider lines (dashes, equals, stars, underscores)
+    if _DIVIDER_RE.match(text):
         return True
 
-    # Math-like
-    if re.search(r'^((\(?\w+\)?\s*[\+\-\*/=<>≤≥]\s*\w+\(?\w+\)?)|(\w+\s*=\s*\w+[\+\-\*/].*?))$',
-                 text.replace(" ", "")):
+    text_lower = text.lower()
+
+    # Affiliations, references and page/footer junk
+    if _NOISE_KEYWORDS_RE.search(text_lower):
         return True
 
-  
+    # Symbol-heavy lines: every character that is neither alphabetic nor ignored
+    if text.isascii():
+        n_symbols = len(text.encode("ascii").translate(None, _ASCII_NON_SYMBOLS))
+    else:
+        n_symbols = len(text) - sum(map(str.isalpha, text)) - sum(text.count(c) for c in _IGNORE_CHARS)
+    if n_symbols / len(text) > 0.5:
+        return True
 
-    ignore_chars = set(" -&’'.,")
-    symbol_heavy_chars = [c for c in text if not c.isalpha() and c not in ignore_chars]
-    if len(symbol_heavy_chars) / len(text) > 0.5:
+    # Math-like (the pattern needs an operator, so skip lines without one)
+    if _MATH_OP_RE.search(text) and _MATH_RE.search(text.replace(" ", "")):
         return True
 
     # Stopword-heavy lines
-    words = re.findall(r'\w+', text_lower)
+    words = _WORD_RE.findall(text_lower)
     if words:
-        stop_count = sum(1 for w in words if w in all_stopwords)
+        stop_count = sum(map(all_stopwords.__contains__, words))
         if stop_count / len(words) > 0.8:
             return True
 
-    # Common page/footer junk
-    if any(token in text_lower for token in ["page", "copyright", "www.", "http"]):
-        return True
-
     return False
+
+def noise_mask(texts):
+    """
+    Batch version of is_likely_noise: returns one bool per input line.
+    Repeated lines (running headers, footers) are only checked once.
+    """
+    verdicts = {}
+    mask = []
+    for text in texts:
+        verdict = verdicts.get(text)
+        if verdict is None:
+            verdict = verdicts[text] = is_likely_noise(text)
+        mask.append(verdict)
+    return mask
@@ -0,0 +1,105 @@
+# batching.py
+#
+# Token-budget batching for the sentence embedding model. Texts are sorted by
+# token length and grouped into batches whose padded size (texts in the batch
+# x longest text) stays within a token budget: many short texts go into one
+# forward pass, few long ones, and little compute is spent on padding.
+# Embeddings are returned in the original order.
+#
+#     embeddings = encode_bucketed(model, texts, max_tokens=4096)
+#     print(ENCODE_STATS.summary())
+
+import time
+import numpy as np
+
+
+class EncodeStats:
+    """
+    Totals over encode_bucketed calls: texts, forward passes, real and padded
+    tokens, and seconds spent (tokenizing included).
+    """
+    def __init__(self):
+        self.texts = 0
+        self.batches = 0
+        self.tokens = 0
+        self.padded_tokens = 0
+        self.seconds = 0.0
+
+    def padding_efficiency(self):
+        return self.tokens / self.padded_tokens if self.padded_tokens else 1.0
+
+    def tokens_per_second(self):
+        return self.tokens / self.seconds if self.seconds else 0.0
+
+    def as_dict(self):
+        return {
+            "texts": self.texts,
+            "batches": self.batches,
+            "tokens": self.tokens,
+            "padded_tokens": self.padded_tokens,
+            "padding_efficiency": self.padding_efficiency(),
+            "seconds": self.seconds,
+            "tokens_per_second": self.tokens_per_second(),
+        }
+
+    def summary(self):
+        return (f"{self.texts} texts in {self.batches} batches, {self.padding_efficiency():.0%} padding efficiency, "
+                f"{self.tokens_per_second():.0f} tokens/s")
+
+
+ENCODE_STATS = EncodeStats()
+
+
+def token_lengths(model, texts):
+    """Tokens per text as the model sees them: special tokens added, truncated to max_seq_length."""
+    encoded = model.tokenizer(list(texts), add_special_tokens=True, truncation=True, max_length=model.max_seq_length)
+    return np.array([len(ids) for ids in encoded["input_ids"]], dtype=np.int64)
+
+
+def plan_batches(lengths, max_tokens):
+    """
+    Groups text indices into batches, longest texts first, so that each
+    batch's padded size (len(batch) x its longest text) is at most
+    max_tokens. A text longer than the budget gets a batch of its own.
+    """
+    batches, batch = [], []
+    for i in np.argsort(-lengths, kind="stable").tolist():
+        # Sorted longest first: the batch's first text sets its padded length
+        if batch and (len(batch) + 1) * lengths[batch[0]] > max_tokens:
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def padded_size(lengths, batches):
+    return sum(len(batch) * int(lengths[batch].max()) for batch in batches)
+
+
+def encode_bucketed(model, texts, max_tokens=4096, stats=ENCODE_STATS):
+    """
+    Encodes texts (a list of str) with one model.encode call per planned
+    batch and returns a (len(texts), dim) array in the order of texts.
+    """
+    if not texts:
+        return np.zeros((0, model.get_sentence_embedding_dimension()), dtype=np.float32)
+    start = time.perf_counter()
+    lengths = token_lengths(model, texts)
+    batches = plan_batches(lengths, max_tokens)
+    out = None
+    for batch in batches:
+        embeddings = model.encode([texts[i] for i in batch], batch_size=len(batch),
+                                  convert_to_numpy=True, show_progress_bar=False)
+        if out is None:
+            out = np.empty((len(texts), embeddings.shape[1]), dtype=embeddings.dtype)
+        out[batch] = embeddings
+
+    if stats is not None:
+        stats.texts += len(texts)
+        stats.batches += len(batches)
+        stats.tokens += int(lengths.sum())
+        stats.padded_tokens += padded_size(lengths, batches)
+        stats.seconds += time.perf_counter() - start
+    return out
@@ -0,0 +1,109 @@
+# benchmarks/bench_batching.py
+#
+# Encoding of the reranking texts of the bundled collections (each query's
+# BM25 candidates plus the query), without the embedding cache:
+#
+#   fixed 32        the original rerank_chunks: model.encode on the candidates
+#                   (batches of 32, sorted by character length), query apart
+#   budget N        batching.encode_bucketed with max_tokens=N, query included
+#
+# Reports padding efficiency (real / padded tokens), tokens/sec, and whether
+# the 6 output sections match the fixed-32 ones. Then times the default budget
+# at several torch thread counts.
+#
+# Usage (from Challenge_1b/):
+#     python -m benchmarks.bench_batching [--budgets 2048 4096 8192 16384] [--threads 1 2 4]
+
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+import torch
+import main as pipeline
+import batching
+
+
+def workload():
+    """[(persona, job, candidates)] for the query of every bundled collection."""
+    work = []
+    for collection in sorted(pipeline.find_collections()):
+        col_path = os.path.join(pipeline.BASE_PATH, collection)
+        with open(os.path.join(col_path, pipeline.INPUT_JSON)) as f:
+            input_data = json.load(f)
+        persona, job = input_data["persona"]["role"], input_data["job_to_be_done"]["task"]
+        index = pipeline.open_collection(col_path)
+        candidates = pipeline.bm25_top_chunks(f"{persona}. Job: {job}", index, pipeline.collection_documents(col_path, index))
+        work.append((persona, job, candidates))
+    return work
+
+
+def fixed_padding(model, texts, batch_size=32):
+    """Real and padded tokens of model.encode's own batching: character-length order, fixed count."""
+    lengths = batching.token_lengths(model, texts)
+    order = np.argsort([-len(text) for text in texts], kind="stable")
+    batches = [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+    return int(lengths.sum()), batching.padded_size(lengths, batches)
+
+
+def run(model, work, budget):
+    """Encodes every query's texts; returns (seconds, tokens, padded tokens, outputs)."""
+    tokens = padded = 0
+    outputs = []
+    start = time.perf_counter()
+    for persona, job, candidates in work:
+        texts = [chunk for chunk, _ in candidates]
+        query = f"{persona}. Job: {job}"
+        if budget is None:
+            chunk_embeddings = model.encode(texts, convert_to_numpy=True, show_progress_bar=False)
+            query_embedding = model.encode([query], convert_to_numpy=True, show_progress_bar=False)
+            for group in (texts, [query]):
+                real, pad = fixed_padding(model, group)
+                tokens, padded = tokens + real, padded + pad
+        else:
+            stats = batching.EncodeStats()
+            embeddings = batching.encode_bucketed(model, texts + [query], budget, stats)
+            chunk_embeddings, query_embedding = embeddings[:-1], embeddings[-1:]
+            tokens, padded = tokens + stats.tokens, padded + stats.padded_tokens
+        scores = pipeline.cos_sim(query_embedding, chunk_embeddings)[0]
+        outputs.append(pipeline.create_output_json(np.argsort(-scores), candidates, scores, persona, job)["extracted_sections"])
+    seconds = time.perf_counter() - start
+    return seconds, tokens, padded, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budgets", type=int, nargs="+", default=[2048, 4096, 8192, 16384])
+    parser.add_argument("--threads", type=int, nargs="+", default=sorted({1, max(1, (os.cpu_count() or 1) // 2),
+                                                                          os.cpu_count() or 1}))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    model = pipeline.load_model()
+    work = workload()
+    run(model, work, None)  # warm up
+
+    def best(budget):
+        return min((run(model, work, budget) for _ in range(args.repeat)), key=lambda result: result[0])
+
+    print(f"\n{'batching':<14} {'seconds':>8} {'tokens/s':>9} {'padding eff':>12} {'same top-6':>11}")
+    baseline = best(None)
+    failures = 0
+    for budget in [None] + args.budgets:
+        seconds, tokens, padded, outputs = baseline if budget is None else best(budget)
+        same = sum(a == b for a, b in zip(outputs, baseline[3]))
+        failures += same != len(work)
+        label = "fixed 32" if budget is None else f"budget {budget}"
+        print(f"{label:<14} {seconds:>8.2f} {tokens / seconds:>9.0f} {tokens / padded:>12.0%} {same:>6}/{len(work)}")
+
+    print(f"\n{'threads':>7} {'seconds':>8} {'tokens/s':>9}   (budget {pipeline.MAX_BATCH_TOKENS})")
+    for threads in args.threads:
+        torch.set_num_threads(threads)
+        seconds, tokens, _, _ = best(pipeline.MAX_BATCH_TOKENS)
+        print(f"{threads:>7} {seconds:>8.2f} {tokens / seconds:>9.0f}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
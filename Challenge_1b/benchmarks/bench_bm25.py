@@ -0,0 +1,164 @@
+# benchmarks/bench_bm25.py
+#
+# Checks that BM25Index.top_k returns the same chunks, in the same order, as
+# building BM25Okapi over the requested PDFs' chunks and sorting every score
+# (the original bm25_top_chunks), for all PDFs and for a subset of them, also
+# after PDFs are removed, changed and added. Then times both on collections
+# grown by repeating the bundled PDFs.
+#
+# After an incremental update, BM25Okapi's average idf (the epsilon floor for
+# terms in over half the chunks) can differ in the last bit, because it is
+# summed in first-occurrence order. Chunks whose scores tie up to that rounding
+# may then swap places; such results are reported as equal up to ties.
+#
+# Usage (from Challenge_1b/):
+#     python -m benchmarks.bench_bm25 [--scales 1 10 50] [--queries 50]
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+from rank_bm25 import BM25Okapi
+import ingestion
+from bm25_index import BM25Index
+
+COLLECTIONS = sorted(d for d in os.listdir(".") if d.startswith("Collection") and os.path.isdir(d))
+_text_cache = {}
+
+
+def page_chunks(pdf_path, chunk_size=180):
+    """ingestion.page_chunks, memoized per file contents."""
+    key = (os.path.getsize(pdf_path), os.path.basename(os.path.realpath(pdf_path)))
+    if key not in _text_cache:
+        _text_cache[key] = ingestion.page_chunks(pdf_path, chunk_size)
+    return _text_cache[key]
+
+
+def rebuild_top_chunks(query, pdf_dir, documents, top_k=60, with_scores=False):
+    chunks, meta = [], []
+    for filename in documents:
+        for page, chunk in page_chunks(os.path.join(pdf_dir, filename)):
+            chunks.append(chunk)
+            meta.append({"document": filename, "page_number": page})
+    bm25 = BM25Okapi([chunk.lower().split() for chunk in chunks])
+    scores = bm25.get_scores(query.lower().split())
+    top_indices = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:top_k]
+    top = [(chunks[i], meta[i]) for i in top_indices]
+    if with_scores:
+        return top, {(chunks[i], meta[i]["document"], meta[i]["page_number"]): scores[i] for i in range(len(chunks))}
+    return top
+
+
+def sample_queries(pdf_dir, documents, n, rng):
+    words = [w for name in documents for _, chunk in page_chunks(os.path.join(pdf_dir, name)) for w in chunk.split()]
+    return [" ".join(rng.choice(words) for _ in range(rng.randint(1, 12))) for _ in range(n)]
+
+
+def check(index, pdf_dir, documents, queries, label):
+    identical = ties = failures = 0
+    for query in queries:
+        actual = index.top_k(query, 60, documents)
+        expected, scores = rebuild_top_chunks(query, pdf_dir, documents, with_scores=True)
+        if actual == expected:
+            identical += 1
+            continue
+        # Same score at every rank (up to rounding): only tied chunks are ordered differently
+        key = lambda item: (item[0], item[1]["document"], item[1]["page_number"])
+        if len(actual) == len(expected) and np.allclose([scores[key(c)] for c in actual],
+                                                        [scores[key(c)] for c in expected], rtol=1e-12, atol=0):
+            ties += 1
+        else:
+            failures += 1
+    status = "✅" if not failures else "❌"
+    print(f"{status} {label}: {identical}/{len(queries)} queries identical, {ties} equal up to ties")
+    return failures
+
+
+def parity(n_queries, rng):
+    failures = 0
+    for collection in COLLECTIONS:
+        with open(os.path.join(collection, "challenge1b_input.json")) as f:
+            input_data = json.load(f)
+        documents = [doc["filename"] for doc in input_data["documents"]]
+        persona_job = f"{input_data['persona']['role']}. Job: {input_data['job_to_be_done']['task']}"
+
+        with tempfile.TemporaryDirectory() as tmp:
+            pdf_dir = os.path.join(tmp, "PDFs")
+            shutil.copytree(os.path.join(collection, "PDFs"), pdf_dir)
+            queries = [persona_job] + sample_queries(pdf_dir, documents, n_queries, rng)
+            index = BM25Index(os.path.join(tmp, "index"))
+            index.update(pdf_dir, page_chunks)
+            failures += check(index, pdf_dir, documents, queries, f"{collection} fresh index")
+            failures += check(index, pdf_dir, documents[::2], queries, f"{collection} every other PDF")
+
+            # Remove one PDF, then bring it back under a new name (changed contents are retired the same way)
+            gone = documents[len(documents) // 2]
+            os.rename(os.path.join(pdf_dir, gone), os.path.join(tmp, gone))
+            index.update(pdf_dir, page_chunks)
+            remaining = [name for name in documents if name != gone]
+            failures += check(index, pdf_dir, remaining, queries, f"{collection} after removing a PDF")
+
+            shutil.move(os.path.join(tmp, gone), os.path.join(pdf_dir, "renamed " + gone))
+            index = BM25Index(os.path.join(tmp, "index"))
+            index.update(pdf_dir, page_chunks)
+            failures += check(index, pdf_dir, remaining + ["renamed " + gone], queries,
+                              f"{collection} after adding it back (reloaded)")
+    return failures
+
+
+def latency(scales, rng):
+    collection = COLLECTIONS[0]
+    with open(os.path.join(collection, "challenge1b_input.json")) as f:
+        input_data = json.load(f)
+    base = [doc["filename"] for doc in input_data["documents"]]
+    src_dir = os.path.abspath(os.path.join(collection, "PDFs"))
+    query = f"{input_data['persona']['role']}. Job: {input_data['job_to_be_done']['task']}"
+
+    print(f"\n{'PDFs':>6} {'chunks':>7} {'rebuild+sort':>13} {'index top_k':>12} {'index build':>12}")
+    for scale in scales:
+        with tempfile.TemporaryDirectory() as tmp:
+            pdf_dir = os.path.join(tmp, "PDFs")
+            os.makedirs(pdf_dir)
+            documents = []
+            for copy in range(scale):
+                for name in base:
+                    documents.append(f"{copy:04d} {name}")
+                    os.symlink(os.path.join(src_dir, name), os.path.join(pdf_dir, documents[-1]))
+
+            start = time.perf_counter()
+            index = BM25Index(os.path.join(tmp, "index"))
+            index.update(pdf_dir, page_chunks)
+            build = time.perf_counter() - start
+
+            start = time.perf_counter()
+            rebuild_top_chunks(query, pdf_dir, documents)
+            rebuild = time.perf_counter() - start
+
+            index = BM25Index(os.path.join(tmp, "index"))
+            start = time.perf_counter()
+            for _ in range(20):
+                index.top_k(query, 60, documents)
+            query_time = (time.perf_counter() - start) / 20
+            print(f"{len(documents):>6} {len(index):>7} {rebuild * 1000:>11.1f}ms {query_time * 1000:>10.2f}ms "
+                  f"{build:>11.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--queries", type=int, default=50, help="Random queries per collection for the parity check")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    failures = parity(args.queries, rng)
+    latency(args.scales, rng)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+# benchmarks/bench_dense.py
+#
+# Dense index search at growing corpus sizes, on synthetic clustered unit
+# vectors (768-d, like specter2): build time, query latency of the exact
+# blocked search and of the IVF index, and IVF recall@10 / recall@60 against
+# the exact results, at several nprobe; unfiltered, and restricted to half of
+# the (SYNTHETIC_DOCUMENTS) documents as collection queries are. Then, on the bundled collections with the configured
+# model, compares hybrid (BM25 + dense, fused) candidates with BM25 alone.
+#
+# Usage (from Challenge_1b/):
+#     python -m benchmarks.bench_dense [--sizes 1000 10000 100000] [--queries 100] [--skip-collections]
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import main as pipeline
+from dense_index import DenseIndex, IVF_NPROBE, normalize, hybrid_top_chunks
+
+SYNTHETIC_DOCUMENTS = 10
+
+
+def synthetic(n, dim, rng, n_topics=None):
+    """Unit vectors around n_topics (default n // 50) random directions, with per-topic spread."""
+    n_topics = n_topics or max(16, n // 50)
+    topics = normalize(rng.standard_normal((n_topics, dim)))
+    spread = rng.uniform(0.5, 1.5, n_topics).astype(np.float32)
+    labels = rng.integers(0, n_topics, n)
+    noise = rng.standard_normal((n, dim)).astype(np.float32) * (spread[labels, None] / np.sqrt(dim))
+    return normalize(topics[labels] + noise)
+
+
+def timed_search(search, queries, k, documents=None):
+    start = time.perf_counter()
+    results = [search(query, k, documents)[0] for query in queries]
+    return (time.perf_counter() - start) / len(queries), results
+
+
+def recall(found, expected):
+    return np.mean([len(set(f.tolist()) & set(e.tolist())) / len(e) for f, e in zip(found, expected)])
+
+
+def scale(sizes, nprobes, n_queries, dim, rng):
+    print(f"{'chunks':>8} {'lists':>6} {'build':>7} {'filter':>7} {'exact':>9} {'nprobe':>7} {'ivf':>9} "
+          f"{'recall@10':>10} {'recall@60':>10}")
+    for n in sizes:
+        vectors = synthetic(n, dim, rng)
+        queries = normalize(vectors[rng.integers(0, n, n_queries)] +
+                            rng.standard_normal((n_queries, dim)).astype(np.float32) * (0.5 / np.sqrt(dim)))
+        # Rows split evenly over the documents, each a contiguous range
+        bounds = np.linspace(0, n, SYNTHETIC_DOCUMENTS + 1).astype(int)
+        documents = {f"synthetic_{i}.pdf": {"id": i, "signature": None, "start": int(a), "count": int(b - a)}
+                     for i, (a, b) in enumerate(zip(bounds, bounds[1:]))}
+        row_doc = np.repeat(np.arange(SYNTHETIC_DOCUMENTS, dtype=np.int32), np.diff(bounds))
+        row_seq = (np.arange(n) - bounds[row_doc]).astype(np.int32)
+        with tempfile.TemporaryDirectory() as tmp:
+            index = DenseIndex(tmp, "synthetic", ivf_min_chunks=0)
+            start = time.perf_counter()
+            index.write(vectors, row_doc, row_seq, documents)
+            build = time.perf_counter() - start
+
+            for label, subset in (("all", None), ("half", sorted(documents)[::2])):
+                exact_time, exact = timed_search(index.search_exact, queries, 60, subset)
+                for nprobe in nprobes:
+                    index.nprobe = nprobe
+                    ivf_time, approximate = timed_search(index.search, queries, 60, subset)
+                    print(f"{n:>8} {len(index.centroids):>6} {build:>6.2f}s {label:>7} {exact_time * 1000:>7.2f}ms "
+                          f"{nprobe:>7} {ivf_time * 1000:>7.2f}ms "
+                          f"{recall([a[:10] for a in approximate], [e[:10] for e in exact]):>10.3f} "
+                          f"{recall(approximate, exact):>10.3f}")
+
+
+def collections():
+    print(f"\n{'collection':<14} {'chunks':>7} {'dense-only candidates':>22} {'same top-6 as bm25':>19}")
+    for collection in sorted(pipeline.find_collections()):
+        col_path = os.path.join(pipeline.BASE_PATH, collection)
+        with open(os.path.join(col_path, pipeline.INPUT_JSON)) as f:
+            input_data = json.load(f)
+        query = (input_data["persona"]["role"], input_data["job_to_be_done"]["task"])
+        text = f"{query[0]}. Job: {query[1]}"
+        index = pipeline.open_collection(col_path)
+        dense = pipeline.open_dense_index(col_path, index)
+        documents = pipeline.collection_documents(col_path, index)
+
+        embedding = pipeline.get_embedding_cache().encode([text], pipeline.encode_texts)[0]
+        sparse = {chunk for chunk, _ in pipeline.bm25_top_chunks(text, index, documents)}
+        hybrid = {chunk for chunk, _ in hybrid_top_chunks(index, dense, text, embedding, pipeline.BM25_TOP_K, documents)}
+        outputs = [{(s["document"], s["page_number"], s["section_title"])
+                    for s in pipeline.answer_queries(index, documents, [query], dense=d)[0]["extracted_sections"]}
+                   for d in (None, dense)]
+        print(f"{collection:<14} {len(index):>7} {len(hybrid - sparse):>22} {len(outputs[0] & outputs[1]):>17}/6")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, IVF_NPROBE, 128], help="IVF lists scanned per query")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--skip-collections", action="store_true", help="Only the synthetic scaling run (no model needed)")
+    args = parser.parse_args()
+
+    scale(args.sizes, args.nprobe, args.queries, args.dim, np.random.default_rng(0))
+    if not args.skip_collections:
+        collections()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+# benchmarks/bench_ingestion.py
+#
+# Times PDF ingestion (text extraction and 180-word chunking) of the bundled
+# Collection_1-3 PDFs: the original whole-document pdfminer extract_text, then
+# each ingestion.py backend serially and in a process pool. Also reports the
+# peak Python memory of extracting the largest PDF, and how many chunk texts
+# each backend shares with extract_text (pdfminer must share all of them).
+#
+# Usage (from Challenge_1b/):
+#     python -m benchmarks.bench_ingestion [--workers 4] [--repeat 3]
+
+import argparse
+import glob
+import os
+import sys
+import time
+import tracemalloc
+from functools import partial
+import fitz
+from pdfminer.high_level import extract_text
+import ingestion
+
+
+def extract_text_chunks(pdf_path, chunk_size=180):
+    """The original main.py chunking: whole-document text, chunk index as page number."""
+    words = extract_text(pdf_path).split()
+    return [(idx + 1, ' '.join(words[i:i + chunk_size])) for idx, i in enumerate(range(0, len(words), chunk_size))]
+
+
+def timed(chunker, paths, workers, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = ingestion.extract_documents(paths, chunker, workers)
+        best = min(best, time.perf_counter() - start)
+    return best, results
+
+
+def peak_memory(chunker, path):
+    tracemalloc.start()
+    chunker(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join("Collection_*", "PDFs", "*.pdf")))
+    largest = max(paths, key=os.path.getsize)
+    n_pages = sum(fitz.open(path).page_count for path in paths)
+    print(f"{len(paths)} PDFs, {n_pages} pages; {os.cpu_count()} CPUs")
+
+    _, reference = timed(extract_text_chunks, paths, 1, 1)
+    reference_texts = [{text for _, text in chunks} for chunks in reference]
+
+    rows = [("extract_text (original)", extract_text_chunks, 1)]
+    for backend in ingestion.BACKENDS:
+        chunker = partial(ingestion.page_chunks, backend=backend)
+        rows.append((backend, chunker, 1))
+        if args.workers > 1:
+            rows.append((backend, chunker, args.workers))
+
+    print(f"\n{'backend':<24} {'workers':>7} {'seconds':>8} {'pages/s':>8} {'chunks':>7} {'same text':>9} "
+          f"{'peak MB':>8}")
+    failures = 0
+    for label, chunker, workers in rows:
+        seconds, results = timed(chunker, paths, workers, args.repeat)
+        n_chunks = sum(len(chunks) for chunks in results)
+        shared = sum(len({text for _, text in chunks} & ref) for chunks, ref in zip(results, reference_texts))
+        peak = peak_memory(chunker, largest) / 2 ** 20
+        print(f"{label:<24} {workers:>7} {seconds:>8.2f} {n_pages / seconds:>8.1f} {n_chunks:>7} "
+              f"{shared / max(n_chunks, 1):>9.0%} {peak:>8.1f}")
+        if label == "pdfminer" and [[t for _, t in c] for c in results] != [[t for _, t in c] for c in reference]:
+            print("❌ pdfminer chunks differ from extract_text")
+            failures += 1
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
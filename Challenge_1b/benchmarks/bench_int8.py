@@ -0,0 +1,106 @@
+# benchmarks/bench_int8.py
+#
+# Agreement and speed of the int8 model (MODEL_PRECISION = "int8") against
+# fp32 on the bundled collections. For every collection, each query (its own
+# persona/job plus those of the other collections, crossed) gets its BM25
+# candidates reranked by both models, without the embedding cache:
+#
+#   top-6 overlap   share of the 6 output sections (create_output_json) that
+#                   both models select
+#   spearman        rank correlation of the cosine scores over all candidates
+#
+# Encoding time is the best of --repeat runs over all the texts of a
+# collection. Exits non-zero if the mean agreement is below the thresholds.
+#
+# Usage (from Challenge_1b/):
+#     python -m benchmarks.bench_int8 [--min-overlap 0.8] [--min-spearman 0.9] [--repeat 3]
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import main as pipeline
+from benchmarks.bench_queries import make_queries
+
+
+def ranks(values):
+    order = np.argsort(values)
+    out = np.empty(len(values))
+    out[order] = np.arange(len(values))
+    return out
+
+
+def spearman(a, b):
+    if len(a) < 2:
+        return 1.0
+    return float(np.corrcoef(ranks(a), ranks(b))[0, 1])
+
+
+def section_keys(result):
+    return {(s["document"], s["page_number"], s["section_title"]) for s in result["extracted_sections"]}
+
+
+def encode_timed(model, texts, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        embeddings = model.encode(texts, convert_to_numpy=True, show_progress_bar=False)
+        best = min(best, time.perf_counter() - start)
+    return embeddings, best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--min-overlap", type=float, default=0.8)
+    parser.add_argument("--min-spearman", type=float, default=0.9)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    models = {precision: pipeline.load_model(precision) for precision in ("fp32", "int8")}
+    queries = make_queries(len(pipeline.find_collections()) ** 2)
+
+    print(f"{'collection':<14} {'texts':>6} {'fp32 s':>8} {'int8 s':>8} {'speedup':>8} {'top-6':>6} {'spearman':>9}")
+    overlaps, correlations, seconds = [], [], {"fp32": 0.0, "int8": 0.0}
+    for collection in sorted(pipeline.find_collections()):
+        col_path = os.path.join(pipeline.BASE_PATH, collection)
+        index = pipeline.open_collection(col_path)
+        documents = pipeline.collection_documents(col_path, index)
+        query_texts = [f"{persona}. Job: {job}" for persona, job in queries]
+        candidate_lists = [pipeline.bm25_top_chunks(text, index, documents) for text in query_texts]
+        texts = list(dict.fromkeys([chunk for candidates in candidate_lists for chunk, _ in candidates]))
+        position = {text: i for i, text in enumerate(texts)}
+
+        scores, timing = {}, {}
+        for precision, model in models.items():
+            embeddings, timing[precision] = encode_timed(model, texts + query_texts, args.repeat)
+            seconds[precision] += timing[precision]
+            scores[precision] = pipeline.cos_sim(embeddings[len(texts):], embeddings[:len(texts)])
+
+        col_overlaps, col_correlations = [], []
+        for q, ((persona, job), candidates) in enumerate(zip(queries, candidate_lists)):
+            columns = [position[chunk] for chunk, _ in candidates]
+            results = {}
+            for precision in models:
+                cos_scores = scores[precision][q, columns]
+                results[precision] = pipeline.create_output_json(np.argsort(-cos_scores), candidates, cos_scores,
+                                                                 persona, job)
+            expected = section_keys(results["fp32"])
+            col_overlaps.append(len(expected & section_keys(results["int8"])) / max(len(expected), 1))
+            col_correlations.append(spearman(scores["fp32"][q, columns], scores["int8"][q, columns]))
+        overlaps += col_overlaps
+        correlations += col_correlations
+        print(f"{collection:<14} {len(texts) + len(query_texts):>6} {timing['fp32']:>8.2f} {timing['int8']:>8.2f} "
+              f"{timing['fp32'] / timing['int8']:>7.2f}x {np.mean(col_overlaps):>6.2f} {np.mean(col_correlations):>9.3f}")
+
+    overlap, correlation = float(np.mean(overlaps)), float(np.mean(correlations))
+    print(f"{'all':<14} {'':>6} {seconds['fp32']:>8.2f} {seconds['int8']:>8.2f} "
+          f"{seconds['fp32'] / seconds['int8']:>7.2f}x {overlap:>6.2f} {correlation:>9.3f}")
+    accepted = overlap >= args.min_overlap and correlation >= args.min_spearman
+    print(f"{'✅' if accepted else '❌'} int8 {'meets' if accepted else 'misses'} the agreement thresholds "
+          f"(top-6 overlap >= {args.min_overlap}, spearman >= {args.min_spearman})")
+    return 0 if accepted else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
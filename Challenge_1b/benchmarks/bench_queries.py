@@ -0,0 +1,75 @@
+# benchmarks/bench_queries.py
+#
+# Answers many persona/job queries against one collection, first one at a time
+# (as a loop of single-query runs would) and then with one answer_queries call,
+# on a warm BM25 index. Checks that both give the same outputs and reports
+# queries/sec. Queries are every persona crossed with every job of the bundled
+# collections, plus reworded variants, so they share few candidates.
+#
+# Usage (from Challenge_1b/):
+#     python -m benchmarks.bench_queries [--collection Collection_1] [--queries 50] [--no-cache]
+
+import argparse
+import json
+import os
+import sys
+import time
+import main as pipeline
+
+VARIANTS = ["", " Focus on practical details.", " Summarize the key steps.", " Keep it short."]
+
+
+def make_queries(n):
+    personas, jobs = [], []
+    for collection in pipeline.find_collections():
+        with open(os.path.join(collection, pipeline.INPUT_JSON)) as f:
+            input_data = json.load(f)
+        personas.append(input_data["persona"]["role"])
+        jobs.append(input_data["job_to_be_done"]["task"])
+    queries = [(persona, job + variant) for variant in VARIANTS for persona in personas for job in jobs]
+    while len(queries) < n:
+        queries += [(persona, f"{job} (variant {len(queries)})") for persona, job in queries[:n - len(queries)]]
+    return queries[:n]
+
+
+def strip_timestamp(result):
+    result = dict(result, metadata=dict(result["metadata"]))
+    result["metadata"].pop("timestamp")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--collection", default="Collection_1")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--no-cache", action="store_true", help="Disable the embedding cache, so every chunk is encoded")
+    args = parser.parse_args()
+    if args.no_cache:
+        pipeline.EMBEDDING_CACHE_MAX_ENTRIES = 0
+
+    col_path = os.path.join(pipeline.BASE_PATH, args.collection)
+    index = pipeline.open_collection(col_path)
+    documents = pipeline.collection_documents(col_path, index)
+    queries = make_queries(args.queries)
+    # Warm up: model load, first-time encodes of the shared candidates
+    pipeline.answer_queries(index, documents, queries[:1])
+
+    start = time.perf_counter()
+    sequential = [pipeline.answer_queries(index, documents, [query])[0] for query in queries]
+    sequential_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = pipeline.answer_queries(index, documents, queries)
+    batched_time = time.perf_counter() - start
+
+    mismatches = sum(strip_timestamp(a) != strip_timestamp(b) for a, b in zip(sequential, batched))
+    status = "✅" if not mismatches else "❌"
+    print(f"{status} {len(queries) - mismatches}/{len(queries)} batched outputs identical to single-query runs")
+    print(f"\n{'mode':<12} {'seconds':>8} {'queries/sec':>12}")
+    print(f"{'sequential':<12} {sequential_time:>8.2f} {len(queries) / sequential_time:>12.1f}")
+    print(f"{'batched':<12} {batched_time:>8.2f} {len(queries) / batched_time:>12.1f}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+# benchmarks/loadgen.py
+#
+# Load generator for service.py: keeps --concurrency keep-alive connections
+# busy with persona/job queries (bench_queries.make_queries, spread over the
+# collections) and reports latency percentiles, queries/sec, and the service's
+# mean batch size over the run. An untimed warm-up first sends the base
+# persona/job combinations, which embeds (and caches) nearly every candidate
+# chunk; each timed run then gets reworded queries of its own, so its query
+# embeddings are never cached. With --spawn, starts the service itself, once
+# per --window-ms value, to compare micro-batching windows (--max-batch 1
+# turns batching off).
+#
+# Usage (from Challenge_1b/):
+#     python service.py &
+#     python -m benchmarks.loadgen [--concurrency 16] [--requests 400]
+#     python -m benchmarks.loadgen --spawn --window-ms 0 5 20 [--concurrency 1 16] [--max-batch 1]
+
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+from urllib.parse import urlparse
+import numpy as np
+import main as pipeline
+from benchmarks.bench_queries import make_queries
+
+
+async def request(reader, writer, method, path, body=None):
+    """One HTTP/1.1 request on a keep-alive connection; returns (status, parsed JSON body)."""
+    payload = json.dumps(body).encode("utf-8") if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(payload)}\r\n\r\n".encode("latin-1") + payload)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def get_health(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        return (await request(reader, writer, "GET", "/health"))[1]
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, jobs, concurrency):
+    """Sends every job, concurrency requests at a time; returns (latencies in s, errors, seconds, health delta)."""
+    latencies, errors = [], []
+    pending = iter(jobs)
+
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for job in pending:
+                start = time.perf_counter()
+                status, body = await request(reader, writer, "POST", "/query", job)
+                if status == 200:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors.append(f"{status}: {body.get('error')}")
+        finally:
+            writer.close()
+
+    before = await get_health(host, port)
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    seconds = time.perf_counter() - start
+    after = await get_health(host, port)
+    return latencies, errors, seconds, {key: after[key] - before[key] for key in ("queries", "batches")}
+
+
+def report(label, concurrency, latencies, errors, seconds, health):
+    ms = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    batch = health["queries"] / health["batches"] if health["batches"] else 0.0
+    print(f"{label:<10} {concurrency:>5} {len(latencies):>6} {len(errors):>6} {len(latencies) / seconds:>8.1f} "
+          f"{np.percentile(ms, 50):>8.1f} {np.percentile(ms, 90):>8.1f} {np.percentile(ms, 99):>8.1f} {ms.max():>8.1f} "
+          f"{batch:>6.1f}")
+    for error in sorted(set(errors))[:5]:
+        print(f"  ❌ {error}")
+
+
+def wait_until_ready(host, port, process, timeout=600):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"service.py exited with code {process.returncode}")
+        try:
+            return asyncio.run(get_health(host, port))
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("service.py did not start in time")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8766")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[16])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--warmup", type=int, default=36, help="Untimed queries sent before the timed runs")
+    parser.add_argument("--spawn", action="store_true", help="Start service.py (per --window-ms) instead of using --url")
+    parser.add_argument("--window-ms", type=float, nargs="+", default=[5.0], help="Batch windows to compare with --spawn")
+    parser.add_argument("--max-batch", type=int, help="Largest batch of the spawned service")
+    args = parser.parse_args()
+    url = urlparse(args.url)
+    host, port = url.hostname, url.port
+
+    collections = sorted(pipeline.find_collections())
+    runs = len(args.concurrency) * (len(args.window_ms) if args.spawn else 1)
+    jobs = [{"collection": collections[i % len(collections)], "persona": persona, "job": job}
+            for i, (persona, job) in enumerate(make_queries(args.warmup + args.requests * runs))]
+    warmup, jobs = jobs[:args.warmup], jobs[args.warmup:]
+
+    print(f"{'window':<10} {'conc':>5} {'ok':>6} {'errors':>6} {'qps':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} "
+          f"{'max ms':>8} {'batch':>6}")
+    failures = 0
+    for window in (args.window_ms if args.spawn else [None]):
+        process = None
+        if args.spawn:
+            command = [sys.executable, "service.py", "--host", host, "--port", str(port), "--window-ms", str(window)]
+            if args.max_batch:
+                command += ["--max-batch", str(args.max_batch)]
+            process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+            wait_until_ready(host, port, process)
+        try:
+            if warmup:
+                asyncio.run(run_load(host, port, warmup, max(args.concurrency)))
+            for concurrency in args.concurrency:
+                run_jobs, jobs = jobs[:args.requests], jobs[args.requests:]
+                latencies, errors, seconds, health = asyncio.run(run_load(host, port, run_jobs, concurrency))
+                failures += len(errors)
+                report("server" if window is None else f"{window:g} ms", concurrency, latencies, errors, seconds, health)
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,482 @@
+# bm25_index.py
+#
+# Persistent BM25 (Okapi) index for one collection folder, scoring exactly like
+# rank_bm25.BM25Okapi over the same chunks. The index is a set of immutable
+# segments of compact arrays (postings, term frequencies, chunk lengths, chunk
+# texts) loaded with mmap, plus a global vocabulary and document frequencies.
+# Adding or changing a PDF writes one new segment for it and retires the old
+# chunks; segments are merged (from the stored texts, without re-parsing any
+# PDF) once too many pile up or too much of them is retired.
+#
+#     index = BM25Index(os.path.join(col_path, ".bm25_index"))
+#     index.update(pdf_dir, ingestion.page_chunks)
+#     top = index.top_k("travel planner. job: ...", 60, documents=[...])
+
+import hashlib
+import json
+import math
+import mmap
+import os
+import shutil
+import numpy as np
+
+INDEX_FORMAT_VERSION = 2
+MAX_SEGMENTS = 8
+MAX_RETIRED_FRACTION = 0.3
+# Corpus statistics kept for the most recent document subsets
+SUBSET_CACHE_SIZE = 8
+
+
+def tokenize(text):
+    return text.lower().split()
+
+
+def file_signature(path, previous=None):
+    """
+    (size, mtime_ns, sha256) of a file. The content hash is only recomputed
+    when size or mtime differ from the previous signature.
+    """
+    st = os.stat(path)
+    if previous and previous[0] == st.st_size and previous[1] == st.st_mtime_ns:
+        return previous
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return [st.st_size, st.st_mtime_ns, h.hexdigest()]
+
+
+class Segment:
+    """
+    Chunks of one or more documents: term-major postings (CSR over the sorted
+    global term ids present) and per-chunk length, document, sequence number
+    within the document, page number and text.
+    """
+    FILES = ("terms", "offsets", "postings", "tfs", "chunk_len", "chunk_doc", "chunk_seq", "chunk_page", "text_offsets")
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        for name in self.FILES:
+            setattr(self, name, np.load(os.path.join(path, name + ".npy"), mmap_mode="r"))
+        with open(os.path.join(path, "text.bin"), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self.text_data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self):
+        return len(self.chunk_len)
+
+    def text(self, i):
+        return self.text_data[self.text_offsets[i]:self.text_offsets[i + 1]].decode("utf-8")
+
+    def postings_of(self, term_id):
+        """(local chunk ids, term frequencies) of one term, or None."""
+        i = np.searchsorted(self.terms, term_id)
+        if i == len(self.terms) or self.terms[i] != term_id:
+            return None
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.postings[start:end], self.tfs[start:end]
+
+    @staticmethod
+    def write(path, chunks, vocab):
+        """
+        Writes a segment for chunks, a list of (doc_id, seq, page, text, tokens).
+        New terms are appended to vocab (term -> id). Returns the per-term
+        document frequencies of the segment as {term_id: df}.
+        """
+        os.makedirs(path)
+        postings = {}
+        chunk_len = np.empty(len(chunks), dtype=np.int32)
+        for local, (_, _, _, _, tokens) in enumerate(chunks):
+            chunk_len[local] = len(tokens)
+            frequencies = {}
+            for token in tokens:
+                frequencies[token] = frequencies.get(token, 0) + 1
+            for token, tf in frequencies.items():
+                term_id = vocab.setdefault(token, len(vocab))
+                postings.setdefault(term_id, []).append((local, tf))
+
+        terms = np.array(sorted(postings), dtype=np.int32)
+        lists = [postings[t] for t in terms.tolist()]
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(l) for l in lists])
+        flat = [p for l in lists for p in l]
+        encoded = [text.encode("utf-8") for _, _, _, text, _ in chunks]
+        text_offsets = np.zeros(len(chunks) + 1, dtype=np.int64)
+        text_offsets[1:] = np.cumsum([len(t) for t in encoded])
+
+        arrays = {
+            "terms": terms,
+            "offsets": offsets,
+            "postings": np.array([p[0] for p in flat], dtype=np.int32),
+            "tfs": np.array([p[1] for p in flat], dtype=np.int32),
+            "chunk_len": chunk_len,
+            "chunk_doc": np.array([c[0] for c in chunks], dtype=np.int32),
+            "chunk_seq": np.array([c[1] for c in chunks], dtype=np.int32),
+            "chunk_page": np.array([c[2] for c in chunks], dtype=np.int32),
+            "text_offsets": text_offsets,
+        }
+        for name, array in arrays.items():
+            np.save(os.path.join(path, name + ".npy"), array)
+        with open(os.path.join(path, "text.bin"), "wb") as f:
+            f.write(b"".join(encoded))
+        return {t: len(l) for t, l in zip(terms.tolist(), lists)}
+
+
+class BM25Index:
+    """
+    BM25 index of the chunks of every PDF in a folder, persisted in index_dir.
+    top_k can restrict a query to some of the PDFs; corpus statistics (chunk
+    count, average length, document frequencies) are then those of just these
+    PDFs, as BM25Okapi over their chunks would compute them.
+    """
+    def __init__(self, index_dir, chunk_size=180, k1=1.5, b=0.75, epsilon=0.25, backend="pdfminer"):
+        self.dir = index_dir
+        # backend: the text extractor the chunks come from (see ingestion.py)
+        self.settings = {"version": INDEX_FORMAT_VERSION, "chunk_size": chunk_size, "k1": k1, "b": b,
+                         "epsilon": epsilon, "backend": backend}
+        self.k1, self.b, self.epsilon = k1, b, epsilon
+        self._load()
+
+    # --- state -------------------------------------------------------------
+
+    def _empty(self):
+        self.documents = {}     # filename -> {"id", "signature", "segment", "start", "count"}
+        self.segment_names = []
+        self.next_doc_id = 0
+        self.next_segment = 0
+        self.retired_chunks = 0
+        self.vocab_list = []
+        self.vocab = {}
+        self.df = np.zeros(0, dtype=np.int64)
+        self.n_chunks = 0
+        self.total_len = 0
+        self.average_idf = 0.0
+        self.segments = {}
+        self._subset_stats = {}   # frozenset of filenames -> _stats() result
+
+    def _load(self):
+        self._empty()
+        manifest_path = os.path.join(self.dir, "manifest.json")
+        if not os.path.exists(manifest_path):
+            return
+        try:
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest["settings"] != self.settings:
+                print(f"Index settings changed, rebuilding {self.dir}")
+                return
+            with open(os.path.join(self.dir, "vocab.json"), encoding="utf-8") as f:
+                self.vocab_list = json.load(f)
+            self.df = np.load(os.path.join(self.dir, "df.npy"))
+            self.segments = {name: Segment(os.path.join(self.dir, name)) for name in manifest["segments"]}
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: rebuilding unreadable index in {self.dir}: {e}")
+            self._empty()
+            return
+        self.vocab = {term: i for i, term in enumerate(self.vocab_list)}
+        self.documents = manifest["documents"]
+        self.segment_names = manifest["segments"]
+        self.next_doc_id = manifest["next_doc_id"]
+        self.next_segment = manifest["next_segment"]
+        self.retired_chunks = manifest["retired_chunks"]
+        self.n_chunks = manifest["n_chunks"]
+        self.total_len = manifest["total_len"]
+        self.average_idf = manifest["average_idf"]
+
+    def _save(self):
+        """Writes vocabulary, document frequencies and, last, the manifest."""
+        manifest = {
+            "settings": self.settings,
+            "documents": self.documents,
+            "segments": self.segment_names,
+            "next_doc_id": self.next_doc_id,
+            "next_segment": self.next_segment,
+            "retired_chunks": self.retired_chunks,
+            "n_chunks": self.n_chunks,
+            "total_len": self.total_len,
+            "average_idf": self.average_idf,
+        }
+        self._replace("vocab.json", lambda f: f.write(json.dumps(self.vocab_list, ensure_ascii=False).encode("utf-8")))
+        self._replace("df.npy", lambda f: np.save(f, self.df))
+        self._replace("manifest.json", lambda f: f.write(json.dumps(manifest, indent=1).encode("utf-8")))
+        # Segments no longer referenced by the manifest
+        for name in os.listdir(self.dir):
+            if name.startswith("seg_") and name not in self.segments:
+                shutil.rmtree(os.path.join(self.dir, name), ignore_errors=True)
+
+    def _replace(self, name, write):
+        tmp_path = os.path.join(self.dir, name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            write(f)
+        os.replace(tmp_path, os.path.join(self.dir, name))
+
+    # --- updates -----------------------------------------------------------
+
+    def _chunk_df(self, segment, start, count):
+        """Document frequencies contributed by chunks [start, start + count) of a segment."""
+        df = {}
+        for local in range(start, start + count):
+            for token in set(tokenize(segment.text(local))):
+                term_id = self.vocab[token]
+                df[term_id] = df.get(term_id, 0) + 1
+        return df, int(np.sum(segment.chunk_len[start:start + count]))
+
+    def _apply_df(self, df, sign):
+        if len(self.vocab_list) > len(self.df):
+            self.df = np.concatenate([self.df, np.zeros(len(self.vocab_list) - len(self.df), dtype=np.int64)])
+        if df:
+            ids = np.fromiter(df.keys(), dtype=np.int64, count=len(df))
+            self.df[ids] += sign * np.fromiter(df.values(), dtype=np.int64, count=len(df))
+
+    def _retire(self, filename):
+        doc = self.documents.pop(filename)
+        df, length = self._chunk_df(self.segments[doc["segment"]], doc["start"], doc["count"])
+        self._apply_df(df, -1)
+        self.n_chunks -= doc["count"]
+        self.total_len -= length
+        self.retired_chunks += doc["count"]
+
+    def _write_segment(self, docs):
+        """docs: list of (filename, signature, doc_id, [(page, text), ...])."""
+        name = f"seg_{self.next_segment:05d}"
+        self.next_segment += 1
+        # Left over from an index that was discarded
+        shutil.rmtree(os.path.join(self.dir, name), ignore_errors=True)
+        chunks = []
+        for filename, signature, doc_id, doc_chunks in docs:
+            self.documents[filename] = {"id": doc_id, "signature": signature, "segment": name,
+                                        "start": len(chunks), "count": len(doc_chunks)}
+            chunks += [(doc_id, seq, page, text, tokenize(text)) for seq, (page, text) in enumerate(doc_chunks)]
+        df = Segment.write(os.path.join(self.dir, name), chunks, self.vocab)
+        self.vocab_list.extend(list(self.vocab)[len(self.vocab_list):])
+        self._apply_df(df, 1)
+        self.n_chunks += len(chunks)
+        self.total_len += sum(len(c[4]) for c in chunks)
+        self.segments[name] = Segment(os.path.join(self.dir, name))
+        self.segment_names.append(name)
+
+    def _merge(self):
+        """Rewrites all live chunks into one segment, from the stored texts."""
+        docs = sorted(self.documents.items(), key=lambda item: item[1]["id"])
+        merged = []
+        for filename, doc in docs:
+            segment = self.segments[doc["segment"]]
+            chunks = [(int(segment.chunk_page[i]), segment.text(i)) for i in range(doc["start"], doc["start"] + doc["count"])]
+            merged.append((filename, doc["signature"], doc["id"], chunks))
+        self.documents, self.segments, self.segment_names = {}, {}, []
+        self.df = np.zeros(len(self.vocab_list), dtype=np.int64)
+        self.n_chunks = self.total_len = self.retired_chunks = 0
+        if merged:
+            self._write_segment(merged)
+
+    @staticmethod
+    def _average_idf(df, n_chunks):
+        # Same order and arithmetic as BM25Okapi._calc_idf: terms in order of first occurrence
+        live = np.flatnonzero(df).tolist()
+        idf_sum = 0
+        for term_id in live:
+            freq = int(df[term_id])
+            idf_sum += math.log(n_chunks - freq + 0.5) - math.log(freq + 0.5)
+        return idf_sum / len(live) if live else 0.0
+
+    def _update_average_idf(self):
+        self.average_idf = self._average_idf(self.df, self.n_chunks)
+
+    def update(self, pdf_dir, chunker, map_fn=None):
+        """
+        Brings the index in line with the PDFs in pdf_dir: new or changed files
+        are chunked with chunker(path) -> [(page, text), ...] and written as
+        one new segment, removed or changed ones are retired. map_fn(chunker,
+        paths) -> [chunks, ...] chunks all new files at once (e.g.
+        ingestion.extract_documents, to use a process pool). Returns the
+        (added, removed) filenames.
+        """
+        os.makedirs(self.dir, exist_ok=True)
+        current = {name: os.path.join(pdf_dir, name) for name in sorted(os.listdir(pdf_dir))
+                   if name.lower().endswith(".pdf")}
+        signatures = {name: file_signature(path, self.documents.get(name, {}).get("signature"))
+                      for name, path in current.items()}
+        removed = [name for name in self.documents
+                   if name not in current or self.documents[name]["signature"] != signatures[name]]
+        added = [name for name in current if name not in self.documents or name in removed]
+        if not added and not removed:
+            return added, removed
+
+        for name in removed:
+            self._retire(name)
+        if added:
+            paths = [current[name] for name in added]
+            chunked = map_fn(chunker, paths) if map_fn else [chunker(path) for path in paths]
+            docs = []
+            for name, chunks in zip(added, chunked):
+                docs.append((name, signatures[name], self.next_doc_id, chunks))
+                self.next_doc_id += 1
+            self._write_segment(docs)
+        if len(self.segment_names) > MAX_SEGMENTS or \
+                self.retired_chunks > MAX_RETIRED_FRACTION * (self.n_chunks + self.retired_chunks):
+            self._merge()
+        self.segment_names = [name for name in self.segment_names
+                              if any(doc["segment"] == name for doc in self.documents.values())]
+        self.segments = {name: self.segments[name] for name in self.segment_names}
+        self._update_average_idf()
+        self._subset_stats = {}
+        self._save()
+        return added, removed
+
+    # --- queries -----------------------------------------------------------
+
+    def __len__(self):
+        return self.n_chunks
+
+    def chunk(self, filename, seq):
+        """The stored chunk seq of a document as (text, {"document", "page_number"})."""
+        doc = self.documents[filename]
+        segment = self.segments[doc["segment"]]
+        local = doc["start"] + seq
+        return segment.text(local), {"document": filename, "page_number": int(segment.chunk_page[local])}
+
+    def chunks(self, filename):
+        """All stored chunks of one document, in order, as chunk() returns them."""
+        return [self.chunk(filename, seq) for seq in range(self.documents[filename]["count"])]
+
+    def idf(self, term_id, stats=None):
+        """idf of a term over all indexed PDFs, or over the corpus of _stats() results."""
+        n_chunks, _, df, average_idf = stats or (self.n_chunks, None, self.df, self.average_idf)
+        freq = int(df[term_id])
+        if freq == 0:
+            return 0
+        idf = math.log(n_chunks - freq + 0.5) - math.log(freq + 0.5)
+        return self.epsilon * average_idf if idf < 0 else idf
+
+    def _stats(self, documents):
+        """
+        (chunk count, average chunk length, document frequencies, average idf)
+        over the chunks of documents. These are the index-wide figures when
+        documents are all indexed PDFs; otherwise they are counted from the
+        postings of the documents' chunks, once per set of documents.
+        """
+        key = frozenset(documents)
+        if len(key) == len(self.documents):
+            return self.n_chunks, self.total_len / max(self.n_chunks, 1), self.df, self.average_idf
+        stats = self._subset_stats.get(key)
+        if stats is None:
+            df = np.zeros(len(self.vocab_list), dtype=np.int64)
+            n_chunks = total_len = 0
+            for name in self.segment_names:
+                segment = self.segments[name]
+                selected = np.zeros(len(segment), dtype=bool)
+                for filename in key:
+                    doc = self.documents[filename]
+                    if doc["segment"] == name:
+                        selected[doc["start"]:doc["start"] + doc["count"]] = True
+                if not selected.any():
+                    continue
+                n_chunks += int(np.count_nonzero(selected))
+                total_len += int(np.sum(segment.chunk_len[selected], dtype=np.int64))
+                posting_terms = np.repeat(np.asarray(segment.terms), np.diff(segment.offsets))
+                df += np.bincount(posting_terms[selected[segment.postings]], minlength=len(df))
+            stats = (n_chunks, total_len / max(n_chunks, 1), df, self._average_idf(df, n_chunks))
+            if len(self._subset_stats) >= SUBSET_CACHE_SIZE:
+                self._subset_stats.clear()
+            self._subset_stats[key] = stats
+        return stats
+
+    def top_k(self, query, k, documents=None):
+        """
+        The k best chunks for a query among the given documents (filenames,
+        default all) as (text, {"document", "page_number"}) tuples, ranked as
+        sorting BM25Okapi scores would rank them: ties keep the order of the
+        documents list, then chunk order. Only the postings of the query terms
+        are read, and the top k are found by partial selection.
+        """
+        return [self.chunk(filename, seq) for filename, seq in self.top_k_keys(query, k, documents)]
+
+    def top_k_keys(self, query, k, documents=None):
+        """As top_k, but the chunks as (filename, seq) pairs."""
+        if documents is None:
+            documents = sorted(self.documents, key=lambda name: self.documents[name]["id"])
+        documents = [name for name in documents if name in self.documents]
+        if not documents:
+            return []
+        stats = self._stats(documents)
+        n_chunks, avgdl = stats[:2]
+        if not n_chunks:
+            return []
+        # Chunks are addressed as (segment index, local id) packed into one int64
+        doc_rank = {self.documents[name]["id"]: rank for rank, name in enumerate(documents)}
+        segments = [self.segments[name] for name in self.segment_names]
+
+        # Per-segment accumulators, filled token by token in query order like
+        # BM25Okapi.get_scores; only the postings of the query terms are read
+        seg_scores = [None] * len(segments)
+        seg_matched = [None] * len(segments)
+        for token in tokenize(query):
+            term_id = self.vocab.get(token)
+            idf = self.idf(term_id, stats) if term_id is not None else 0
+            if not idf:
+                continue
+            for s, segment in enumerate(segments):
+                found = segment.postings_of(term_id)
+                if found is None:
+                    continue
+                if seg_scores[s] is None:
+                    seg_scores[s] = np.zeros(len(segment))
+                    seg_matched[s] = np.zeros(len(segment), dtype=bool)
+                local, tf = found
+                q_freq = tf.astype(np.int64)
+                doc_len = segment.chunk_len[local].astype(np.int64)
+                seg_scores[s][local] += idf * (q_freq * (self.k1 + 1) /
+                                               (q_freq + self.k1 * (1 - self.b + self.b * doc_len / avgdl)))
+                seg_matched[s][local] = True
+
+        # Matched chunks of the requested documents, with their rank in the
+        # documents list and sequence number as the tie-breaking order
+        rank_of = np.full(self.next_doc_id, -1, dtype=np.int64)
+        rank_of[list(doc_rank)] = list(doc_rank.values())
+        keys, scores, order = [np.zeros(0, np.int64)], [np.zeros(0)], [np.zeros(0, np.int64)]
+        for s, segment in enumerate(segments):
+            if seg_scores[s] is None:
+                continue
+            local = np.flatnonzero(seg_matched[s])
+            rank = rank_of[segment.chunk_doc[local]]
+            allowed = rank >= 0
+            local = local[allowed]
+            keys.append((np.int64(s) << 32) | local)
+            scores.append(seg_scores[s][local])
+            order.append((rank[allowed] << 32) | segment.chunk_seq[local])
+        keys, scores, order = np.concatenate(keys), np.concatenate(scores), np.concatenate(order)
+
+        # Unmatched chunks score 0: the first ones in order fill up a short list
+        if np.count_nonzero(scores > 0) < k:
+            matched = set(keys.tolist())
+            padding = []
+            for rank, name in enumerate(documents):
+                doc = self.documents[name]
+                s = self.segment_names.index(doc["segment"])
+                for local in range(doc["start"], doc["start"] + doc["count"]):
+                    key = (s << 32) | local
+                    if key not in matched:
+                        padding.append((key, (rank << 32) | int(segments[s].chunk_seq[local])))
+                    if len(padding) >= k:
+                        break
+                if len(padding) >= k:
+                    break
+            if padding:
+                keys = np.concatenate([keys, np.array([p[0] for p in padding], dtype=np.int64)])
+                order = np.concatenate([order, np.array([p[1] for p in padding], dtype=np.int64)])
+                scores = np.concatenate([scores, np.zeros(len(padding))])
+
+        if len(scores) > k:
+            kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+            keep = scores >= kth
+            keys, scores, order = keys[keep], scores[keep], order[keep]
+        best = np.lexsort((order, -scores))[:k]
+
+        id_to_name = {self.documents[name]["id"]: name for name in documents}
+        results = []
+        for key in keys[best].tolist():
+            segment = segments[key >> 32]
+            local = key & 0xFFFFFFFF
+            results.append((id_to_name[int(segment.chunk_doc[local])], int(segment.chunk_seq[local])))
+        return results
@@ -0,0 +1,292 @@
+# dense_index.py
+#
+# Persistent dense index of the chunk embeddings of one collection, kept in
+# step with its BM25Index (same documents, same chunks). Vectors are stored
+# L2-normalized in a memory-mapped .npy matrix, one row per chunk, grouped by
+# document. Small indexes are searched exactly, a block of rows at a time;
+# from IVF_MIN_CHUNKS on, an inverted-file index (spherical k-means lists, the
+# nprobe closest of them scanned per query) keeps query cost sub-linear.
+#
+#     dense = DenseIndex(os.path.join(col_path, ".dense_index"), model_id)
+#     dense.sync(bm25_index, encode)      # encode(texts) -> (n, dim) array
+#     candidates = hybrid_top_chunks(bm25_index, dense, query, query_embedding, 60, documents)
+
+import json
+import math
+import os
+import numpy as np
+
+DENSE_FORMAT_VERSION = 1
+EXACT_BLOCK_ROWS = 16384
+IVF_MIN_CHUNKS = 20_000
+# Lists per sqrt(chunks), and lists scanned per query
+IVF_LISTS_FACTOR = 2
+IVF_NPROBE = 32
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_PER_LIST = 40
+# Row masks kept for the most recent documents filters
+MASK_CACHE_SIZE = 8
+# Reciprocal rank fusion constant (score = sum of 1 / (RRF_K + rank))
+RRF_K = 60
+
+
+def normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+
+
+def assign(vectors, centroids, block=EXACT_BLOCK_ROWS):
+    """Index of the closest (highest inner product) centroid of every row."""
+    out = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), block):
+        out[start:start + block] = np.argmax(vectors[start:start + block] @ centroids.T, axis=1)
+    return out
+
+
+def train_centroids(vectors, n_lists, seed=0):
+    """Spherical k-means on a sample of the rows: n_lists unit-norm centroids."""
+    rng = np.random.default_rng(seed)
+    n_sample = min(len(vectors), n_lists * KMEANS_SAMPLE_PER_LIST)
+    data = np.asarray(vectors[np.sort(rng.choice(len(vectors), n_sample, replace=False))])
+    centroids = data[rng.choice(len(data), n_lists, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        labels = assign(data, centroids)
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=n_lists)
+        filled = np.flatnonzero(counts)
+        sums = np.add.reduceat(data[order], np.concatenate([[0], np.cumsum(counts)[:-1]])[filled], axis=0)
+        centroids[filled] = normalize(sums)
+        # Empty lists restart from random rows
+        empty = np.flatnonzero(counts == 0)
+        centroids[empty] = data[rng.choice(len(data), len(empty), replace=False)]
+    return centroids
+
+
+class DenseIndex:
+    """
+    Embeddings of every chunk in a BM25Index, for one embedding model
+    (model_id, as for the embedding cache), persisted in index_dir.
+    """
+    FILES = ("vectors", "row_doc", "row_seq")
+    IVF_FILES = ("centroids", "list_offsets", "list_rows")
+
+    def __init__(self, index_dir, model_id, ivf_min_chunks=IVF_MIN_CHUNKS, nprobe=IVF_NPROBE):
+        self.dir = index_dir
+        self.model_id = model_id
+        self.ivf_min_chunks = ivf_min_chunks
+        self.nprobe = nprobe
+        self.documents = {}   # filename -> {"id", "signature", "start", "count"}
+        # Settings of the BM25Index whose chunks the rows embed (chunk size, backend...)
+        self.bm25_settings = None
+        self.vectors = None
+        self.centroids = None
+        self._masks = {}      # tuple of filenames -> boolean row mask
+        self._load()
+
+    def _load(self):
+        self._masks = {}
+        manifest_path = os.path.join(self.dir, "manifest.json")
+        if not os.path.exists(manifest_path):
+            return
+        try:
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest["version"] != DENSE_FORMAT_VERSION or manifest["model_id"] != self.model_id:
+                print(f"Dense index model or format changed, rebuilding {self.dir}")
+                return
+            for name in self.FILES + (self.IVF_FILES if manifest["ivf"] else ()):
+                setattr(self, name, np.load(os.path.join(self.dir, name + ".npy"), mmap_mode="r"))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: rebuilding unreadable dense index in {self.dir}: {e}")
+            self.vectors = self.centroids = None
+            return
+        self.documents = manifest["documents"]
+        self.bm25_settings = manifest.get("bm25_settings")
+
+    def __len__(self):
+        return 0 if self.vectors is None else len(self.vectors)
+
+    def sync(self, bm25_index, encode):
+        """
+        Brings the index in line with bm25_index: rows of unchanged documents
+        are kept, chunks of new or changed ones are embedded with encode(texts)
+        in one call. Rows are only kept while the BM25 chunking (its settings)
+        and the document's chunk count are unchanged. The IVF lists are
+        retrained on every change past ivf_min_chunks. Returns the number of
+        chunks embedded.
+        """
+        if self.vectors is not None and self.bm25_settings != bm25_index.settings:
+            print(f"BM25 chunking changed, re-embedding {self.dir}")
+            self.documents, self.vectors, self.centroids = {}, None, None
+        self.bm25_settings = bm25_index.settings
+
+        def unchanged(name, doc):
+            old = self.documents.get(name)
+            return old is not None and old["signature"] == doc["signature"] and old["count"] == doc["count"]
+
+        docs = sorted(bm25_index.documents.items(), key=lambda item: item[1]["id"])
+        if self.vectors is not None and len(docs) == len(self.documents) and all(
+                unchanged(name, doc) for name, doc in docs):
+            return 0
+
+        kept, texts = [], []
+        for name, doc in docs:
+            old = self.documents.get(name)
+            if unchanged(name, doc) and self.vectors is not None:
+                kept.append((name, np.array(self.vectors[old["start"]:old["start"] + old["count"]])))
+            else:
+                kept.append((name, None))
+                texts += [text for text, _ in bm25_index.chunks(name)]
+        encoded = normalize(encode(texts)) if texts else None
+
+        vectors, row_doc, row_seq, documents = [], [], [], {}
+        start = position = 0
+        for (name, doc), (_, rows) in zip(docs, kept):
+            if not doc["count"]:
+                documents[name] = {"id": doc["id"], "signature": doc["signature"], "start": start, "count": 0}
+                continue
+            if rows is None:
+                rows = encoded[position:position + doc["count"]]
+                position += doc["count"]
+            vectors.append(rows)
+            row_doc.append(np.full(len(rows), doc["id"], dtype=np.int32))
+            row_seq.append(np.arange(len(rows), dtype=np.int32))
+            documents[name] = {"id": doc["id"], "signature": doc["signature"], "start": start, "count": len(rows)}
+            start += len(rows)
+        self.write(np.concatenate(vectors) if vectors else np.zeros((0, 0), dtype=np.float32),
+                   np.concatenate(row_doc) if row_doc else np.zeros(0, dtype=np.int32),
+                   np.concatenate(row_seq) if row_seq else np.zeros(0, dtype=np.int32),
+                   documents)
+        return len(texts)
+
+    def write(self, vectors, row_doc, row_seq, documents):
+        """
+        Replaces the index with normalized vectors and their document ids and
+        sequence numbers; documents maps filename -> {"id", "signature",
+        "start", "count"}. Builds the IVF lists from ivf_min_chunks rows on.
+        """
+        arrays = {"vectors": vectors, "row_doc": row_doc, "row_seq": row_seq}
+        ivf = len(vectors) >= self.ivf_min_chunks
+        if ivf:
+            arrays.update(self._build_ivf(vectors))
+        self._save(arrays, documents, ivf)
+
+    def _build_ivf(self, vectors):
+        n_lists = max(1, min(len(vectors), int(IVF_LISTS_FACTOR * math.sqrt(len(vectors)))))
+        centroids = train_centroids(vectors, n_lists)
+        labels = assign(vectors, centroids)
+        list_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        list_offsets[1:] = np.cumsum(np.bincount(labels, minlength=n_lists))
+        return {"centroids": centroids, "list_offsets": list_offsets,
+                "list_rows": np.argsort(labels, kind="stable").astype(np.int32)}
+
+    def _save(self, arrays, documents, ivf):
+        os.makedirs(self.dir, exist_ok=True)
+        self.vectors = self.centroids = None
+        for name, array in arrays.items():
+            tmp_path = os.path.join(self.dir, name + ".tmp.npy")
+            np.save(tmp_path, array)
+            os.replace(tmp_path, os.path.join(self.dir, name + ".npy"))
+        manifest = {"version": DENSE_FORMAT_VERSION, "model_id": self.model_id, "bm25_settings": self.bm25_settings,
+                    "documents": documents, "ivf": ivf}
+        tmp_path = os.path.join(self.dir, "manifest.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(tmp_path, os.path.join(self.dir, "manifest.json"))
+        self._load()
+
+    # --- queries -----------------------------------------------------------
+
+    def _mask(self, documents):
+        """Boolean mask of the rows that belong to one of the documents, cached per documents tuple."""
+        key = tuple(documents)
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = np.zeros(len(self), dtype=bool)
+            for name in set(key):
+                doc = self.documents.get(name)
+                if doc is not None:
+                    mask[doc["start"]:doc["start"] + doc["count"]] = True
+            if len(self._masks) >= MASK_CACHE_SIZE:
+                self._masks.clear()
+            self._masks[key] = mask
+        return mask
+
+    def _allowed(self, rows, documents):
+        """The rows that belong to one of the documents (all rows if documents is None)."""
+        if documents is None:
+            return rows
+        return rows[self._mask(documents)[rows]]
+
+    def _allowed_count(self, documents):
+        if documents is None:
+            return len(self)
+        return sum(self.documents[name]["count"] for name in set(documents) if name in self.documents)
+
+    def _best(self, rows, scores, k):
+        """The k highest scores, ties broken by row; as (rows, scores)."""
+        if len(scores) > k:
+            keep = np.argpartition(-scores, k - 1)[:k]
+            kth = scores[keep].min()
+            keep = np.flatnonzero(scores >= kth)
+            rows, scores = rows[keep], scores[keep]
+        order = np.lexsort((rows, -scores))[:k]
+        return rows[order], scores[order]
+
+    def search_exact(self, query_embedding, k, documents=None):
+        """Exhaustive search, EXACT_BLOCK_ROWS rows at a time. Returns (rows, cosine scores)."""
+        query = normalize(query_embedding).ravel()
+        mask = self._mask(documents) if documents is not None else None
+        best_rows, best_scores = [np.zeros(0, np.int64)], [np.zeros(0, np.float32)]
+        for start in range(0, len(self), EXACT_BLOCK_ROWS):
+            rows = np.arange(start, min(start + EXACT_BLOCK_ROWS, len(self)))
+            scores = self.vectors[start:start + len(rows)] @ query
+            if mask is not None:
+                allowed = mask[start:start + len(rows)]
+                rows, scores = rows[allowed], scores[allowed]
+            rows, scores = self._best(rows, scores, k)
+            best_rows.append(rows)
+            best_scores.append(scores)
+        return self._best(np.concatenate(best_rows), np.concatenate(best_scores), k)
+
+    def search(self, query_embedding, k, documents=None):
+        """
+        The k chunks closest to the query as (rows, cosine scores): exact
+        below ivf_min_chunks, otherwise over the nprobe closest IVF lists
+        (more lists are scanned while fewer than k allowed rows are found).
+        """
+        if self.centroids is None:
+            return self.search_exact(query_embedding, k, documents)
+        query = normalize(query_embedding).ravel()
+        list_order = np.argsort(-(self.centroids @ query))
+        total = self._allowed_count(documents)
+        nprobe = self.nprobe
+        while True:
+            probed = list_order[:nprobe]
+            rows = np.concatenate([self.list_rows[self.list_offsets[i]:self.list_offsets[i + 1]] for i in probed])
+            rows = self._allowed(np.sort(rows).astype(np.int64), documents)
+            if len(rows) >= min(k, total) or nprobe >= len(list_order):
+                break
+            nprobe *= 2
+        return self._best(rows, self.vectors[rows] @ query, k)
+
+
+def hybrid_top_chunks(bm25_index, dense_index, query, query_embedding, k, documents=None, depth=None, rrf_k=RRF_K):
+    """
+    Candidates from BM25 and from the dense index (depth each, default k),
+    merged by reciprocal rank fusion and cut to k, as BM25Index.top_k returns
+    them: (text, {"document", "page_number"}). Ties keep BM25 order first.
+    """
+    depth = depth or k
+    rows, _ = dense_index.search(query_embedding, depth, documents)
+    id_to_name = {doc["id"]: name for name, doc in dense_index.documents.items()}
+    rankings = [
+        bm25_index.top_k_keys(query, depth, documents),
+        [(id_to_name[int(dense_index.row_doc[row])], int(dense_index.row_seq[row])) for row in rows.tolist()],
+    ]
+    fused = {}   # (filename, seq) -> fused score; insertion order breaks ties
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            fused[key] = fused.get(key, 0.0) + 1.0 / (rrf_k + rank)
+    ranked = sorted(fused, key=fused.get, reverse=True)[:k]
+    return [bm25_index.chunk(filename, seq) for filename, seq in ranked]
@@ -0,0 +1,220 @@
+# embedding_cache.py
+#
+# Persistent store of text embeddings, so unchanged chunks are never encoded
+# twice. Vectors live in a memory-mapped .npy matrix (one row per text) with a
+# small index file mapping text hashes to rows; one directory per model
+# identity, so a different model (or different weights) never sees stale rows.
+# One process at a time writes a cache directory (an exclusive lock on its
+# .lock file); others run without the cache.
+
+import hashlib
+import os
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:   # No locking on Windows
+    fcntl = None
+
+_HEAD_TAIL_BYTES = 1 << 20
+
+
+def model_identity(model_dir, **settings):
+    """
+    Digest identifying a local model: file names and sizes, the contents of
+    the small files (configs, tokenizer) and the first and last MB of the
+    large ones (weights), plus any encode settings given as keywords.
+    """
+    h = hashlib.sha256()
+    for name in sorted(os.listdir(model_dir)):
+        path = os.path.join(model_dir, name)
+        if not os.path.isfile(path):
+            continue
+        size = os.path.getsize(path)
+        h.update(f"{name}\0{size}\0".encode("utf-8"))
+        with open(path, "rb") as f:
+            if size <= 2 * _HEAD_TAIL_BYTES:
+                h.update(f.read())
+            else:
+                h.update(f.read(_HEAD_TAIL_BYTES))
+                f.seek(-_HEAD_TAIL_BYTES, os.SEEK_END)
+                h.update(f.read())
+    for key in sorted(settings):
+        h.update(f"{key}={settings[key]!r}\0".encode("utf-8"))
+    return h.hexdigest()
+
+
+def text_key(text):
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """
+    Text -> embedding store for one model identity, bounded to max_entries
+    rows with least-recently-used eviction. Call encode() with the texts and
+    an encode function; only the texts not in the store are passed to it, in
+    one call. Changes reach disk on flush(); until then the index on disk
+    stays valid, as rows it still references are never overwritten.
+    """
+    def __init__(self, cache_dir, model_id, max_entries=100_000, dtype="float32", enabled=True):
+        self.enabled = enabled
+        self.dir = os.path.join(cache_dir, model_id[:32])
+        self.max_entries = max_entries
+        self.dtype = np.dtype(dtype)
+        self.vectors_path = os.path.join(self.dir, "vectors.npy")
+        self.index_path = os.path.join(self.dir, "index.npz")
+
+        self.slots = {}       # key -> row in vectors
+        self.last_used = {}   # key -> clock value of its last lookup
+        self.free = []
+        self.persisted = set()   # rows referenced by the index on disk
+        self.lock_file = None
+        self.clock = 0
+        self.vectors = None
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if enabled and self._lock():
+            self._load()
+
+    def _lock(self):
+        """Takes the directory's writer lock; without it the cache is disabled."""
+        if fcntl is None:
+            return True
+        os.makedirs(self.dir, exist_ok=True)
+        self.lock_file = open(os.path.join(self.dir, ".lock"), "w")
+        try:
+            fcntl.flock(self.lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            print(f"Warning: embedding cache {self.dir} is in use by another process, running without it")
+            self.lock_file.close()
+            self.lock_file = None
+            self.enabled = False
+        return self.enabled
+
+    def _load(self):
+        if not (os.path.exists(self.index_path) and os.path.exists(self.vectors_path)):
+            return
+        try:
+            with np.load(self.index_path) as index:
+                keys, slots, last_used = index["keys"], index["slots"], index["last_used"]
+                self.clock = int(index["clock"])
+            self.vectors = np.load(self.vectors_path, mmap_mode="r+")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: ignoring unreadable embedding cache in {self.dir}: {e}")
+            self.vectors = None
+            return
+        for key, slot, used in zip(keys, slots.tolist(), last_used.tolist()):
+            self.slots[key.tobytes()] = slot
+            self.last_used[key.tobytes()] = used
+        self.persisted = set(self.slots.values())
+        self.free = [slot for slot in range(len(self.vectors) - 1, -1, -1) if slot not in self.persisted]
+
+    def _reserve(self, n, dim):
+        """Makes room for n new rows of width dim, growing or evicting as needed."""
+        if self.vectors is None or self.vectors.shape[1] != dim:
+            if self.persisted:
+                # The index on disk refers to rows of the vectors about to be replaced
+                os.remove(self.index_path)
+            self.slots, self.last_used, self.free, self.persisted = {}, {}, [], set()
+            self.vectors = None
+        capacity = 0 if self.vectors is None else len(self.vectors)
+
+        if len(self.free) < n and capacity < self.max_entries:
+            new_capacity = min(self.max_entries, max(2 * capacity, len(self.slots) + n, 1024))
+            os.makedirs(self.dir, exist_ok=True)
+            tmp_path = self.vectors_path + ".tmp"
+            grown = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=self.dtype, shape=(new_capacity, dim))
+            if capacity:
+                grown[:capacity] = self.vectors
+            grown.flush()
+            del grown
+            self.vectors = None
+            os.replace(tmp_path, self.vectors_path)
+            self.vectors = np.load(self.vectors_path, mmap_mode="r+")
+            self.free.extend(range(new_capacity - 1, capacity - 1, -1))
+
+        if len(self.free) < n:
+            # Evict the least recently used rows
+            oldest = sorted(self.last_used, key=self.last_used.get)[:n - len(self.free)]
+            evicted = [self.slots.pop(key) for key in oldest]
+            for key in oldest:
+                del self.last_used[key]
+            self.free.extend(evicted)
+            self.evictions += len(oldest)
+            if not self.persisted.isdisjoint(evicted):
+                # Write the index without the evicted keys before their rows are reused
+                self.flush()
+
+    def encode(self, texts, encode_fn):
+        """
+        Returns a float32 (len(texts), dim) matrix of embeddings. encode_fn maps
+        a list of texts to a (n, dim) array and is called once, with the unique
+        texts that are not cached, or not at all when everything is a hit.
+        """
+        if not self.enabled or not texts:
+            return np.asarray(encode_fn(list(texts)), dtype=np.float32)
+
+        self.clock += 1
+        self.dirty = True
+        keys = [text_key(text) for text in texts]
+        missing = {}
+        for i, key in enumerate(keys):
+            if key in self.slots:
+                self.last_used[key] = self.clock
+                self.hits += 1
+            else:
+                missing.setdefault(key, i)
+                self.misses += 1
+
+        fresh = {}
+        if missing:
+            encoded = np.asarray(encode_fn([texts[i] for i in missing.values()]), dtype=np.float32)
+            fresh = dict(zip(missing, encoded))
+
+        dim = encoded.shape[1] if missing else self.vectors.shape[1]
+        out = np.empty((len(texts), dim), dtype=np.float32)
+        for i, key in enumerate(keys):
+            out[i] = fresh[key] if key in fresh else self.vectors[self.slots[key]]
+
+        if fresh:
+            n_store = min(len(fresh), self.max_entries)
+            self._reserve(n_store, dim)
+            for key, vector in list(fresh.items())[:n_store]:
+                slot = self.free.pop()
+                self.vectors[slot] = vector
+                self.slots[key] = slot
+                self.last_used[key] = self.clock
+            # After _reserve, whose eviction flush leaves these rows unwritten
+            self.dirty = True
+        return out
+
+    def flush(self):
+        """Writes new rows and the index to disk."""
+        if not (self.enabled and self.dirty):
+            return
+        self.vectors.flush()
+        keys = list(self.slots)
+        tmp_path = self.index_path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            keys=np.frombuffer(b"".join(keys), dtype=np.uint8).reshape(len(keys), 32),
+            slots=np.array([self.slots[k] for k in keys], dtype=np.int64),
+            last_used=np.array([self.last_used[k] for k in keys], dtype=np.int64),
+            clock=self.clock,
+        )
+        os.replace(tmp_path, self.index_path)
+        self.persisted = set(self.slots.values())
+        self.dirty = False
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self.slots),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
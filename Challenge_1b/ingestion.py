@@ -0,0 +1,146 @@
+# ingestion.py
+#
+# Page-aware PDF text extraction and chunking. Text is read one page at a time
+# and cut into fixed-size word chunks that may span pages; each chunk carries
+# the page number of its first word. Only the current page's text and the
+# words of the chunk being filled are held at once. Documents are extracted
+# concurrently in a process pool.
+#
+# The "docstore" backend reads pages from the parsed-document store shared
+# with Challenge_1a (docstore.py at the repository root), so a PDF whose
+# outline was extracted there is not parsed again.
+#
+#     chunks = page_chunks("doc.pdf", 180, "pdfminer")   # [(page, text), ...]
+#     all_chunks = extract_documents(paths, functools.partial(page_chunks, backend="pymupdf"), workers=4)
+
+import io
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+
+class PDFMinerBackend:
+    """
+    pdfminer.six with the same settings as pdfminer.high_level.extract_text,
+    whose output is these pages concatenated: the words of a document, and so
+    the chunk texts, are identical.
+    """
+    name = "pdfminer"
+
+    def pages(self, pdf_path):
+        """Yields the text of each page."""
+        from pdfminer.converter import TextConverter
+        from pdfminer.layout import LAParams
+        from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+        from pdfminer.pdfpage import PDFPage
+
+        with open(pdf_path, "rb") as fp, io.StringIO() as output:
+            manager = PDFResourceManager(caching=True)
+            device = TextConverter(manager, output, codec="utf-8", laparams=LAParams())
+            interpreter = PDFPageInterpreter(manager, device)
+            for page in PDFPage.get_pages(fp, caching=True):
+                interpreter.process_page(page)
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate()
+            device.close()
+
+
+class PyMuPDFBackend:
+    """
+    PyMuPDF's plain text extraction (page.get_text("text")). Several times
+    faster than pdfminer; word boundaries can differ slightly, so chunk texts
+    (and their cached embeddings) are not shared with the pdfminer backend.
+    """
+    name = "pymupdf"
+
+    def pages(self, pdf_path):
+        import fitz
+
+        with fitz.open(pdf_path) as doc:
+            for page in doc:
+                yield page.get_text("text")
+
+
+def import_docstore():
+    """The shared docstore module from the repository root, or None when it is not there (e.g. a Docker image)."""
+    shared_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if shared_dir not in sys.path:
+        sys.path.append(shared_dir)
+    try:
+        import docstore
+    except ImportError:
+        return None
+    return docstore
+
+
+class DocStoreBackend:
+    """
+    Page text rebuilt from the PyMuPDF spans in the shared document store
+    (spans joined per line, one line per line): the words, and so the
+    chunks, of the pymupdf backend, without parsing a stored PDF again.
+    """
+    name = "docstore"
+
+    def __init__(self, docstore=None):
+        docstore = docstore or import_docstore()
+        self.store = docstore.DocumentStore()
+
+    def pages(self, pdf_path):
+        with self.store.get(pdf_path) as doc:
+            for page in range(doc.page_count):
+                yield doc.page_text(page)
+
+
+BACKENDS = {backend.name: backend for backend in (PDFMinerBackend, PyMuPDFBackend, DocStoreBackend)}
+
+
+def get_backend(name):
+    if name == DocStoreBackend.name:
+        docstore = import_docstore()
+        if docstore is None:
+            print("Warning: docstore module not found, using the pymupdf ingestion backend")
+            return PyMuPDFBackend()
+        return DocStoreBackend(docstore)
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown ingestion backend '{name}', expected one of {sorted(BACKENDS)}")
+
+
+def iter_chunks(pdf_path, chunk_size=180, backend="pdfminer"):
+    """
+    Yields (page_number, text) chunks of chunk_size words, reading the PDF page
+    by page. page_number is 1-based: the page of the chunk's first word.
+    """
+    words = []
+    first_page = None
+    for page_number, page_text in enumerate(get_backend(backend).pages(pdf_path), start=1):
+        for word in page_text.split():
+            if not words:
+                first_page = page_number
+            words.append(word)
+            if len(words) == chunk_size:
+                yield first_page, ' '.join(words)
+                words = []
+    if words:
+        yield first_page, ' '.join(words)
+
+
+def page_chunks(pdf_path, chunk_size=180, backend="pdfminer"):
+    return list(iter_chunks(pdf_path, chunk_size, backend))
+
+
+def extract_documents(paths, chunker, workers=None):
+    """
+    Returns [chunker(path) for path in paths], computed in a pool of worker
+    processes (os.cpu_count() by default). chunker must be picklable, e.g. a
+    module-level function or a functools.partial of one. With one worker or
+    one document everything runs in this process.
+    """
+    paths = list(paths)
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    if workers <= 1:
+        return [chunker(path) for path in paths]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(chunker, paths))
@@ -1,16 +1,24 @@
 
 # ✅ CELL 2: Imports and Setup
-import os
+# torch / sentence-transformers are only imported by get_model(), on the first
+# embedding that is not in the cache: BM25-only and fully cached runs skip them.
 import time
+_STARTED = time.perf_counter()
+import os
+import sys
 import json
-from pdfminer.high_level import extract_text
-from rank_bm25 import BM25Okapi
-from sentence_transformers import SentenceTransformer, util
+import argparse
+from functools import partial
 import numpy as np
 from pathlib import Path
 import re
-
-print("Setup complete ✅")
+from bm25_index import BM25Index
+from dense_index import DenseIndex, hybrid_top_chunks
+import ingestion
+import batching
+from embedding_cache import EmbeddingCache, model_identity
+# Startup timings in seconds: imports and first written result since process start, model load duration
+STARTUP = {"imports": time.perf_counter() - _STARTED, "model_load": None, "first_result": None}
 
 # ✅ CELL 3: Configuration
 BASE_PATH = "."  # ← Set to current directory
@@ -18,42 +26,127 @@ PDF_FOLDER_NAME = "PDFs"
 INPUT_JSON = "challenge1b_input.json"
 OUTPUT_JSON = "challenge1b_output.json"
 MODEL_NAME = os.path.join(BASE_PATH, "models", "specter2")
+# Persistent chunk embeddings (see embedding_cache.py); set EMBEDDING_CACHE_MAX_ENTRIES = 0 to disable
+EMBEDDING_CACHE_DIR = os.path.join(BASE_PATH, ".cache", "embeddings")
+EMBEDDING_CACHE_MAX_ENTRIES = 100_000
+EMBEDDING_CACHE_DTYPE = "float32"  # or "float16" to halve the cache size
+# Per-collection BM25 index (see bm25_index.py), kept inside each Collection_* folder
+BM25_INDEX_DIRNAME = ".bm25_index"
+# PDF text extraction (see ingestion.py): "pdfminer", the faster "pymupdf", or "docstore"
+# (pymupdf's text, read from the parsed-document store shared with Challenge_1a)
+PDF_BACKEND = "pdfminer"
+CHUNK_SIZE = 180
+INGEST_WORKERS = os.cpu_count()
+BM25_TOP_K = 60
+# Candidate retrieval: "bm25", or "hybrid" to fuse BM25 with a dense index of all chunk
+# embeddings (see dense_index.py), kept inside each Collection_* folder
+RETRIEVAL = "bm25"
+DENSE_INDEX_DIRNAME = ".dense_index"
+# Set to False (or pass --bm25-only) to rank by BM25 alone, without the embedding model
+RERANK = True
+# "fp32", or "int8": PyTorch dynamic int8 quantization of the model's Linear layers (CPU).
+# Check its agreement with fp32 first: python -m benchmarks.bench_int8
+MODEL_PRECISION = "fp32"
+# Encoding batches are cut by padded size (texts x longest text, in tokens), not by count
+MAX_BATCH_TOKENS = 4096
+# CPU threads for torch; None keeps torch's default (one per physical core)
+TORCH_THREADS = None
+
+_model = None
+_embedding_cache = None
+
+def load_model(precision=None):
+    """Loads the sentence embedding model in the given precision (default MODEL_PRECISION)."""
+    precision = precision or MODEL_PRECISION
+    if precision not in ("fp32", "int8"):
+        raise ValueError(f"Unknown model precision '{precision}', expected 'fp32' or 'int8'")
+    # Ensure completely offline mode with fallback message
+    model_required_files = ["config.json", "pytorch_model.bin", "tokenizer.json"]
+    if not Path(MODEL_NAME).exists() or not all(Path(MODEL_NAME, f).exists() for f in model_required_files):
+        raise FileNotFoundError(
+            f"❌ Model not found in '{MODEL_NAME}'. Please download it manually from Hugging Face:\n"
+            f"https://huggingface.co/allenai/specter2_base and place the files inside 'Challenge_1b/models/specter2/'"
+        )
+    import torch
+    from sentence_transformers import SentenceTransformer
+    if TORCH_THREADS:
+        torch.set_num_threads(TORCH_THREADS)
+    model = SentenceTransformer(MODEL_NAME, device='cpu')
+    if precision == "int8":
+        # Weights stored as int8, activations quantized on the fly per batch
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+def get_model():
+    """The sentence embedding model, loaded on first use."""
+    global _model
+    if _model is None:
+        start = time.perf_counter()
+        _model = load_model()
+        STARTUP["model_load"] = time.perf_counter() - start
+    return _model
 
-# Ensure completely offline mode with fallback message
-model_required_files = ["config.json", "pytorch_model.bin", "tokenizer.json"]
-if not Path(MODEL_NAME).exists() or not all(Path(MODEL_NAME, f).exists() for f in model_required_files):
-    raise FileNotFoundError(
-        f"❌ Model not found in '{MODEL_NAME}'. Please download it manually from Hugging Face:\n"
-        f"https://huggingface.co/allenai/specter2_base and place the files inside 'Challenge_1b/models/specter2/'"
-    )
+def embedding_model_id():
+    # Quantized embeddings are stored apart from fp32 ones (fp32 keeps its existing key)
+    settings = {"precision": MODEL_PRECISION} if MODEL_PRECISION != "fp32" else {}
+    return model_identity(MODEL_NAME, **settings)
 
-model = SentenceTransformer(MODEL_NAME, device='cpu')
+def get_embedding_cache():
+    global _embedding_cache
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache(EMBEDDING_CACHE_DIR, embedding_model_id(), EMBEDDING_CACHE_MAX_ENTRIES,
+                                          EMBEDDING_CACHE_DTYPE, enabled=EMBEDDING_CACHE_MAX_ENTRIES > 0)
+    return _embedding_cache
 
 # ✅ CELL 4: Discover Collections
-collections = [d for d in os.listdir(BASE_PATH) if os.path.isdir(os.path.join(BASE_PATH, d)) and d.startswith("Collection")]
-print(f"Found {len(collections)} collections:", collections)
+def find_collections(base_path=BASE_PATH):
+    return [d for d in os.listdir(base_path) if os.path.isdir(os.path.join(base_path, d)) and d.startswith("Collection")]
 
 # ✅ CELL 5: Utilities
-def extract_chunks_from_pdf(pdf_path, chunk_size=180):
-    text = extract_text(pdf_path)
-    words = text.split()
-    return [' '.join(words[i:i+chunk_size]) for i in range(0, len(words), chunk_size)]
-
-def bm25_top_chunks(query, chunks, meta_info, top_k=60):
-    bm25 = BM25Okapi([chunk.lower().split() for chunk in chunks])
-    query_tokens = query.lower().split()
-    scores = bm25.get_scores(query_tokens)
-    top_indices = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:top_k]
-    return [(chunks[i], meta_info[i]) for i in top_indices]
+def extract_all(chunker, paths):
+    return ingestion.extract_documents(paths, chunker, INGEST_WORKERS)
+
+def bm25_top_chunks(query, index, documents, top_k=BM25_TOP_K):
+    return index.top_k(query, top_k, documents)
+
+def encode_texts(texts):
+    # Sorted by token length and batched under a token budget (see batching.py)
+    return batching.encode_bucketed(get_model(), texts, MAX_BATCH_TOKENS)
+
+def cos_sim(a, b):
+    """Cosine similarity of every row of a with every row of b, as sentence_transformers.util.cos_sim."""
+    a = a / np.maximum(np.linalg.norm(a, axis=1, keepdims=True), 1e-12)
+    b = b / np.maximum(np.linalg.norm(b, axis=1, keepdims=True), 1e-12)
+    return a @ b.T
 
 def rerank_chunks(query, candidate_chunks):
-    texts = [chunk[0] for chunk in candidate_chunks]
-    chunk_embeddings = model.encode(texts, convert_to_tensor=True, show_progress_bar=False)
-    query_embedding = model.encode(query, convert_to_tensor=True, show_progress_bar=False)
-    cos_scores = util.pytorch_cos_sim(query_embedding, chunk_embeddings)[0]
-    top_results = np.argsort(-cos_scores.cpu().numpy())
+    top_results, cos_scores = rerank_many([query], [candidate_chunks])[0]
     return top_results, cos_scores
 
+def rerank_many(queries, candidate_lists):
+    """
+    Reranks each query's BM25 candidates by cosine similarity. All query texts
+    are encoded together with the union of the candidates in one call (only
+    cache misses go through the model), then every query is scored against the
+    union with a single matrix product. Returns (ranked indices, scores) per
+    query.
+    """
+    embedding_cache = get_embedding_cache()
+    union = {}
+    for candidates in candidate_lists:
+        for chunk_text, _ in candidates:
+            union.setdefault(chunk_text, len(union))
+    # Only texts not seen before go through the model
+    embeddings = embedding_cache.encode(list(union) + list(queries), encode_texts)
+    chunk_embeddings, query_embeddings = embeddings[:len(union)], embeddings[len(union):]
+    cos_matrix = cos_sim(query_embeddings, chunk_embeddings)
+
+    results = []
+    for row, candidates in zip(cos_matrix, candidate_lists):
+        cos_scores = row[[union[chunk_text] for chunk_text, _ in candidates]]
+        results.append((np.argsort(-cos_scores), cos_scores))
+    return results
+
 def smart_title(text):
     text = re.sub(r'[^a-zA-Z0-9\s]', '', text)
     words = text.strip().split()
@@ -96,11 +189,126 @@ def create_output_json(ranked_indices, candidates, scores, persona, job):
             break
     return output
 
-# ✅ CELL 6: Process Each Collection
-for collection in collections:
+# ✅ CELL 6: Collection Index and Queries
+def open_collection(col_path):
+    """
+    Brings the collection's BM25 index up to date with its PDFs (only new or
+    changed PDFs are parsed) and returns it.
+    """
+    pdf_dir = os.path.join(col_path, PDF_FOLDER_NAME)
+    index = BM25Index(os.path.join(col_path, BM25_INDEX_DIRNAME), chunk_size=CHUNK_SIZE, backend=PDF_BACKEND)
+    # New or changed PDFs are extracted page by page, in parallel worker processes
+    chunker = partial(ingestion.page_chunks, chunk_size=CHUNK_SIZE, backend=PDF_BACKEND)
+    added, removed = index.update(pdf_dir, chunker, extract_all)
+    print(f"Total chunks: {len(index)} ({len(added)} PDFs indexed, {len(removed)} removed)")
+    return index
+
+def open_dense_index(col_path, index):
+    """
+    Brings the collection's dense index in line with its BM25 index and
+    returns it. Chunks of new or changed PDFs are embedded through the cache.
+    """
+    dense = DenseIndex(os.path.join(col_path, DENSE_INDEX_DIRNAME), embedding_model_id())
+    embedded = dense.sync(index, lambda texts: get_embedding_cache().encode(texts, encode_texts))
+    print(f"Dense index: {len(dense)} chunks ({embedded} added, "
+          f"{'IVF' if dense.centroids is not None else 'exact'} search)")
+    return dense
+
+def collection_documents(col_path, index):
+    """The documents listed in the collection's input JSON, or all indexed PDFs without one."""
+    input_json_path = os.path.join(col_path, INPUT_JSON)
+    if not os.path.exists(input_json_path):
+        return sorted(index.documents, key=lambda name: index.documents[name]["id"])
+    with open(input_json_path) as f:
+        input_data = json.load(f)
+    documents = [doc["filename"] for doc in input_data["documents"]]
+    missing = [name for name in documents if name not in index.documents]
+    if missing:
+        print(f"Warning: documents not found in {os.path.join(col_path, PDF_FOLDER_NAME)}: {missing}")
+    return documents
+
+def retrieve_candidates(index, documents, texts, top_k=BM25_TOP_K, dense=None):
+    """
+    The candidate chunks of each query text against one indexed collection:
+    BM25, or with a dense index BM25 and dense results fused (hybrid retrieval).
+    """
+    if dense is not None:
+        query_embeddings = get_embedding_cache().encode(texts, encode_texts)
+        return [hybrid_top_chunks(index, dense, text, embedding, top_k, documents)
+                for text, embedding in zip(texts, query_embeddings)]
+    return [bm25_top_chunks(text, index, documents, top_k) for text in texts]
+
+def rank_candidates(queries, candidate_lists):
+    """
+    Reranks each (persona, job) query's candidates (all queries in one model
+    pass, whatever collection they came from) and returns one
+    create_output_json result per query, in order.
+    """
+    texts = [f"{persona}. Job: {job}" for persona, job in queries]
+    if RERANK:
+        reranked = rerank_many(texts, candidate_lists)
+    else:
+        reranked = [(np.arange(len(candidates)), None) for candidates in candidate_lists]
+    return [create_output_json(ranked, candidates, scores, persona, job)
+            for (persona, job), candidates, (ranked, scores) in zip(queries, candidate_lists, reranked)]
+
+def answer_queries(index, documents, queries, top_k=BM25_TOP_K, dense=None):
+    """
+    Answers (persona, job) queries against one indexed collection and returns
+    one create_output_json result per query, in order. With a dense index,
+    candidates are BM25 and dense results fused (hybrid retrieval).
+    """
+    texts = [f"{persona}. Job: {job}" for persona, job in queries]
+    return rank_candidates(queries, retrieve_candidates(index, documents, texts, top_k, dense))
+
+def parse_query(entry):
+    """
+    (persona, job) of a query shaped like challenge1b_input.json
+    ({"persona": {"role"}, "job_to_be_done": {"task"}}) or flat
+    ({"persona": ..., "job": ...}).
+    """
+    persona = entry["persona"]
+    job = entry.get("job_to_be_done", entry.get("job"))
+    if isinstance(persona, dict):
+        persona = persona["role"]
+    if isinstance(job, dict):
+        job = job["task"]
+    if not isinstance(persona, str) or not isinstance(job, str):
+        raise ValueError("persona and job must be strings")
+    return persona, job
+
+def read_queries(path):
+    """
+    Queries from a JSON list or a JSONL file, each entry as parse_query takes
+    it; an optional "id" names its output, so it must be a plain file name,
+    unique among the queries (ValueError otherwise).
+    Returns (ids, [(persona, job), ...]).
+    """
+    with open(path) as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        entries = json.loads(text)
+    else:
+        entries = [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    ids, queries = [], []
+    seen = {}   # id -> 1-based entry number
+    for i, entry in enumerate(entries):
+        query_id = str(entry.get("id", i + 1))
+        if query_id in ("", ".", "..") or os.path.basename(query_id) != query_id or \
+                (os.altsep and os.altsep in query_id):
+            raise ValueError(f"Query id {query_id!r} (entry {i + 1} of {path}) is not a plain file name")
+        if query_id in seen:
+            raise ValueError(f"Query id {query_id!r} (entry {i + 1} of {path}) is used by entry {seen[query_id]} too")
+        seen[query_id] = i + 1
+        ids.append(query_id)
+        queries.append(parse_query(entry))
+    return ids, queries
+
+# ✅ CELL 7: Process Each Collection
+def process_collection(collection):
     print(f"\n🔍 Processing collection: {collection}")
     col_path = os.path.join(BASE_PATH, collection)
-    pdf_dir = os.path.join(col_path, PDF_FOLDER_NAME)
     input_json_path = os.path.join(col_path, INPUT_JSON)
     output_json_path = os.path.join(col_path, OUTPUT_JSON)
 
@@ -109,28 +317,112 @@ for collection in collections:
 
     persona = input_data["persona"]["role"]
     job = input_data["job_to_be_done"]["task"]
-    persona_job_text = f"{persona}. Job: {job}"
-
-    all_chunks = []
-    all_meta = []
-
-    for doc in input_data["documents"]:
-        filename = doc["filename"]
-        full_path = os.path.join(pdf_dir, filename)
-        chunks = extract_chunks_from_pdf(full_path)
-        for idx, chunk in enumerate(chunks):
-            all_chunks.append(chunk)
-            all_meta.append({"document": filename, "page_number": idx + 1})
 
-    print(f"Total chunks: {len(all_chunks)}")
+    index = open_collection(col_path)
+    dense = open_dense_index(col_path, index) if RETRIEVAL == "hybrid" else None
+    documents = collection_documents(col_path, index)
 
     start_time = time.time()
-    bm25_top = bm25_top_chunks(persona_job_text, all_chunks, all_meta)
-    rerank_indices, scores = rerank_chunks(persona_job_text, bm25_top)
-    final_json = create_output_json(rerank_indices, bm25_top, scores, persona, job)
+    final_json = answer_queries(index, documents, [(persona, job)], dense=dense)[0]
 
     with open(output_json_path, "w") as f:
         json.dump(final_json, f, indent=2)
 
+    record_first_result()
     print(f"✅ Output saved to {output_json_path}")
     print(f"⏱️ Time taken: {time.time() - start_time:.2f} seconds")
+
+def process_queries(collection, queries_path, output_dir):
+    """Batch mode: many queries against one collection, indexed once."""
+    ids, queries = read_queries(queries_path)
+    print(f"\n🔍 Processing collection: {collection}")
+    col_path = os.path.join(BASE_PATH, collection)
+    index = open_collection(col_path)
+    dense = open_dense_index(col_path, index) if RETRIEVAL == "hybrid" else None
+    documents = collection_documents(col_path, index)
+
+    start_time = time.time()
+    results = answer_queries(index, documents, queries, dense=dense)
+    elapsed = time.time() - start_time
+
+    os.makedirs(output_dir, exist_ok=True)
+    for query_id, final_json in zip(ids, results):
+        with open(os.path.join(output_dir, f"{query_id}.json"), "w") as f:
+            json.dump(final_json, f, indent=2)
+
+    record_first_result()
+    print(f"✅ {len(results)} outputs saved to {output_dir}")
+    print(f"⏱️ Time taken: {elapsed:.2f} seconds ({len(results) / max(elapsed, 1e-9):.1f} queries/sec)")
+
+def record_first_result():
+    if STARTUP["first_result"] is None:
+        STARTUP["first_result"] = time.perf_counter() - _STARTED
+
+def print_encode_stats():
+    if batching.ENCODE_STATS.texts:
+        print(f"\nEncoding: {batching.ENCODE_STATS.summary()}")
+
+def print_startup():
+    model_load = f"{STARTUP['model_load']:.2f}s" if STARTUP["model_load"] is not None else "not needed"
+    first_result = f"{STARTUP['first_result']:.2f}s" if STARTUP["first_result"] is not None else "-"
+    print(f"\nStartup: imports {STARTUP['imports']:.2f}s, model load {model_load}, first result after {first_result}")
+
+def flush_embedding_cache():
+    """Writes new cache entries to disk (a no-op before the cache is first used)."""
+    if _embedding_cache is not None:
+        _embedding_cache.flush()
+
+def print_cache_stats():
+    embedding_cache = _embedding_cache
+    if embedding_cache is None:
+        return
+    embedding_cache.flush()
+    if embedding_cache.enabled:
+        stats = embedding_cache.stats()
+        print(f"\nEmbedding cache: {stats['hits']} hits, {stats['misses']} misses "
+              f"({stats['hit_rate']:.0%} hit rate), {stats['entries']} entries, {stats['evictions']} evicted")
+
+def main():
+    global RERANK, MODEL_PRECISION, RETRIEVAL, PDF_BACKEND
+    parser = argparse.ArgumentParser(description="Persona-driven section ranking over PDF collections.")
+    parser.add_argument("--collection", help="Collection folder for batch mode (default: every Collection_* folder, "
+                                             "each with the query in its challenge1b_input.json)")
+    parser.add_argument("--queries", help="JSON list or JSONL file of persona/job queries to answer against --collection")
+    parser.add_argument("--output-dir", help="Where batch mode writes one <id>.json per query "
+                                             "(default: <collection>/outputs)")
+    parser.add_argument("--bm25-only", action="store_true", help="Rank by BM25 alone; the embedding model is not loaded")
+    parser.add_argument("--precision", choices=["fp32", "int8"], help=f"Model precision (default: {MODEL_PRECISION})")
+    parser.add_argument("--retrieval", choices=["bm25", "hybrid"], help=f"Candidate retrieval (default: {RETRIEVAL})")
+    parser.add_argument("--pdf-backend", choices=sorted(ingestion.BACKENDS),
+                        help=f"PDF text extraction; docstore shares parses with Challenge_1a (default: {PDF_BACKEND})")
+    args = parser.parse_args()
+    if args.pdf_backend:
+        PDF_BACKEND = args.pdf_backend
+    if args.retrieval:
+        RETRIEVAL = args.retrieval
+    if args.bm25_only:
+        RERANK = False
+    if args.precision:
+        MODEL_PRECISION = args.precision
+
+    if args.queries and not args.collection:
+        parser.error("--queries needs --collection")
+    try:
+        if args.queries:
+            output_dir = args.output_dir or os.path.join(BASE_PATH, args.collection, "outputs")
+            process_queries(args.collection, args.queries, output_dir)
+        else:
+            collections = [args.collection] if args.collection else find_collections()
+            print(f"Found {len(collections)} collections:", collections)
+            for collection in collections:
+                process_collection(collection)
+    finally:
+        # Keep what was embedded even when a collection fails
+        flush_embedding_cache()
+    print_cache_stats()
+    print_encode_stats()
+    print_startup()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,308 @@
+# service.py
+#
+# Resident query service: loads the model and opens the collections' indexes
+# once, then answers persona/job queries over local HTTP. Requests arriving
+# within a short window of each other are coalesced into one micro-batch:
+# their candidates are reranked with a single model pass (rerank_many), on an
+# executor thread, so the event loop keeps accepting requests meanwhile. While
+# a batch runs, new requests queue up and form the next one.
+#
+#     python service.py                                  # every Collection_* folder
+#     python service.py --collection Collection_1 --window-ms 10 --max-batch 64
+#
+#     curl -s localhost:8766/query -d '{"collection": "Collection_1", "persona": "Travel Planner", "job": "Plan a trip"}'
+#     curl -s localhost:8766/health
+#
+# /query takes the query as read_queries entries are written (flat or nested
+# like challenge1b_input.json) plus "collection" (optional with one collection)
+# and answers with the create_output_json result.
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import main as pipeline
+
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 8766
+# Time the first query of a batch waits for others, and the largest batch
+BATCH_WINDOW_MS = 5.0
+MAX_BATCH = 32
+# Seconds between writes of new embedding cache entries to disk (also written on shutdown)
+CACHE_FLUSH_INTERVAL = 60.0
+# Queries allowed to wait for a batch before requests get 503
+QUEUE_SIZE = 256
+MAX_BODY_BYTES = 1 << 20
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large", 500: "Internal Server Error",
+           503: "Service Unavailable"}
+
+
+class WarmCollection:
+    """One collection's BM25 index (and dense index, for hybrid retrieval) and its document list."""
+    def __init__(self, name):
+        col_path = os.path.join(pipeline.BASE_PATH, name)
+        self.name = name
+        self.index = pipeline.open_collection(col_path)
+        self.dense = pipeline.open_dense_index(col_path, self.index) if pipeline.RETRIEVAL == "hybrid" else None
+        self.documents = pipeline.collection_documents(col_path, self.index)
+
+
+def answer_batch(collections, jobs):
+    """
+    Answers [(collection name, persona, job)] in order: candidates are
+    retrieved per collection, then all queries are reranked together.
+    """
+    candidate_lists = [None] * len(jobs)
+    by_collection = {}
+    for position, (name, _, _) in enumerate(jobs):
+        by_collection.setdefault(name, []).append(position)
+    for name, positions in by_collection.items():
+        collection = collections[name]
+        texts = [f"{jobs[i][1]}. Job: {jobs[i][2]}" for i in positions]
+        found = pipeline.retrieve_candidates(collection.index, collection.documents, texts, dense=collection.dense)
+        for position, candidates in zip(positions, found):
+            candidate_lists[position] = candidates
+    return pipeline.rank_candidates([(persona, job) for _, persona, job in jobs], candidate_lists)
+
+
+class QueryBatcher:
+    """
+    Collects submitted queries into batches of up to max_batch, waiting at
+    most window seconds after a batch's first query, and answers each batch
+    with answer_batch on a single executor thread (the model parallelizes
+    internally; batches never run concurrently). At most queue_size queries
+    wait; beyond that submit() refuses new ones.
+    """
+    def __init__(self, collections, window, max_batch, queue_size):
+        self.collections = collections
+        self.window = window
+        self.max_batch = max_batch
+        self.queue = asyncio.Queue(queue_size)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.counts = {"queries": 0, "batches": 0, "failed": 0, "rejected": 0}
+        self.busy_seconds = 0.0
+        self.flushed = time.monotonic()
+
+    def submit(self, name, persona, job):
+        """Queues a query; returns a Future of its result, or None if the queue is full."""
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((name, persona, job, future))
+        except asyncio.QueueFull:
+            self.counts["rejected"] += 1
+            return None
+        return future
+
+    async def _next_batch(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self.queue.get()]
+        deadline = loop.time() + self.window
+        while len(batch) < self.max_batch:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            start = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(self.executor, answer_batch, self.collections,
+                                                     [item[:3] for item in batch])
+            except Exception as e:
+                self.counts["failed"] += len(batch)
+                results = [e] * len(batch)
+            self.busy_seconds += time.perf_counter() - start
+            self.counts["batches"] += 1
+            self.counts["queries"] += len(batch)
+            for (*_, future), result in zip(batch, results):
+                # The client may have gone away
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+            if time.monotonic() - self.flushed > CACHE_FLUSH_INTERVAL:
+                # On the executor thread, so never while a batch is encoding
+                await loop.run_in_executor(self.executor, pipeline.flush_embedding_cache)
+                self.flushed = time.monotonic()
+
+    def health(self):
+        batches = self.counts["batches"]
+        return {**self.counts, "pending": self.queue.qsize(),
+                "mean_batch_size": self.counts["queries"] / batches if batches else 0.0,
+                "busy_seconds": self.busy_seconds}
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+class QueryService:
+    """
+    HTTP/1.1 over asyncio streams, with keep-alive:
+
+    GET /health  -> counters, collections, uptime
+    POST /query  -> {"collection": ..., "persona": ..., "job": ...}
+                    answers the create_output_json result
+    """
+    def __init__(self, batcher):
+        self.batcher = batcher
+        self.started = time.time()
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    method, path, version = request_line.decode("latin-1").split()
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    await self._send(writer, 400, {"error": "Malformed request"}, keep_alive=False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self._send(writer, 413, {"error": f"Body larger than {MAX_BODY_BYTES} bytes"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                code, payload, extra = await self.dispatch(method, path, body)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                await self._send(writer, code, payload, extra, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _send(self, writer, code, body, headers=None, keep_alive=True):
+        payload = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        lines = [f"HTTP/1.1 {code} {REASONS[code]}", "Content-Type: application/json",
+                 f"Content-Length: {len(payload)}", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + payload)
+        await writer.drain()
+
+    async def dispatch(self, method, path, body):
+        """Returns (status code, JSON body, extra headers)."""
+        if method == "GET" and path == "/health":
+            return 200, {"status": "ok", "collections": sorted(self.batcher.collections),
+                         "uptime": time.time() - self.started, **self.batcher.health()}, None
+        if method != "POST" or path != "/query":
+            return 404, {"error": f"Unknown path {method} {path}"}, None
+
+        try:
+            entry = json.loads(body or b"{}")
+            persona, job = pipeline.parse_query(entry)
+            name = entry.get("collection")
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return 400, {"error": 'Expected a JSON body like {"collection": ..., "persona": ..., "job": ...}'}, None
+        if name is None and len(self.batcher.collections) == 1:
+            name = next(iter(self.batcher.collections))
+        if name not in self.batcher.collections:
+            return 404, {"error": f"Unknown collection {name!r}, serving {sorted(self.batcher.collections)}"}, None
+
+        future = self.batcher.submit(name, persona, job)
+        if future is None:
+            return 503, {"error": "Service busy, retry later"}, {"Retry-After": "1"}
+        try:
+            return 200, await future, None
+        except Exception as e:
+            return 500, {"error": f"{type(e).__name__}: {e}"}, None
+
+
+async def serve(collections, host, port, window, max_batch, queue_size):
+    batcher = QueryBatcher(collections, window, max_batch, queue_size)
+    service = QueryService(batcher)
+    server = await asyncio.start_server(service.handle, host, port)
+    batch_task = asyncio.create_task(batcher.run())
+    # SIGINT / SIGTERM stop the server so main() can write the embedding cache
+    stop = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        asyncio.get_running_loop().add_signal_handler(signum, stop.set)
+    print(f"🚀 Serving {len(collections)} collection(s) on http://{host}:{port} "
+          f"(batch window {window * 1000:g} ms, up to {max_batch} queries)")
+    try:
+        async with server:
+            await stop.wait()
+    finally:
+        batch_task.cancel()
+        batcher.shutdown()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Resident persona/job query service.")
+    parser.add_argument("--host", default=SERVICE_HOST)
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--collection", action="append", help="Collection folder to serve (repeatable; "
+                                                                "default: every Collection_* folder)")
+    parser.add_argument("--window-ms", type=float, default=BATCH_WINDOW_MS,
+                        help="How long the first query of a batch waits for others")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE)
+    parser.add_argument("--bm25-only", action="store_true", help="Rank by BM25 alone; the embedding model is not loaded")
+    parser.add_argument("--precision", choices=["fp32", "int8"], help=f"Model precision (default: {pipeline.MODEL_PRECISION})")
+    parser.add_argument("--retrieval", choices=["bm25", "hybrid"], help=f"Candidate retrieval (default: {pipeline.RETRIEVAL})")
+    parser.add_argument("--pdf-backend", choices=sorted(pipeline.ingestion.BACKENDS),
+                        help=f"PDF text extraction; docstore shares parses with Challenge_1a (default: {pipeline.PDF_BACKEND})")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.retrieval:
+        pipeline.RETRIEVAL = args.retrieval
+    if args.pdf_backend:
+        pipeline.PDF_BACKEND = args.pdf_backend
+    if args.bm25_only:
+        pipeline.RERANK = False
+    if args.precision:
+        pipeline.MODEL_PRECISION = args.precision
+
+    start = time.perf_counter()
+    collections = {name: WarmCollection(name) for name in (args.collection or sorted(pipeline.find_collections()))}
+    if pipeline.RERANK:
+        pipeline.get_model()
+    # Warm up: first forward pass, and the embeddings of each collection's own query's candidates
+    for name, collection in collections.items():
+        input_json_path = os.path.join(pipeline.BASE_PATH, name, pipeline.INPUT_JSON)
+        if os.path.exists(input_json_path):
+            with open(input_json_path) as f:
+                answer_batch(collections, [(name, *pipeline.parse_query(json.load(f)))])
+    print(f"Collections and model ready in {time.perf_counter() - start:.2f}s")
+
+    try:
+        asyncio.run(serve(collections, args.host, args.port, args.window_ms / 1000, max(1, args.max_batch),
+                          max(1, args.queue_size)))
+    finally:
+        pipeline.flush_embedding_cache()
+    pipeline.print_cache_stats()
+    pipeline.print_encode_stats()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
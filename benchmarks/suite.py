@@ -0,0 +1,308 @@
+# benchmarks/suite.py
+#
+# End-to-end benchmark suite for both challenges, on a synthetic PDF corpus
+# (benchmarks/synthetic.py) of controlled size. Stages:
+#
+#   1a.extract_headings.lean            PDFProcessor.extract_headings, lean PyMuPDF backend, per PDF
+#   1a.extract_headings.docstore_cold   the same with the docstore backend, each pass on an empty store
+#   1a.extract_headings.docstore_warm   the same with every PDF already in the store
+#   1a.is_likely_noise    the noise filter, per batch of NOISE_BATCH text lines
+#   1b.page_chunks        ingestion.page_chunks (formerly extract_chunks_from_pdf), per PDF
+#   1b.bm25_top_chunks    BM25 candidates of a synthetic persona/job query, per query
+#   1b.rerank_chunks      reranking of those candidates, embedding cache off, per query
+#
+# Each stage gets one untimed warm-up pass, then --repeat timed passes
+# (latency percentiles over every call, throughput over the whole time), then
+# one pass under tracemalloc for its peak Python memory. Results are written as
+# JSON; with --baseline, p50 latency, throughput and peak memory are compared
+# against an earlier results file and the run fails on a regression beyond
+# --tolerance. The docstore lives in a temporary directory, so every run
+# starts from the same state.
+#
+# Usage (from the repository root):
+#     python -m benchmarks.suite [--docs 8 --pages 20 ...] [--output bench_results.json]
+#     python -m benchmarks.suite --save-baseline benchmarks/baseline.json
+#     python -m benchmarks.suite --baseline benchmarks/baseline.json [--tolerance 0.2]
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from functools import partial
+import numpy as np
+from benchmarks import synthetic
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHALLENGE_1A = os.path.join(REPO_ROOT, "Challenge_1a")
+CHALLENGE_1B = os.path.join(REPO_ROOT, "Challenge_1b")
+RESULTS_FORMAT_VERSION = 1
+NOISE_BATCH = 1000
+STAGES = ["1a.extract_headings.lean", "1a.extract_headings.docstore_cold", "1a.extract_headings.docstore_warm",
+          "1a.is_likely_noise", "1b.page_chunks", "1b.bm25_top_chunks", "1b.rerank_chunks"]
+
+
+def measure(fn, items, repeat, work=None, work_unit=None, before_pass=None):
+    """
+    Times fn(item) for every item, repeat times after a warm-up pass. work(item)
+    is the amount of work in an item (pages, lines...) for the throughput.
+    before_pass(), if given, runs (untimed) before every pass, e.g. to empty a
+    cache.
+    """
+    before_pass = before_pass or (lambda: None)
+    before_pass()
+    for item in items:
+        fn(item)
+
+    latencies = []
+    for _ in range(repeat):
+        before_pass()
+        for item in items:
+            start = time.perf_counter()
+            fn(item)
+            latencies.append(time.perf_counter() - start)
+    seconds = sum(latencies)
+    amount = repeat * sum(work(item) for item in items) if work else len(latencies)
+
+    # Separate pass: tracing allocations slows everything down
+    before_pass()
+    tracemalloc.start()
+    for item in items:
+        fn(item)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    ms = np.array(latencies) * 1000
+    return {
+        "calls": len(latencies),
+        "seconds": seconds,
+        "latency_ms": {"mean": float(ms.mean()), "p50": float(np.percentile(ms, 50)),
+                       "p90": float(np.percentile(ms, 90)), "p99": float(np.percentile(ms, 99)),
+                       "max": float(ms.max())},
+        "throughput": amount / seconds if seconds else 0.0,
+        "throughput_unit": f"{work_unit or 'calls'}/s",
+        "peak_memory_mb": peak / 1e6,
+    }
+
+
+def page_count(path):
+    import fitz
+
+    with fitz.open(path) as doc:
+        return doc.page_count
+
+
+# --- Challenge_1a ------------------------------------------------------------
+
+def bench_1a(pdf_paths, repeat, stages, tmp_dir):
+    from src.config import Config
+    from src.processor import PDFProcessor
+    from src.utils import is_likely_noise
+    import fitz
+
+    results = {}
+    pages = {path: page_count(path) for path in pdf_paths}
+    if "1a.extract_headings.lean" in stages:
+        processor = PDFProcessor(Config.MODEL_PATH, Config.LABEL_MAP, backend="lean")
+        results["1a.extract_headings.lean"] = measure(processor.extract_headings, pdf_paths, repeat, pages.get, "pages")
+
+    docstore_stages = [stage for stage in ("1a.extract_headings.docstore_cold", "1a.extract_headings.docstore_warm")
+                       if stage in stages]
+    if docstore_stages:
+        processor = PDFProcessor(Config.MODEL_PATH, Config.LABEL_MAP, backend="docstore")
+        store = processor.backend.store if processor.backend.name == "docstore" else None
+        cold_dirs = itertools.count()
+
+        def empty_store():
+            # A new directory per pass: every PDF is parsed and stored again
+            shutil.rmtree(store.dir, ignore_errors=True)
+            store.dir = os.path.join(tmp_dir, f"docstore_cold_{next(cold_dirs)}")
+
+        for stage in docstore_stages:
+            if store is None:
+                results[stage] = {"skipped": "docstore module not available"}
+                continue
+            store.dir = os.path.join(tmp_dir, "docstore_warm")
+            results[stage] = measure(processor.extract_headings, pdf_paths, repeat, pages.get, "pages",
+                                     empty_store if stage.endswith("_cold") else None)
+
+    if "1a.is_likely_noise" in stages:
+        lines = []
+        for path in pdf_paths:
+            with fitz.open(path) as doc:
+                for page in doc:
+                    for b in page.get_text("dict")["blocks"]:
+                        for l in b.get("lines", []):
+                            lines.append(" ".join(span["text"] for span in l["spans"]))
+        batches = [lines[i:i + NOISE_BATCH] for i in range(0, len(lines), NOISE_BATCH)]
+        results["1a.is_likely_noise"] = measure(lambda batch: [is_likely_noise(text) for text in batch],
+                                                batches, repeat, len, "lines")
+    return results
+
+
+# --- Challenge_1b ------------------------------------------------------------
+
+def bench_1b(pdf_dir, pdf_paths, repeat, stages, n_queries, model_dir, tmp_dir):
+    import main as pipeline
+    import ingestion
+    from bm25_index import BM25Index
+
+    results = {}
+    if "1b.page_chunks" in stages:
+        pages = {path: page_count(path) for path in pdf_paths}
+        results["1b.page_chunks"] = measure(
+            lambda path: ingestion.page_chunks(path, pipeline.CHUNK_SIZE, pipeline.PDF_BACKEND),
+            pdf_paths, repeat, pages.get, "pages")
+        results["1b.page_chunks"]["backend"] = pipeline.PDF_BACKEND
+
+    if not {"1b.bm25_top_chunks", "1b.rerank_chunks"} & set(stages):
+        return results
+    index = BM25Index(os.path.join(tmp_dir, "bm25_index"), chunk_size=pipeline.CHUNK_SIZE, backend=pipeline.PDF_BACKEND)
+    index.update(pdf_dir, partial(ingestion.page_chunks, chunk_size=pipeline.CHUNK_SIZE, backend=pipeline.PDF_BACKEND),
+                 pipeline.extract_all)
+    documents = sorted(index.documents, key=lambda name: index.documents[name]["id"])
+    text = synthetic.TextSource(seed=12345)
+    queries = [f"{text.sentence(2).title()}. Job: {text.sentence(12)}" for _ in range(n_queries)]
+
+    if "1b.bm25_top_chunks" in stages:
+        results["1b.bm25_top_chunks"] = measure(lambda query: pipeline.bm25_top_chunks(query, index, documents),
+                                                queries, repeat, None, "queries")
+
+    if "1b.rerank_chunks" in stages:
+        pipeline.MODEL_NAME = model_dir
+        pipeline.EMBEDDING_CACHE_MAX_ENTRIES = 0
+        try:
+            pipeline.get_model()
+        except Exception as e:
+            results["1b.rerank_chunks"] = {"skipped": f"model not loadable from {model_dir}: {type(e).__name__}: {e}"}
+            return results
+        candidates = {query: pipeline.bm25_top_chunks(query, index, documents) for query in queries}
+        results["1b.rerank_chunks"] = measure(lambda query: pipeline.rerank_chunks(query, candidates[query]),
+                                              queries, repeat, None, "queries")
+        results["1b.rerank_chunks"]["precision"] = pipeline.MODEL_PRECISION
+    return results
+
+
+# --- Results -----------------------------------------------------------------
+
+def machine():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count(),
+            "numpy": np.__version__, "commit": commit}
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns (rows, regressions): a row per checked metric of every stage present
+    in both results, as (stage, metric, baseline, current, ratio, regressed).
+    """
+    if baseline.get("corpus") != results["corpus"]:
+        raise ValueError(f"Baseline corpus {baseline.get('corpus')} differs from this run's {results['corpus']}")
+    rows = []
+    for name, stage in results["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if base is None or "skipped" in stage or "skipped" in base:
+            continue
+        # (metric, baseline, current, True if higher is better)
+        checks = [("p50 latency ms", base["latency_ms"]["p50"], stage["latency_ms"]["p50"], False),
+                  (f"throughput {stage['throughput_unit']}", base["throughput"], stage["throughput"], True),
+                  ("peak memory MB", base["peak_memory_mb"], stage["peak_memory_mb"], False)]
+        for metric, old, new, higher_is_better in checks:
+            ratio = new / old if old else 1.0
+            regressed = ratio < 1 / (1 + tolerance) if higher_is_better else ratio > 1 + tolerance
+            rows.append((name, metric, old, new, ratio, regressed))
+    return rows, [row for row in rows if row[5]]
+
+
+def print_results(results):
+    print(f"\n{'stage':<34} {'calls':>6} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'throughput':>18} {'peak MB':>8}")
+    for name, stage in results["stages"].items():
+        if "skipped" in stage:
+            print(f"{name:<34} skipped: {stage['skipped']}")
+            continue
+        latency = stage["latency_ms"]
+        print(f"{name:<34} {stage['calls']:>6} {latency['p50']:>9.2f} {latency['p90']:>9.2f} {latency['p99']:>9.2f} "
+              f"{stage['throughput']:>10.1f} {stage['throughput_unit']:<7} {stage['peak_memory_mb']:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmarks of both challenges on a synthetic corpus.")
+    synthetic.add_arguments(parser)
+    parser.add_argument("--corpus", help="Use (or create) the synthetic corpus in this directory")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes per stage")
+    parser.add_argument("--queries", type=int, default=50, help="Synthetic persona/job queries for the 1b query stages")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--model-dir", default=os.path.join(CHALLENGE_1B, "models", "specter2"),
+                        help="Embedding model for 1b.rerank_chunks")
+    parser.add_argument("--output", default="bench_results.json", help="Where the JSON results are written")
+    parser.add_argument("--baseline", help="Results file to compare against; exits non-zero on a regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown / memory growth")
+    parser.add_argument("--save-baseline", help="Also write the results to this baseline file")
+    args = parser.parse_args()
+
+    for challenge_dir in (CHALLENGE_1A, CHALLENGE_1B):
+        if challenge_dir not in sys.path:
+            sys.path.append(challenge_dir)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["DOCSTORE_DIR"] = os.path.join(tmp_dir, "docstore_warm")
+        corpus_dir = args.corpus or os.path.join(tmp_dir, "corpus")
+        settings = synthetic.corpus_settings(args)
+        start = time.perf_counter()
+        pdf_paths = synthetic.make_corpus(corpus_dir, **settings)
+        print(f"Corpus: {len(pdf_paths)} PDFs x {args.pages} pages in {corpus_dir} "
+              f"({time.perf_counter() - start:.1f}s to generate)")
+
+        stages = {}
+        if any(stage.startswith("1a.") for stage in args.stages):
+            stages.update(bench_1a(pdf_paths, args.repeat, args.stages, tmp_dir))
+        if any(stage.startswith("1b.") for stage in args.stages):
+            stages.update(bench_1b(corpus_dir, pdf_paths, args.repeat, args.stages, args.queries, args.model_dir,
+                                   tmp_dir))
+
+    results = {
+        "version": RESULTS_FORMAT_VERSION,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "machine": machine(),
+        "corpus": settings,
+        "repeat": args.repeat,
+        "stages": {name: stages[name] for name in STAGES if name in stages},
+    }
+    print_results(results)
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {path}")
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    try:
+        rows, regressions = compare(results, baseline, args.tolerance)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 2
+    print(f"\nAgainst {args.baseline} ({baseline.get('created')}, commit {(baseline['machine'].get('commit') or '-')[:10]}):")
+    print(f"{'stage':<34} {'metric':<24} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name, metric, old, new, ratio, regressed in rows:
+        print(f"{name:<34} {metric:<24} {old:>10.2f} {new:>10.2f} {ratio:>6.2f}x {'❌' if regressed else ''}")
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+        return 1
+    print(f"✅ No regression beyond {args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+# benchmarks/synthetic.py
+#
+# Synthetic PDF corpus of controlled size for the benchmark suite. Each page
+# holds lines_per_page lines of body text (10pt Helvetica) and, at the given
+# density, numbered headings (H1 18pt / H2 14pt / H3 12pt Helvetica-Bold), plus
+# images_per_page noise images that extraction has to skip. Words are drawn
+# from a fixed pseudo-word vocabulary with Zipf-like frequencies, so BM25
+# statistics look like natural text. Output is deterministic for a seed.
+#
+# Usage (from the repository root):
+#     python -m benchmarks.synthetic out_dir [--docs 8] [--pages 20] [--lines 40] [--heading-density 0.05] [--images 1]
+
+import argparse
+import os
+import sys
+import numpy as np
+import fitz
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842   # A4, points
+MARGIN = 72
+BODY_SIZE = 10
+HEADING_SIZES = {1: 18, 2: 14, 3: 12}
+WORDS_PER_LINE = (8, 14)
+VOCABULARY_SIZE = 5000
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "ta", "sen", "vor", "di", "pa", "tek", "lin", "qu", "zo", "fe", "gar",
+             "ish", "mon", "bel", "tra", "co", "um", "ster", "ald", "vi", "en", "or", "pli", "dra", "nu"]
+
+
+def vocabulary(size=VOCABULARY_SIZE, seed=0):
+    """size distinct pseudo-words of 2-4 syllables, and their Zipf (1 / rank) sampling probabilities."""
+    rng = np.random.default_rng(seed)
+    words = {}
+    while len(words) < size:
+        word = "".join(rng.choice(SYLLABLES, rng.integers(2, 5)))
+        words.setdefault(word, None)
+    weights = 1.0 / np.arange(1, size + 1)
+    return list(words), weights / weights.sum()
+
+
+class TextSource:
+    """Random sentences over the vocabulary."""
+    def __init__(self, seed=0):
+        self.rng = np.random.default_rng(seed)
+        self.words, self.probabilities = vocabulary()
+
+    def sentence(self, n_words):
+        return " ".join(self.rng.choice(self.words, n_words, p=self.probabilities))
+
+    def line(self):
+        return self.sentence(int(self.rng.integers(*WORDS_PER_LINE)))
+
+
+def noise_image(rng, size=64):
+    samples = rng.integers(0, 256, size * size * 3, dtype=np.uint8).tobytes()
+    return fitz.Pixmap(fitz.csRGB, size, size, samples, 0)
+
+
+def make_pdf(path, pages=20, lines_per_page=40, heading_density=0.05, images_per_page=1, seed=0):
+    """
+    Writes one synthetic PDF and returns the number of headings in it. Each
+    line is a heading with probability heading_density; heading levels cycle
+    through numbered H1 / H2 / H3 (1., 1.1, 1.1.1).
+    """
+    text = TextSource(seed)
+    rng = np.random.default_rng(seed + 1)
+    numbering = [0, 0, 0]
+    n_headings = 0
+    line_height = (PAGE_HEIGHT - 2 * MARGIN) / max(lines_per_page, 1)
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        y = MARGIN
+        for _ in range(lines_per_page):
+            y += line_height
+            if rng.random() < heading_density:
+                level = int(rng.choice([1, 2, 3], p=[0.3, 0.4, 0.3]))
+                numbering[level - 1] += 1
+                numbering[level:] = [0] * (3 - level)
+                number = ".".join(str(max(n, 1)) for n in numbering[:level])
+                heading = f"{number}{'.' if level == 1 else ''} {text.sentence(int(rng.integers(2, 6))).title()}"
+                page.insert_text((MARGIN, y), heading, fontsize=HEADING_SIZES[level], fontname="hebo")
+                n_headings += 1
+            else:
+                page.insert_text((MARGIN, y), text.line(), fontsize=BODY_SIZE, fontname="helv")
+        for i in range(images_per_page):
+            x = PAGE_WIDTH - MARGIN - 80
+            top = MARGIN + i * 90
+            page.insert_image(fitz.Rect(x, top, x + 64, top + 64), pixmap=noise_image(rng))
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+    return n_headings
+
+
+def make_corpus(out_dir, docs=8, pages=20, lines_per_page=40, heading_density=0.05, images_per_page=1, seed=0):
+    """Writes docs synthetic PDFs (synthetic_000.pdf, ...) to out_dir and returns their paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for i in range(docs):
+        path = os.path.join(out_dir, f"synthetic_{i:03d}.pdf")
+        make_pdf(path, pages, lines_per_page, heading_density, images_per_page, seed + 1000 * i)
+        paths.append(path)
+    return paths
+
+
+def add_arguments(parser):
+    parser.add_argument("--docs", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=20, help="Pages per document")
+    parser.add_argument("--lines", type=int, default=40, help="Text lines per page")
+    parser.add_argument("--heading-density", type=float, default=0.05, help="Fraction of lines that are headings")
+    parser.add_argument("--images", type=int, default=1, help="Images per page")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def corpus_settings(args):
+    return {"docs": args.docs, "pages": args.pages, "lines_per_page": args.lines,
+            "heading_density": args.heading_density, "images_per_page": args.images, "seed": args.seed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic PDF corpus.")
+    parser.add_argument("out_dir")
+    add_arguments(parser)
+    args = parser.parse_args()
+    paths = make_corpus(args.out_dir, **corpus_settings(args))
+    print(f"{len(paths)} PDFs of {args.pages} pages written to {args.out_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
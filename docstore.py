@@ -0,0 +1,321 @@
+# docstore.py
+#
+# Parsed-document store shared by Challenge_1a (outline extraction) and
+# Challenge_1b (persona retrieval): each PDF is parsed by PyMuPDF once and its
+# text spans are kept on disk, keyed by the SHA-256 of the PDF bytes, so the
+# second pipeline (and every later run) reads columns instead of parsing.
+#
+# One directory per document holds a column per span attribute (.npy, loaded
+# with mmap), the span texts as one UTF-8 blob, and line / page offsets:
+#
+#     meta.json          format version, digest, page count, font names
+#     page_size.npy      (pages, 2) float32 width, height of page.rect
+#     page_lines.npy     (pages + 1) int64 offsets into the lines
+#     line_spans.npy     (lines + 1) int64 offsets into the spans
+#     span_size.npy      (spans,) float32 font size
+#     span_bbox.npy      (spans, 4) float32 x0, y0, x1, y1
+#     span_font.npy      (spans,) int32 index into meta["fonts"]
+#     span_bold.npy      (spans,) uint8, 1 if the font name contains "Bold"
+#     text_offsets.npy   (spans + 1) int64 offsets into text.bin
+#     text.bin           span texts, UTF-8
+#
+# Lines keep PyMuPDF's block and line order ("dict" extraction without image
+# blocks); lines without spans are dropped. MuPDF computes coordinates and
+# sizes in single precision, so float32 columns hold them exactly.
+#
+#     store = DocumentStore()                  # DOCSTORE_DIR, or .docstore/ next to this file, up to DOCSTORE_MAX_MB
+#     with store.get("file.pdf") as doc:       # parses and stores on first use
+#         for page in range(doc.page_count):
+#             text = doc.page_text(page)
+
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+
+STORE_FORMAT_VERSION = 1
+DEFAULT_STORE_DIR = os.environ.get("DOCSTORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".docstore"))
+# Size bound of the store; least recently used documents are removed beyond it (0: unbounded)
+DEFAULT_MAX_MB = int(os.environ.get("DOCSTORE_MAX_MB", "1024"))
+# Pruning goes down to this fraction of the bound, so the store is not scanned again for a while
+PRUNE_TARGET = 0.9
+# Temporary directories older than this are left over from a crashed writer
+STALE_TMP_SECONDS = 3600
+
+COLUMNS = ("page_size", "page_lines", "line_spans", "span_size", "span_bbox", "span_font", "span_bold", "text_offsets")
+
+
+def digest(source):
+    """SHA-256 hex digest of a PDF given as a path or as an in-memory buffer."""
+    h = hashlib.sha256()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    else:
+        h.update(memoryview(source))
+    return h.hexdigest()
+
+
+def parse(source, out_dir, key):
+    """Parses a PDF (path or buffer) with PyMuPDF and writes its columns to out_dir."""
+    import fitz
+
+    if isinstance(source, (str, os.PathLike)):
+        doc = fitz.open(source)
+    elif isinstance(source, (bytes, bytearray)):
+        doc = fitz.open(stream=source, filetype="pdf")
+    else:
+        try:
+            doc = fitz.open(stream=memoryview(source), filetype="pdf")
+        except TypeError:
+            # Older PyMuPDF (e.g. 1.21) only takes bytes, bytearray or BytesIO
+            doc = fitz.open(stream=bytes(source), filetype="pdf")
+    flags = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+    fonts = {}
+    page_size, page_lines, line_spans = [], [0], [0]
+    sizes, bboxes, font_ids, texts = [], [], [], []
+    with doc:
+        for page in doc:
+            page_size.append((page.rect.width, page.rect.height))
+            for block in page.get_text("dict", flags=flags)["blocks"]:
+                for line in block.get("lines", ()):
+                    if not line["spans"]:
+                        continue
+                    for span in line["spans"]:
+                        sizes.append(span["size"])
+                        bboxes.append(span["bbox"])
+                        font_ids.append(fonts.setdefault(span["font"], len(fonts)))
+                        texts.append(span["text"].encode("utf-8"))
+                    line_spans.append(len(sizes))
+            page_lines.append(len(line_spans) - 1)
+        page_count = doc.page_count
+
+    font_names = list(fonts)
+    text_offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+    text_offsets[1:] = np.cumsum([len(t) for t in texts])
+    columns = {
+        "page_size": np.array(page_size, dtype=np.float32).reshape(-1, 2),
+        "page_lines": np.array(page_lines, dtype=np.int64),
+        "line_spans": np.array(line_spans, dtype=np.int64),
+        "span_size": np.array(sizes, dtype=np.float32),
+        "span_bbox": np.array(bboxes, dtype=np.float32).reshape(-1, 4),
+        "span_font": np.array(font_ids, dtype=np.int32),
+        "span_bold": np.array(["Bold" in font_names[i] for i in font_ids], dtype=np.uint8),
+        "text_offsets": text_offsets,
+    }
+    for name, column in columns.items():
+        np.save(os.path.join(out_dir, name + ".npy"), column)
+    with open(os.path.join(out_dir, "text.bin"), "wb") as f:
+        f.write(b"".join(texts))
+    meta = {"version": STORE_FORMAT_VERSION, "sha256": key, "page_count": page_count, "fonts": font_names,
+            "parser": f"pymupdf {fitz.VersionBind}"}
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+def _dir_size(path):
+    return sum(f.stat().st_size for f in os.scandir(path))
+
+
+class StoredDocument:
+    """
+    Read-only view of one parsed document; columns are memory-mapped.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        for name in COLUMNS:
+            setattr(self, name, np.load(os.path.join(path, name + ".npy"), mmap_mode="r"))
+        with open(os.path.join(path, "text.bin"), "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self.text_data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.page_count = self.meta["page_count"]
+        self.fonts = self.meta["fonts"]
+
+    def span_range(self, page):
+        """First and past-the-end span index of a page."""
+        first_line, end_line = self.page_lines[page], self.page_lines[page + 1]
+        return int(self.line_spans[first_line]), int(self.line_spans[end_line])
+
+    def span_texts(self, start, end):
+        offsets = self.text_offsets[start:end + 1].tolist()
+        data = self.text_data[offsets[0]:offsets[-1]]
+        base = offsets[0]
+        return [data[a - base:b - base].decode("utf-8") for a, b in zip(offsets, offsets[1:])]
+
+    def lines(self, page):
+        """
+        The lines of a page as lists of span dicts with the keys of PyMuPDF's
+        "dict" extraction that the pipelines use: text, size, font, bbox.
+        """
+        start, end = self.span_range(page)
+        texts = self.span_texts(start, end)
+        sizes = self.span_size[start:end].tolist()
+        bboxes = [tuple(b) for b in self.span_bbox[start:end].tolist()]
+        fonts = [self.fonts[i] for i in self.span_font[start:end].tolist()]
+        bounds = (self.line_spans[self.page_lines[page]:self.page_lines[page + 1] + 1] - start).tolist()
+        return [[{"text": texts[i], "size": sizes[i], "font": fonts[i], "bbox": bboxes[i]} for i in range(a, b)]
+                for a, b in zip(bounds, bounds[1:])]
+
+    def page_text(self, page):
+        """Plain text of a page: spans joined within a line, lines on their own line."""
+        start, end = self.span_range(page)
+        texts = self.span_texts(start, end)
+        bounds = (self.line_spans[self.page_lines[page]:self.page_lines[page + 1] + 1] - start).tolist()
+        return "\n".join("".join(texts[a:b]) for a, b in zip(bounds, bounds[1:]))
+
+    def close(self):
+        """Unmaps the columns and text; the document can't be read afterwards."""
+        if isinstance(self.text_data, mmap.mmap):
+            self.text_data.close()
+        self.text_data = b""
+        for name in COLUMNS:
+            setattr(self, name, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class DocumentStore:
+    """
+    Content-addressed store of parsed PDFs in store_dir. get() parses and
+    stores a document on first use; concurrent writers (processes or runs of
+    both pipelines) each write to a temporary directory and the first rename
+    wins. A writer that finds a valid entry in place after parsing keeps it
+    and drops its own. Every stored document adds to the store's size; past
+    max_mb (default DOCSTORE_MAX_MB, 0 for no bound), prune() removes the least
+    recently read documents. The size is counted by one scan of the store,
+    then kept as a running total of what this instance writes; documents
+    stored by other processes are counted at the next scan.
+    """
+    def __init__(self, store_dir=None, max_mb=None):
+        self.dir = store_dir or DEFAULT_STORE_DIR
+        self.max_bytes = (DEFAULT_MAX_MB if max_mb is None else max_mb) << 20
+        self.hits = 0
+        self.misses = 0
+        self.pruned = 0
+        self._usage = None   # bytes in the store as of the last scan, plus what was written since
+
+    def path_of(self, key):
+        return os.path.join(self.dir, key[:2], key)
+
+    def get(self, source, key=None):
+        """StoredDocument for a PDF path or buffer (key: its digest, if already known)."""
+        key = key or digest(source)
+        path = self.path_of(key)
+        if self._valid(path):
+            self.hits += 1
+            self._touch(path)
+            return StoredDocument(path)
+
+        self.misses += 1
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix=key + ".", dir=os.path.dirname(path))
+        stored = False
+        try:
+            parse(source, tmp_dir, key)
+            if not self._valid(path):
+                self._discard(path)
+                os.rename(tmp_dir, path)
+                stored = True
+        except OSError:
+            # Another writer stored it first
+            if not self._valid(path):
+                raise
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        if stored and self.max_bytes:
+            self._account(path)
+        return StoredDocument(path)
+
+    def _account(self, path):
+        """Adds a new entry to the running size; scans and prunes once it is past max_bytes."""
+        if self._usage is not None:
+            self._usage += _dir_size(path)
+        if self._usage is None or self._usage > self.max_bytes:
+            self.prune(keep=path)
+
+    def _touch(self, path):
+        # meta.json's mtime is the entry's last use, for prune()
+        try:
+            os.utime(os.path.join(path, "meta.json"))
+        except OSError:
+            pass
+
+    def _entries(self):
+        """(last use, bytes, path) of every entry, and the temporary directories to delete."""
+        entries, leftovers = [], []
+        now = time.time()
+        for prefix in os.scandir(self.dir):
+            if not prefix.is_dir():
+                continue
+            for entry in os.scandir(prefix.path):
+                if not entry.is_dir():
+                    continue
+                try:
+                    size = _dir_size(entry.path)
+                    used = os.stat(os.path.join(entry.path, "meta.json")).st_mtime
+                except OSError:
+                    used, size = entry.stat().st_mtime, 0
+                if "." not in entry.name:
+                    entries.append((used, size, entry.path))
+                elif ".trash." in entry.name or now - entry.stat().st_mtime > STALE_TMP_SECONDS:
+                    leftovers.append(entry.path)
+        return entries, leftovers
+
+    def prune(self, keep=None):
+        """
+        Scans the store and, once it holds more than max_bytes, removes the
+        least recently used documents (but not keep) until it is down to
+        PRUNE_TARGET of that; also deletes temporary directories left behind
+        by crashed writers. Returns the number of documents removed.
+        """
+        try:
+            entries, leftovers = self._entries()
+        except OSError:
+            return 0
+        for path in leftovers:
+            shutil.rmtree(path, ignore_errors=True)
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * PRUNE_TARGET if total > self.max_bytes else total
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            if path == keep:
+                continue
+            self._discard(path)
+            total -= size
+            removed += 1
+        self.pruned += removed
+        self._usage = total
+        return removed
+
+    def _discard(self, path):
+        """Moves an outdated or incomplete entry out of the way, then deletes it."""
+        trash = f"{path}.trash.{os.getpid()}.{os.urandom(4).hex()}"
+        try:
+            os.rename(path, trash)
+        except FileNotFoundError:
+            return
+        shutil.rmtree(trash, ignore_errors=True)
+
+    def _valid(self, path):
+        try:
+            with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+                return json.load(f)["version"] == STORE_FORMAT_VERSION
+        except (OSError, ValueError, KeyError):
+            return False
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "pruned": self.pruned}